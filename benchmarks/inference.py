@@ -0,0 +1,158 @@
+"""Benchmark the prediction pipeline per ModelVersion and compare runs.
+
+``run`` loads each requested ModelVersion in its own process (so peak RSS is
+per model) and times decode + preprocess + forward on synthetic images
+across image sizes, formats, batch sizes and torch thread counts, printing
+p50/p95/p99 latency, throughput and peak RSS as JSON:
+
+    python benchmarks/inference.py run --version 1.2.0 --version 1.3.0 --out run.json
+    python benchmarks/inference.py run --active --threads 1,2,4 --out baseline.json
+
+``compare`` diffs two such files and exits with status 1 if the candidate
+regressed, so it can gate activation in CI:
+
+    python benchmarks/inference.py compare baseline.json run.json --candidate-version 1.3.0
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_sizes(raw):
+    return tuple(tuple(int(part) for part in size.lower().split('x')) for size in raw.split(','))
+
+
+def parse_ints(raw):
+    return tuple(int(value) for value in raw.split(','))
+
+
+def benchmark_version(version, options, queue):
+    # Always report, even on failure, so the parent never waits on a child that gave up
+    try:
+        queue.put(_benchmark_version(version, options))
+    except Exception as e:
+        queue.put({"version": version, "error": str(e)})
+
+
+def _benchmark_version(version, options):
+    from run import create_app
+    from models import ModelVersion
+    from routes.prediction_route.benchmark import run_benchmark
+    from routes.prediction_route.prediction import decode_and_transform
+    from routes.prediction_route.registry import model_registry
+
+    app = create_app(allow=False)
+    with app.app_context():
+        if version is None:
+            loaded_model = model_registry.get_active()
+        else:
+            model_version = ModelVersion.query.filter_by(version=version).first()
+            if model_version is None:
+                return {"version": version, "error": "No such model version"}
+            loaded_model = model_registry.load(model_version)
+
+        if loaded_model is None:
+            return {"version": version, "error": "Model could not be loaded"}
+
+        return run_benchmark(loaded_model, decode_and_transform, isolated=True, **options)
+
+
+def run(args):
+    options = {"runs": args.runs}
+    if args.sizes:
+        options["image_sizes"] = parse_sizes(args.sizes)
+    if args.formats:
+        options["formats"] = tuple(fmt.upper() for fmt in args.formats.split(','))
+    if args.batch_sizes:
+        options["batch_sizes"] = parse_ints(args.batch_sizes)
+    if args.threads:
+        options["thread_counts"] = parse_ints(args.threads)
+
+    versions = list(args.version or [])
+    if args.active or not versions:
+        versions.insert(0, None)
+
+    from routes.prediction_route.benchmark import wait_for_report
+
+    context = multiprocessing.get_context('spawn')
+    reports = []
+    for version in versions:
+        queue = context.Queue()
+        process = context.Process(target=benchmark_version, args=(version, options, queue))
+        process.start()
+        # A child killed before reporting (e.g. out of memory) becomes an error report instead of a hang
+        report = wait_for_report(process, queue, args.timeout)
+        if "error" in report:
+            report.setdefault("version", version)
+        reports.append(report)
+        process.join()
+
+    output = json.dumps({"reports": reports}, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output)
+    print(output)
+    return 1 if any("error" in report for report in reports) else 0
+
+
+def pick_report(path, version):
+    with open(path) as f:
+        reports = [report for report in json.load(f)["reports"] if "error" not in report]
+    if version is None:
+        return reports[0] if reports else None
+    return next((report for report in reports if report["model"]["version"] == version), None)
+
+
+def compare(args):
+    from routes.prediction_route.benchmark import compare_reports
+
+    baseline = pick_report(args.baseline, args.baseline_version)
+    candidate = pick_report(args.candidate, args.candidate_version)
+    if baseline is None or candidate is None:
+        print(json.dumps({"error": "Baseline or candidate report not found"}))
+        return 2
+
+    comparison = compare_reports(
+        baseline, candidate,
+        latency_tolerance=args.latency_tolerance,
+        throughput_tolerance=args.throughput_tolerance,
+        rss_tolerance=args.rss_tolerance
+    )
+    print(json.dumps(comparison, indent=2))
+    return 0 if comparison["passed"] else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Benchmark one or more model versions')
+    run_parser.add_argument('--version', action='append', help='ModelVersion.version to benchmark (repeatable)')
+    run_parser.add_argument('--active', action='store_true', help='Also benchmark the active model')
+    run_parser.add_argument('--sizes', help='Comma-separated WIDTHxHEIGHT list, e.g. 224x224,4000x3000')
+    run_parser.add_argument('--formats', help='Comma-separated image formats, e.g. jpeg,png,webp')
+    run_parser.add_argument('--batch-sizes', help='Comma-separated batch sizes, e.g. 1,8')
+    run_parser.add_argument('--threads', help='Comma-separated torch thread counts, e.g. 1,2,4')
+    run_parser.add_argument('--runs', type=int, default=30)
+    run_parser.add_argument('--timeout', type=int, default=None, help='Seconds to wait for each version before giving up')
+    run_parser.add_argument('--out', help='Also write the JSON report to this file')
+
+    compare_parser = subparsers.add_parser('compare', help='Flag regressions between two runs')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--baseline-version', help='Report to use from the baseline file (default: first)')
+    compare_parser.add_argument('--candidate-version', help='Report to use from the candidate file (default: first)')
+    compare_parser.add_argument('--latency-tolerance', type=float, default=0.10)
+    compare_parser.add_argument('--throughput-tolerance', type=float, default=0.10)
+    compare_parser.add_argument('--rss-tolerance', type=float, default=0.25)
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == 'run' else compare(args))
+
+
+if __name__ == "__main__":
+    main()
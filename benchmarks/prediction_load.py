@@ -0,0 +1,120 @@
+"""Measure how prediction load affects the latency of other endpoints.
+
+Runs a probe loop against a cheap endpoint twice: once on an idle server and
+once while ``--concurrency`` clients keep posting images to /api/v1/predict.
+With inference on the eventlet hub the loaded probe latency tracks the
+forward-pass time; with INFERENCE_POOL_MODE=tpool it should stay close to the
+idle baseline.
+
+    python benchmarks/prediction_load.py --image leaf.jpg --concurrency 8
+
+The bearer token is read from --token or the TOKEN environment variable
+(as set by ``flask cli auth login``).
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+
+import requests
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "mean_ms": statistics.mean(latencies) if latencies else None,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else None,
+    }
+
+
+def probe(session, url, headers, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        session.get(url, headers=headers, timeout=60)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        time.sleep(0.05)
+    return latencies
+
+
+def predict_loop(url, headers, image_bytes, filename, stop, latencies, lock):
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            session.post(url, headers=headers, files={'image': (filename, image_bytes)}, timeout=120)
+        except requests.RequestException:
+            continue
+        with lock:
+            latencies.append((time.perf_counter() - started) * 1000.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument('--base-url', default='http://localhost:5000/api/v1')
+    parser.add_argument('--token', default=os.getenv('TOKEN'))
+    parser.add_argument('--image', required=True, help='Image posted to /predict by the load clients')
+    parser.add_argument('--probe-path', default='/crop', help='Endpoint whose latency is measured')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per phase')
+    parser.add_argument('--output', help='Write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    probe_url = args.base_url + args.probe_path
+    predict_url = args.base_url + '/predict'
+    with open(args.image, 'rb') as f:
+        image_bytes = f.read()
+    filename = os.path.basename(args.image)
+
+    session = requests.Session()
+    idle = probe(session, probe_url, headers, args.duration)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    predict_latencies = []
+    workers = [
+        threading.Thread(target=predict_loop, args=(predict_url, headers, image_bytes, filename, stop, predict_latencies, lock), daemon=True)
+        for _ in range(args.concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    time.sleep(1.0)  # let the load ramp up
+    loaded = probe(session, probe_url, headers, args.duration)
+    stop.set()
+    for worker in workers:
+        worker.join(timeout=120)
+
+    report = {
+        "probe_path": args.probe_path,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "probe_idle": summarize(idle),
+        "probe_under_load": summarize(loaded),
+        "predict": summarize(predict_latencies),
+        "predict_throughput_per_s": len(predict_latencies) / args.duration,
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
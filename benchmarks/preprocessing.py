@@ -0,0 +1,106 @@
+"""Compare decode+preprocess time and peak memory of the two preprocessing paths.
+
+``reference`` is the original ``Image.open(...).convert('RGB')`` followed by
+the torchvision Resize/ToTensor/Normalize transform; ``fast`` is the
+draft-mode decode with the vectorised normalisation in
+``routes.prediction_route.preprocessing``. Each method runs in its own
+process so peak RSS is not polluted by the other.
+
+    python benchmarks/preprocessing.py --width 4000 --height 3000 --runs 20
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_jpeg(width, height, quality=90, seed=0):
+    """A camera-sized JPEG with enough texture that it does not compress trivially."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)), (x + y) / 2], axis=-1)
+    noise = rng.normal(0, 20, size=(height, width, 3)).astype(np.float32)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def run_method(method, image_bytes, runs, batch_size, queue):
+    from routes.prediction_route.preprocessing import preprocess_batch, transform
+    import torch
+
+    baseline_rss = peak_rss_mb()
+    timings = []
+    for _ in range(runs):
+        sources = [io.BytesIO(image_bytes) for _ in range(batch_size)]
+        started = time.perf_counter()
+        if method == 'reference':
+            torch.stack([transform(Image.open(source).convert('RGB')) for source in sources])
+        else:
+            preprocess_batch(sources)
+        timings.append((time.perf_counter() - started) * 1000.0 / batch_size)
+
+    queue.put({
+        "method": method,
+        "mean_ms_per_image": statistics.mean(timings),
+        "p50_ms_per_image": statistics.median(timings),
+        "min_ms_per_image": min(timings),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_growth_mb": peak_rss_mb() - baseline_rss,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--image', help='Use this file instead of a synthetic JPEG')
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = synthetic_jpeg(args.width, args.height)
+
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for method in ('reference', 'fast'):
+        queue = context.Queue()
+        process = context.Process(target=run_method, args=(method, image_bytes, args.runs, args.batch_size, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+
+    reference, fast = results
+    print(json.dumps({
+        "image_bytes": len(image_bytes),
+        "runs": args.runs,
+        "batch_size": args.batch_size,
+        "results": results,
+        "speedup": reference["mean_ms_per_image"] / fast["mean_ms_per_image"] if fast["mean_ms_per_image"] else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@ import os
 from dotenv import load_dotenv, set_key
 import requests
 import click
+import json
 from flask import current_app
+from flask.cli import AppGroup
 from tabulate import tabulate
 
 
@@ -363,9 +365,305 @@ def delete_comment():
     click.echo(response.json())
 
 
+# Model commands (run against the local database and model files, not the API)
+model_cli = AppGroup('model', help="Model version maintenance commands.")
+
+
+@model_cli.command('evaluate')
+@click.argument('dataset', type=click.Path(exists=True, file_okay=False))
+@click.option('--version', 'version', help="Model version to evaluate (defaults to the active classifier).")
+@click.option('--model-id', 'model_id', help="Model ID to evaluate.")
+@click.option('--workers', type=int, default=None, help="Worker processes (defaults to the CPU count).")
+@click.option('--batch-size', type=int, default=16, show_default=True, help="Images per forward pass.")
+@click.option('--save/--no-save', default=True, show_default=True, help="Store the evaluation and update ModelVersion.accuracy.")
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help="Also write the full report as JSON.")
+def evaluate_model_command(dataset, version, model_id, workers, batch_size, save, output):
+    """Evaluate a stored model version on DATASET/<label>/<image> files."""
+    from models import ModelEvaluation, ModelVersion, db
+    from routes.prediction_route.evaluation import discover_dataset, evaluate_model, match_labels
+    from routes.prediction_route.registry import model_registry
+
+    query = ModelVersion.query
+    if model_id:
+        model = query.get(model_id)
+    elif version:
+        model = query.filter_by(version=version).first()
+    else:
+        model = query.filter_by(isActive=True, role='classifier').order_by(ModelVersion.releaseDate.desc()).first()
+    if model is None:
+        raise click.ClickException("Model version not found.")
+
+    snapshot = model_registry.snapshot(model)
+    items = discover_dataset(dataset)
+    mapping, unmatched = match_labels([label for _, label in items], snapshot["classNames"])
+    if unmatched:
+        click.echo(f"Skipping folders that match no class of {model.version}: {', '.join(unmatched)}")
+    items = [(path, mapping[label]) for path, label in items if label in mapping]
+    if not items:
+        raise click.ClickException("No labeled images found for this model's classes.")
+
+    click.echo(f"Evaluating {model.version} on {len(items)} images...")
+    with click.progressbar(length=len(items), label="Images") as bar:
+        seen = [0]
+
+        def progress(done, total):
+            bar.update(done - seen[0])
+            seen[0] = done
+
+        report = evaluate_model(snapshot, items, workers=workers, batch_size=batch_size, progress=progress)
+
+    click.echo(f"Accuracy: {report['accuracy']:.4f} ({report['correct']}/{report['scored']}, {report['failed']} failed)"
+               if report['accuracy'] is not None else "No images could be scored.")
+    click.echo(f"Throughput: {report['throughput']:.1f} images/s with {report['workers']} workers ({report['backend']} backend)")
+
+    click.echo(tabulate(
+        [[label, stats['support'], stats['correct'], stats['precision'], stats['recall']] for label, stats in report['per_class'].items()],
+        headers=['Class', 'Support', 'Correct', 'Precision', 'Recall'], tablefmt='grid', floatfmt='.3f'
+    ))
+    click.echo(tabulate(
+        [[stage, stats['p50'], stats['p95'], stats['p99']] for stage, stats in report['latency'].items() if stats],
+        headers=['Latency (ms)', 'p50', 'p95', 'p99'], tablefmt='grid', floatfmt='.2f'
+    ))
+    labels = report['confusion']['labels']
+    click.echo(tabulate(
+        [[label] + row for label, row in zip(labels, report['confusion']['matrix'])],
+        headers=['Actual / Predicted'] + labels, tablefmt='grid'
+    ))
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if save and report['accuracy'] is not None:
+        evaluation = ModelEvaluation(
+            modelId=model.modelId,
+            datasetPath=os.path.abspath(dataset),
+            imageCount=report['scored'],
+            accuracy=report['accuracy'],
+            backend=report['backend'],
+            confusionMatrix=json.dumps(report['confusion']),
+            perClass=json.dumps(report['per_class']),
+            latency=json.dumps(report['latency']),
+            throughput=report['throughput'],
+            workers=report['workers']
+        )
+        model.accuracy = report['accuracy']
+        db.session.add(evaluation)
+        db.session.commit()
+        click.echo(f"Saved evaluation {evaluation.evaluationId}; accuracy of {model.version} updated.")
+
+
+@model_cli.command('index-embeddings')
+@click.option('--version', 'version', help="Model version whose diagnoses to index (defaults to the active classifier).")
+@click.option('--batch-size', type=int, default=32, show_default=True, help="Images per forward pass.")
+@click.option('--train-ivf', is_flag=True, help="Re-partition the index into IVF lists afterwards.")
+@click.option('--lists', type=int, default=None, help="Number of IVF lists (defaults to sqrt of the row count).")
+def index_embeddings_command(version, batch_size, train_ivf, lists):
+    """Backfill the similar-diagnoses index from stored diagnosis images."""
+    import torch
+    from models import DiagnosisResult, ModelVersion
+    from routes.prediction_route.embeddings import embedding_store
+    from routes.prediction_route.prediction import UPLOADS_DIR, decode_and_transform
+    from routes.prediction_route.registry import model_registry
+
+    query = ModelVersion.query
+    if version:
+        model = query.filter_by(version=version).first()
+    else:
+        model = query.filter_by(isActive=True, role='classifier').order_by(ModelVersion.releaseDate.desc()).first()
+    if model is None:
+        raise click.ClickException("Model version not found.")
+
+    loaded_model = model_registry.load(model)
+    if loaded_model.features is None:
+        raise click.ClickException(f"Model {model.version} does not expose penultimate-layer embeddings.")
+
+    index = embedding_store.index_for(model.version)
+    existing = index.indexed_ids() if index is not None else set()
+    rows = DiagnosisResult.query.filter_by(modelVersion=model.version).order_by(DiagnosisResult.resultId)
+    added, missing = 0, 0
+
+    def flush(batch):
+        nonlocal index, added
+        with torch.no_grad():
+            embeddings = loaded_model.features.embed(torch.stack([tensor for _, tensor in batch])).numpy()
+        if index is None:
+            index = embedding_store.index_for(model.version, dim=embeddings.shape[1])
+        for (diagnosisId, _), embedding in zip(batch, embeddings):
+            # Checked again: the server may have indexed new diagnoses since ``existing`` was read
+            added += index.add(diagnosisId, embedding)
+
+    batch = []
+    for result in rows.yield_per(1000):
+        if result.diagnosisId in existing or not result.image_path:
+            continue
+        path = os.path.join(UPLOADS_DIR, os.path.basename(result.image_path))
+        try:
+            batch.append((result.diagnosisId, decode_and_transform(path)))
+        except Exception:
+            missing += 1
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if index is None:
+        raise click.ClickException("No diagnosis images found to index.")
+    index.flush()
+    click.echo(f"Indexed {added} diagnoses of {model.version} ({missing} images unreadable); {index.count} in the index.")
+
+    if train_ivf:
+        trained = index.train_ivf(lists=lists)
+        click.echo(f"Partitioned the index into {trained} IVF lists.")
+
+
+@model_cli.command('build-deltas')
+@click.option('--version', 'version', help="Model version to patch to (defaults to the active classifier).")
+@click.option('--max-sources', type=int, default=0, show_default=True, help="Patch from at most this many earlier versions (0 = all).")
+def build_deltas_command(version, max_sources):
+    """Precompute binary patches from earlier model versions, e.g. for versions uploaded before deltas existed."""
+    from models import ModelVersion
+    from routes.model_route.deltas import build_deltas
+
+    query = ModelVersion.query
+    if version:
+        model = query.filter_by(version=version).first()
+    else:
+        model = query.filter_by(isActive=True, role='classifier').order_by(ModelVersion.releaseDate.desc()).first()
+    if model is None:
+        raise click.ClickException("Model version not found.")
+
+    created = build_deltas(model, current_app.config['MODEL_STORAGE'], max_sources=max_sources)
+    for delta in created:
+        saved = 1 - delta.patchSize / (model.fileSize * 1024 or 1)
+        click.echo(f"{delta.fromHash[:12]} -> {model.version}: {delta.patchSize} bytes ({saved:.0%} smaller)")
+    click.echo(f"Built {len(created)} delta(s) to {model.version}.")
+
+
+@model_cli.command('compress')
+@click.option('--version', 'version', help="Model version to compress (defaults to every version).")
+def compress_command(version):
+    """Write the gzip/zstd copies served to clients, e.g. for versions uploaded before compression existed."""
+    from models import ModelVersion
+    from routes.model_route.encodings import compress_model_file
+
+    models = ModelVersion.query.filter_by(version=version).all() if version else ModelVersion.query.all()
+    if not models:
+        raise click.ClickException("Model version not found.")
+
+    for model in models:
+        file_path = os.path.join(current_app.config['MODEL_STORAGE'], model.filePath)
+        if not os.path.exists(file_path):
+            click.echo(f"{model.version}: model file missing, skipped.")
+            continue
+        raw_size = os.path.getsize(file_path)
+        sizes = compress_model_file(file_path)
+        summary = ', '.join(f"{encoding} {size} bytes ({size / raw_size:.0%})" for encoding, size in sizes.items())
+        click.echo(f"{model.version}: {raw_size} bytes raw; {summary or 'no smaller encoding'}")
+
+
+@model_cli.command('rebuild-rating-stats')
+@click.option('--version', 'version', help="Only rebuild this model version's totals.")
+def rebuild_rating_stats_command(version):
+    """Recompute the per-model rating totals from the stored ratings, e.g. for ratings made before they existed."""
+    from models import ModelRatingStats, ModelVersion
+
+    model_id = None
+    if version:
+        model = ModelVersion.query.filter_by(version=version).first()
+        if model is None:
+            raise click.ClickException("Model version not found.")
+        model_id = model.modelId
+
+    rebuilt = ModelRatingStats.rebuild(model_id)
+    click.echo(f"Rebuilt rating totals of {rebuilt} model(s).")
+
+
+@model_cli.command('backfill-diagnosis-models')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help="Diagnosis rows updated per transaction.")
+def backfill_diagnosis_models_command(batch_size):
+    """Set DiagnosisResult.modelId and ModelRating.resultId on rows stored before those columns existed."""
+    backfill_diagnosis_model_ids(batch_size)
+    backfill_rating_results(batch_size)
+
+
+def backfill_diagnosis_model_ids(batch_size):
+    from sqlalchemy import func, update
+    from models import db, DiagnosisResult, ModelVersion
+
+    missing = (DiagnosisResult.modelId.is_(None), DiagnosisResult.modelVersion.isnot(None))
+    low, high = db.session.query(func.min(DiagnosisResult.resultId), func.max(DiagnosisResult.resultId)).filter(*missing).one()
+    if low is None:
+        click.echo("No diagnoses to backfill.")
+        return
+
+    model_id = db.session.query(ModelVersion.modelId).filter(
+        ModelVersion.version == DiagnosisResult.modelVersion
+    ).order_by(ModelVersion.releaseDate).limit(1).scalar_subquery()
+
+    # Walking the primary key in ranges keeps each UPDATE, and the locks it holds, small
+    for start in range(low, high + 1, batch_size):
+        db.session.execute(
+            update(DiagnosisResult).where(
+                DiagnosisResult.resultId.between(start, start + batch_size - 1), *missing
+            ).values(modelId=model_id).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        click.echo(f"Backfilled diagnoses up to resultId {min(high, start + batch_size - 1)} of {high}.")
+
+    unmatched = DiagnosisResult.query.filter(*missing).count()
+    click.echo(f"Done; {unmatched} diagnoses name a model version that no longer exists.")
+
+
+def backfill_rating_results(batch_size):
+    """Link ratings made before ModelRating.resultId existed to the diagnosis they most likely rate.
+
+    That is the latest rated diagnosis of the same user and model made
+    before the rating and not yet linked to another rating, the pairing
+    the reports relied on before. Run after the modelId backfill above.
+    """
+    from sqlalchemy import select
+    from models import db, DiagnosisResult, ModelRating
+
+    rating_ids = [ratingId for (ratingId,) in db.session.query(ModelRating.ratingId).filter(
+        ModelRating.resultId.is_(None)
+    ).order_by(ModelRating.createdAt, ModelRating.ratingId)]
+    if not rating_ids:
+        click.echo("No ratings to backfill.")
+        return
+
+    linked_results = select(ModelRating.resultId).where(ModelRating.resultId.isnot(None))
+    linked = 0
+    for start in range(0, len(rating_ids), batch_size):
+        chunk = rating_ids[start:start + batch_size]
+        ratings = {rating.ratingId: rating for rating in ModelRating.query.filter(ModelRating.ratingId.in_(chunk))}
+        for ratingId in chunk:
+            rating = ratings[ratingId]
+            candidates = DiagnosisResult.query.filter(
+                DiagnosisResult.userId == rating.userId,
+                DiagnosisResult.modelId == rating.modelId,
+                DiagnosisResult.rated.is_(True),
+                # Ratings linked earlier in this chunk are flushed before the query runs
+                DiagnosisResult.resultId.notin_(linked_results)
+            )
+            if rating.createdAt is not None:
+                candidates = candidates.filter(DiagnosisResult.date <= rating.createdAt)
+            diagnosis = candidates.order_by(DiagnosisResult.date.desc(), DiagnosisResult.resultId.desc()).first()
+            if diagnosis is not None:
+                rating.resultId = diagnosis.resultId
+                linked += 1
+        db.session.commit()
+        click.echo(f"Backfilled {min(len(rating_ids), start + batch_size)} of {len(rating_ids)} ratings.")
+
+    click.echo(f"Done; linked {linked} ratings, {len(rating_ids) - linked} have no matching diagnosis.")
+
+
 # Register the CLI with the Flask app
 def register_cli(app):
     app.cli.add_command(cli)
+    app.cli.add_command(model_cli)
 
 
 if __name__ == "__main__":
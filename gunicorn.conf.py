@@ -0,0 +1,8 @@
+"""Gunicorn settings; picked up automatically from the working directory."""
+
+
+def post_worker_init(worker):
+    # Load and warm up the model in the background so /api/v1/predict/ready
+    # only reports ready once the first upload will hit hot weights
+    from routes.prediction_route.prediction import inference_warmup
+    inference_warmup.start(worker.wsgi)
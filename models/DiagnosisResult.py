@@ -1,13 +1,19 @@
+import uuid
 from models import db
 
 class DiagnosisResult(db.Model):
     __tablename__ = 'diagnosis_results'
     resultId = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # Assigned before the row is written so clients can refer to a diagnosis that is still being saved
+    diagnosisId = db.Column(db.String(36), unique=True, index=True, default=lambda: str(uuid.uuid4()))
     userId = db.Column(db.Integer, db.ForeignKey('users.userId'), nullable=False)
     diseaseId = db.Column(db.Integer, db.ForeignKey('diseases.diseaseId'), nullable=True)
     districtId = db.Column(db.Integer, db.ForeignKey('districts.districtId'), nullable=True)  # New field
     date = db.Column(db.DateTime, nullable=False)
     modelVersion = db.Column(db.Text)
+    # The model version that produced the diagnosis; joins on this instead of the version text
+    modelId = db.Column(db.String(36), db.ForeignKey('model_versions.modelId'), nullable=True, index=True)
+    inferenceBackend = db.Column(db.String(20), nullable=True)  # eager, frozen, quantized, channels_last
     image_path = db.Column(db.Text)
     detected = db.Column(db.Boolean)
     rated = db.Column(db.Boolean, default=False)
@@ -0,0 +1,26 @@
+from models import db
+from datetime import datetime
+
+class ModelDelta(db.Model):
+    """A binary patch that turns an earlier model file into a newer version's file"""
+    __tablename__ = 'model_deltas'
+
+    deltaId = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    fromModelId = db.Column(db.String(36), db.ForeignKey('model_versions.modelId'), nullable=False)
+    toModelId = db.Column(db.String(36), db.ForeignKey('model_versions.modelId'), nullable=False, index=True)
+    fromHash = db.Column(db.String(64), nullable=False, index=True)  # fileHash the client must already have
+    patchHash = db.Column(db.String(64), nullable=False)  # sha256 of the patch file itself
+    patchSize = db.Column(db.Integer, nullable=False)  # Size in bytes
+    filePath = db.Column(db.String(255), nullable=False)  # Relative to MODEL_STORAGE
+    createdAt = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "deltaId": self.deltaId,
+            "fromModelId": self.fromModelId,
+            "toModelId": self.toModelId,
+            "fromHash": self.fromHash,
+            "patchHash": self.patchHash,
+            "patchSize": self.patchSize,
+            "createdAt": self.createdAt.isoformat() if self.createdAt else None
+        }
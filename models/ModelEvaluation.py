@@ -0,0 +1,36 @@
+import json
+from models import db
+from datetime import datetime
+
+class ModelEvaluation(db.Model):
+    """Stores the result of evaluating a model version against a labeled image set"""
+    __tablename__ = 'model_evaluations'
+
+    evaluationId = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    modelId = db.Column(db.String(36), db.ForeignKey('model_versions.modelId'), nullable=False, index=True)
+    datasetPath = db.Column(db.String(255), nullable=False)
+    imageCount = db.Column(db.Integer, nullable=False)
+    accuracy = db.Column(db.Float, nullable=True)
+    backend = db.Column(db.String(20), nullable=True)  # Inference backend the evaluation ran on
+    confusionMatrix = db.Column(db.Text, nullable=True)  # JSON {"labels": [...], "matrix": [[...]]}
+    perClass = db.Column(db.Text, nullable=True)  # JSON label -> support/correct/precision/recall
+    latency = db.Column(db.Text, nullable=True)  # JSON decode/forward/total percentiles in ms
+    throughput = db.Column(db.Float, nullable=True)  # Images per second over the whole run
+    workers = db.Column(db.Integer, nullable=True)
+    createdAt = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "evaluationId": self.evaluationId,
+            "modelId": self.modelId,
+            "datasetPath": self.datasetPath,
+            "imageCount": self.imageCount,
+            "accuracy": self.accuracy,
+            "backend": self.backend,
+            "confusionMatrix": json.loads(self.confusionMatrix) if self.confusionMatrix else None,
+            "perClass": json.loads(self.perClass) if self.perClass else None,
+            "latency": json.loads(self.latency) if self.latency else None,
+            "throughput": self.throughput,
+            "workers": self.workers,
+            "createdAt": self.createdAt.isoformat() if self.createdAt else None
+        }
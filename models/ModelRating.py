@@ -4,10 +4,14 @@ from datetime import datetime
 class ModelRating(db.Model):
     """Stores user ratings for specific model versions"""
     __tablename__ = 'model_ratings'
+    # Newest-first keyset pages of one model's ratings
+    __table_args__ = (db.Index('ix_model_ratings_model_rating', 'modelId', 'ratingId'),)
     
     ratingId = db.Column(db.Integer, primary_key=True, autoincrement=True)
     modelId = db.Column(db.String(36), db.ForeignKey('model_versions.modelId'), nullable=False)
     userId = db.Column(db.Integer, db.ForeignKey('users.userId'), nullable=False)
+    # The diagnosis being rated; reports join ratings to diagnoses through it (NULL on older ratings)
+    resultId = db.Column(db.Integer, db.ForeignKey('diagnosis_results.resultId'), nullable=True, index=True)
     rating = db.Column(db.Integer, nullable=False)  # 1-5 stars
     feedback = db.Column(db.Text, nullable=True)
     diagnosisCorrect = db.Column(db.Boolean, nullable=True)
@@ -18,6 +22,7 @@ class ModelRating(db.Model):
             "ratingId": self.ratingId,
             "modelId": self.modelId,
             "userId": self.userId,
+            "resultId": self.resultId,
             "rating": self.rating,
             "feedback": self.feedback,
             "diagnosisCorrect": self.diagnosisCorrect,
@@ -0,0 +1,113 @@
+from models import db
+from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+
+STARS = (1, 2, 3, 4, 5)
+
+class ModelRatingStats(db.Model):
+    """Running totals of the ratings of one model version, updated with each new rating"""
+    __tablename__ = 'model_rating_stats'
+
+    modelId = db.Column(db.String(36), db.ForeignKey('model_versions.modelId'), primary_key=True)
+    ratingCount = db.Column(db.Integer, nullable=False, default=0)
+    ratingSum = db.Column(db.Integer, nullable=False, default=0)
+    stars1 = db.Column(db.Integer, nullable=False, default=0)
+    stars2 = db.Column(db.Integer, nullable=False, default=0)
+    stars3 = db.Column(db.Integer, nullable=False, default=0)
+    stars4 = db.Column(db.Integer, nullable=False, default=0)
+    stars5 = db.Column(db.Integer, nullable=False, default=0)
+    correctCount = db.Column(db.Integer, nullable=False, default=0)  # diagnosisCorrect == True
+    incorrectCount = db.Column(db.Integer, nullable=False, default=0)  # diagnosisCorrect == False
+    updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def record(cls, modelId, rating, diagnosisCorrect=None):
+        """Add one rating to the totals of ``modelId`` as part of the caller's transaction.
+
+        The counters are incremented in SQL, so concurrent ratings never
+        overwrite each other's totals. The new ModelRating must already be in
+        the session: a model's first totals row is computed from its stored
+        ratings, so ratings from before the table existed are counted too.
+        """
+        increments = {
+            cls.ratingCount: cls.ratingCount + 1,
+            cls.ratingSum: cls.ratingSum + rating,
+            getattr(cls, f'stars{rating}'): getattr(cls, f'stars{rating}') + 1,
+        }
+        if diagnosisCorrect is True:
+            increments[cls.correctCount] = cls.correctCount + 1
+        elif diagnosisCorrect is False:
+            increments[cls.incorrectCount] = cls.incorrectCount + 1
+
+        if cls.query.filter_by(modelId=modelId).update(increments, synchronize_session=False):
+            return
+        db.session.flush()
+        try:
+            # No totals yet for this model; another request may be creating the row too
+            with db.session.begin_nested():
+                db.session.add(cls.compute([modelId])[modelId])
+        except IntegrityError:
+            cls.query.filter_by(modelId=modelId).update(increments, synchronize_session=False)
+
+    @classmethod
+    def compute(cls, modelIds=None):
+        """Totals aggregated from the stored ratings as unsaved rows, ``{modelId: stats}``, in one query.
+
+        Every id in ``modelIds`` gets an entry, zero if it has no ratings;
+        without ``modelIds`` only models that have ratings are returned.
+        """
+        from models import ModelRating
+
+        query = db.session.query(
+            ModelRating.modelId,
+            func.count(ModelRating.ratingId),
+            func.coalesce(func.sum(ModelRating.rating), 0),
+            func.sum(case((ModelRating.diagnosisCorrect == True, 1), else_=0)),
+            func.sum(case((ModelRating.diagnosisCorrect == False, 1), else_=0)),
+            *[func.sum(case((ModelRating.rating == star, 1), else_=0)) for star in STARS]
+        ).group_by(ModelRating.modelId)
+        if modelIds is not None:
+            query = query.filter(ModelRating.modelId.in_(modelIds))
+
+        totals = {model_id: cls._zero(model_id) for model_id in modelIds or ()}
+        for model_id, count, total, correct, incorrect, *stars in query.all():
+            totals[model_id] = cls(
+                modelId=model_id, ratingCount=count, ratingSum=total,
+                correctCount=correct or 0, incorrectCount=incorrect or 0,
+                **{f'stars{star}': stars[star - 1] or 0 for star in STARS}
+            )
+        return totals
+
+    @classmethod
+    def _zero(cls, modelId):
+        return cls(modelId=modelId, ratingCount=0, ratingSum=0, correctCount=0, incorrectCount=0,
+                   **{f'stars{star}': 0 for star in STARS})
+
+    @classmethod
+    def rebuild(cls, modelId=None):
+        """Recompute the totals from the stored ratings (all models, or one); returns the number of models."""
+        totals = cls.compute([modelId] if modelId else None)
+        if modelId and not totals[modelId].ratingCount:
+            totals = {}
+
+        stale = cls.query.filter_by(modelId=modelId) if modelId else cls.query
+        stale.delete(synchronize_session=False)
+        db.session.add_all(totals.values())
+        db.session.commit()
+        return len(totals)
+
+    def to_dict(self):
+        answered = self.correctCount + self.incorrectCount
+        return {
+            "count": self.ratingCount,
+            "mean": self.ratingSum / self.ratingCount if self.ratingCount else None,
+            "histogram": {str(star): getattr(self, f'stars{star}') for star in STARS},
+            # Share of ratings that said whether the diagnosis was right and said yes
+            "diagnosisCorrect": {
+                "correct": self.correctCount,
+                "incorrect": self.incorrectCount,
+                "ratio": self.correctCount / answered if answered else None
+            },
+            "updatedAt": self.updatedAt.isoformat() if self.updatedAt else None
+        }
@@ -1,3 +1,4 @@
+import json
 import uuid
 from models import db
 from datetime import datetime
@@ -11,6 +12,9 @@ class ModelVersion(db.Model):
     fileSize = db.Column(db.Integer, nullable=False)  # Size in KB
     fileHash = db.Column(db.String(64), nullable=False)  # For integrity verification
     filePath = db.Column(db.String(255), nullable=False)
+    classNames = db.Column(db.Text, nullable=True)  # JSON list mapping output index -> label
+    role = db.Column(db.String(20), nullable=False, default='classifier', server_default='classifier')  # classifier, router or disease
+    crop = db.Column(db.String(50), nullable=True)  # Crop a disease-role model diagnoses
     
     accuracy = db.Column(db.Float, nullable=True)
     releaseDate = db.Column(db.DateTime, default=datetime.utcnow)
@@ -19,6 +23,7 @@ class ModelVersion(db.Model):
     
     # Relationships
     ratings = db.relationship('ModelRating', backref='model', lazy=True)
+    evaluations = db.relationship('ModelEvaluation', backref='model', lazy=True)
     
     def to_dict(self):
         return {
@@ -26,6 +31,9 @@ class ModelVersion(db.Model):
             "version": self.version,
             "fileSize": self.fileSize,
             "fileHash": self.fileHash,
+            "classNames": json.loads(self.classNames) if self.classNames else None,
+            "role": self.role,
+            "crop": self.crop,
             "accuracy": self.accuracy,
             "releaseDate": self.releaseDate.isoformat(),
             "isActive": self.isActive
@@ -18,4 +18,7 @@ from .PostLike import PostLike
 from .provincesAndDistrictsDataSeed import seed_provinces_and_districts
 from .Explore import Explore, ExploreType
 from .ModelVersion import ModelVersion
-from .ModelRating import ModelRating
\ No newline at end of file
+from .ModelRating import ModelRating
+from .ModelRatingStats import ModelRatingStats
+from .ModelEvaluation import ModelEvaluation
+from .ModelDelta import ModelDelta
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import jsonify, request
 from flask_restful import Resource, abort
 from models import db, Crop
+from routes.prediction_route.catalog import prediction_catalog
 import cloudinary.uploader
 
 # Allowed extensions for images
@@ -79,6 +80,7 @@ class CropResource(Resource):
         )
         db.session.add(new_crop)
         db.session.commit()
+        prediction_catalog.invalidate()
 
         return {"message": "Crop created successfully.", "crop_id": new_crop.cropId}, 201
 
@@ -127,6 +129,7 @@ class CropResource(Resource):
             crop.images = ",".join(images)  # Replace all images
 
         db.session.commit()
+        prediction_catalog.invalidate()
         return {"message": "Crop updated successfully."}, 200
 
     def patch(self):
@@ -173,6 +176,7 @@ class CropResource(Resource):
             crop.images = ",".join(new_images)
 
         db.session.commit()
+        prediction_catalog.invalidate()
         return {"message": "Crop partially updated successfully."}, 200
     
     def delete(self):
@@ -185,5 +189,6 @@ class CropResource(Resource):
         # Delete the crop record from the database
         db.session.delete(crop)
         db.session.commit()
+        prediction_catalog.invalidate()
         
         return {"message": "Crop deleted successfully."}, 200
\ No newline at end of file
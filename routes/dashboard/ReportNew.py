@@ -548,19 +548,35 @@ class ReportNew(Resource):
             } for item in detection_ratio_query
         ]
         
-        # Model version performance
+        model_performance_data = self._model_performance(start_date, end_date)
+        
+        return {
+            'common_diseases': common_diseases_data,
+            'disease_trends': disease_trends_data,
+            'detection_ratio': detection_ratio_data,
+            'model_performance': model_performance_data
+        }
+    
+    def _model_performance(self, start_date, end_date):
+        """Diagnoses, ratings and accuracy per model version for diagnoses made in the window."""
+        # Model version performance. Ratings are joined through the diagnoses in the window
+        # (a diagnosis is rated at most once), so correct_count is a subset of rated_count.
+        # Rows without a modelId (not yet backfilled, or the bundled default model) keep their version text
+        version = func.coalesce(ModelVersion.version, DiagnosisResult.modelVersion)
         model_performance_query = db.session.query(
-            DiagnosisResult.modelVersion,
+            version.label('modelVersion'),
             func.count(DiagnosisResult.resultId).label('total'),
             func.sum(case((DiagnosisResult.rated == True, 1), else_=0)).label('rated_count'),
             func.sum(case((ModelRating.diagnosisCorrect == True, 1), else_=0)).label('correct_count')
         ).outerjoin(
-            ModelRating, ModelRating.modelId == DiagnosisResult.modelVersion
+            ModelVersion, ModelVersion.modelId == DiagnosisResult.modelId
+        ).outerjoin(
+            ModelRating, ModelRating.resultId == DiagnosisResult.resultId
         ).filter(
             DiagnosisResult.date.between(start_date, end_date)
-        ).group_by(DiagnosisResult.modelVersion).all()
+        ).group_by(version).all()
         
-        model_performance_data = [
+        return [
             {
                 'version': item.modelVersion,
                 'total_diagnoses': item.total,
@@ -569,13 +585,6 @@ class ReportNew(Resource):
                 'accuracy_pct': (item.correct_count / item.rated_count) * 100 if item.rated_count > 0 else 0
             } for item in model_performance_query
         ]
-        
-        return {
-            'common_diseases': common_diseases_data,
-            'disease_trends': disease_trends_data,
-            'detection_ratio': detection_ratio_data,
-            'model_performance': model_performance_data
-        }
     
     def _generate_crop_monitoring_report(self, start_date, end_date):
         """Generate crop monitoring and vulnerability report data."""
@@ -3,6 +3,7 @@ from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_restful import Resource, abort
 from models import db, DiagnosisResult, Disease, District, User
+from routes.prediction_route.persistence import diagnosis_writer
 import cloudinary.uploader
 
 
@@ -157,13 +158,35 @@ class UserDiagnosisResultsResource(Resource):
             return {"message": "User not found."}, 404
 
         results = DiagnosisResult.query.filter_by(userId=user_id).all()
+        saved = {result.diagnosisId for result in results}
+
+        # Diagnoses from the last few moments may still be on their way to the database
+        pending = [job for job in diagnosis_writer.pending_for_user(user_id) if job["diagnosisId"] not in saved]
         return jsonify({
-            "data": [self.serialize_result(result) for result in results]
+            "data": [self.serialize_pending(job) for job in pending] + [self.serialize_result(result) for result in results]
         })
 
+    def serialize_pending(self, job):
+        disease = Disease.query.get(job["diseaseId"]) if job["diseaseId"] else None
+        return {
+            "resultId": None,
+            "diagnosisId": job["diagnosisId"],
+            "userId": job["userId"],
+            "disease": disease.serialize() if disease else None,
+            "district": None,
+            "date": job["date"],
+            "image_path": job["image_path"],
+            "detected": True,
+            "model_version": job["model_version"],
+            "inference_backend": job["inference_backend"],
+            "rated": False,
+            "pending": True
+        }
+
     def serialize_result(self, result):
         return {
             "resultId": result.resultId,
+            "diagnosisId": result.diagnosisId,
             "userId": result.userId,
             "disease": result.disease.serialize() if result.disease else None,
             "district": {
@@ -174,5 +197,7 @@ class UserDiagnosisResultsResource(Resource):
             "image_path": result.image_path,
             "detected": result.detected,
             "model_version": result.modelVersion if result.modelVersion else '1.0.0',
-            "rated": result.rated
+            "inference_backend": result.inferenceBackend,
+            "rated": result.rated,
+            "pending": False
         }
@@ -4,6 +4,7 @@ import logging
 from flask import jsonify, request
 from flask_restful import Resource, abort
 from models import Crop, db, Disease
+from routes.prediction_route.catalog import prediction_catalog
 # Keep the import for future reference
 import cloudinary.uploader
 from dotenv import load_dotenv
@@ -159,6 +160,7 @@ class DiseaseResource(Resource):
         )
         db.session.add(new_disease)
         db.session.commit()
+        prediction_catalog.invalidate()
 
         return {"message": "Disease created successfully.", "disease_id": new_disease.diseaseId}, 201
 
@@ -230,6 +232,7 @@ class DiseaseResource(Resource):
             disease.images = ",".join(images)  # Replace all images
 
         db.session.commit()
+        prediction_catalog.invalidate()
         return {"message": "Disease updated successfully."}, 200
 
     def patch(self):
@@ -304,6 +307,7 @@ class DiseaseResource(Resource):
             disease.images = ",".join(all_images)
 
         db.session.commit()
+        prediction_catalog.invalidate()
         return {"message": "Disease partially updated successfully."}, 200
     
     def delete(self):
@@ -331,5 +335,6 @@ class DiseaseResource(Resource):
         # Delete the disease record from the database
         db.session.delete(disease)
         db.session.commit()
+        prediction_catalog.invalidate()
         
         return {"message": "Disease deleted successfully."}, 200
\ No newline at end of file
@@ -5,9 +5,14 @@ modelsBlueprint = Blueprint("models", __name__, url_prefix="/api/v1/models")
 modelsApi = Api(modelsBlueprint)
 
 
-from .modelResource import LatestModelResource, DownloadModelResource, RateModelResource, AdminModelResource
+from .modelResource import LatestModelResource, DownloadModelResource, RateModelResource, AdminModelResource, AdminModelActivateResource, AdminModelShadowResource, AdminModelUploadResource, AdminModelUploadChunkResource, AdminModelRatingsResource
 
 modelsApi.add_resource(LatestModelResource, '/latest')
 modelsApi.add_resource(DownloadModelResource, '/<string:model_id>/download')
 modelsApi.add_resource(RateModelResource, '/ratings')
-modelsApi.add_resource(AdminModelResource, '/admin')
\ No newline at end of file
+modelsApi.add_resource(AdminModelResource, '/admin')
+modelsApi.add_resource(AdminModelActivateResource, '/admin/<string:model_id>/activate')
+modelsApi.add_resource(AdminModelShadowResource, '/admin/<string:model_id>/shadow')
+modelsApi.add_resource(AdminModelRatingsResource, '/admin/<string:model_id>/ratings')
+modelsApi.add_resource(AdminModelUploadResource, '/admin/uploads')
+modelsApi.add_resource(AdminModelUploadChunkResource, '/admin/uploads/<string:upload_id>')
\ No newline at end of file
@@ -0,0 +1,127 @@
+import hashlib
+import logging
+import os
+import threading
+
+from flask import current_app
+from models import db, ModelDelta, ModelVersion
+from routes.prediction_route.config import MODEL_DELTA_MAX_SOURCES
+from routes.prediction_route.pool import _eventlet_patched
+
+logger = logging.getLogger(__name__)
+
+DELTA_FORMAT = 'bsdiff4'
+DELTA_DIR = 'deltas'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _diff(source_path, target_path, patch_path):
+    # Imported here so serving processes that never build deltas do not need it
+    import bsdiff4
+
+    bsdiff4.file_diff(source_path, target_path, patch_path)
+
+
+def _run_native(fn, *args):
+    # Diffing is CPU-bound; under eventlet run it on a native thread so the hub keeps serving.
+    # Not inference_pool.run: that would import and configure torch for a pure file operation
+    if _eventlet_patched():
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
+
+def build_deltas(model, storage, max_sources=MODEL_DELTA_MAX_SOURCES):
+    """Precompute patches from earlier versions of the same role to ``model``; returns the new ModelDelta rows.
+
+    One patch is built per distinct earlier file, newest first, up to
+    ``max_sources`` (0 = all). Patches that already exist, sources whose
+    file is missing or identical, and patches that are not smaller than the
+    model file itself are skipped: those clients download the full file.
+    """
+    target_path = os.path.join(storage, model.filePath)
+    target_size = os.path.getsize(target_path)
+
+    sources = ModelVersion.query.filter(
+        ModelVersion.modelId != model.modelId,
+        ModelVersion.role == model.role,
+        ModelVersion.fileHash != model.fileHash,
+        ModelVersion.releaseDate <= model.releaseDate
+    ).order_by(ModelVersion.releaseDate.desc()).all()
+    existing = {delta.fromHash for delta in ModelDelta.query.filter_by(toModelId=model.modelId)}
+
+    seen, created = set(existing), []
+    for source in sources:
+        if max_sources and len(seen) - len(existing) >= max_sources:
+            break
+        if source.fileHash in seen:
+            continue
+        seen.add(source.fileHash)
+
+        source_path = os.path.join(storage, source.filePath)
+        if not os.path.exists(source_path):
+            continue
+
+        relative_path = os.path.join(DELTA_DIR, model.modelId, f"{source.fileHash}.{DELTA_FORMAT}")
+        patch_path = os.path.join(storage, relative_path)
+        partial_path = patch_path + '.tmp'
+        os.makedirs(os.path.dirname(patch_path), exist_ok=True)
+        try:
+            _run_native(_diff, source_path, target_path, partial_path)
+        except Exception as e:
+            logger.error(f"Failed to diff model {source.version} -> {model.version}: {str(e)}")
+            if os.path.exists(partial_path): os.remove(partial_path)
+            continue
+
+        patch_size = os.path.getsize(partial_path)
+        if patch_size >= target_size:
+            os.remove(partial_path)
+            continue
+        os.replace(partial_path, patch_path)
+
+        delta = ModelDelta(
+            fromModelId=source.modelId,
+            toModelId=model.modelId,
+            fromHash=source.fileHash,
+            patchHash=file_sha256(patch_path),
+            patchSize=patch_size,
+            filePath=relative_path
+        )
+        db.session.add(delta)
+        db.session.commit()
+        created.append(delta)
+    return created
+
+
+def build_deltas_async(model):
+    """Build the patches to ``model`` in the background; uploads return without waiting for them."""
+    app = current_app._get_current_object()
+    model_id, storage = model.modelId, app.config['MODEL_STORAGE']
+
+    def run():
+        with app.app_context():
+            try:
+                model = db.session.get(ModelVersion, model_id)
+                created = build_deltas(model, storage)
+                logger.info(f"Built {len(created)} delta(s) to model {model.version}")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to build deltas to model {model_id}: {str(e)}")
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name="model-delta-builder", daemon=True).start()
+
+
+def find_delta(model, from_hash):
+    """The smallest stored patch from a file hashing to ``from_hash`` to ``model``, or None."""
+    if not from_hash or from_hash == model.fileHash:
+        return None
+    return ModelDelta.query.filter_by(toModelId=model.modelId, fromHash=from_hash).order_by(ModelDelta.patchSize).first()
@@ -0,0 +1,100 @@
+import gzip
+import logging
+import os
+import shutil
+import threading
+
+from flask import current_app
+from routes.prediction_route.config import MODEL_GZIP_LEVEL, MODEL_ZSTD_LEVEL
+from .deltas import _run_native
+
+logger = logging.getLogger(__name__)
+
+# Content-Encoding -> file suffix, best first when the client accepts several equally
+ENCODINGS = (('zstd', '.zst'), ('gzip', '.gz'))
+
+
+def encoded_path(file_path, encoding):
+    return file_path + dict(ENCODINGS)[encoding]
+
+
+def encoding_etag(file_hash, encoding):
+    # Compression is deterministic, so the file hash plus the encoding identifies the bytes
+    return f"{file_hash}-{encoding}"
+
+
+def _compress_gzip(source, target):
+    # mtime=0 and no embedded name keep the output byte-identical across runs
+    with open(source, 'rb') as src, open(target, 'wb') as raw, \
+            gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=MODEL_GZIP_LEVEL, mtime=0) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def _compress_zstd(source, target):
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=MODEL_ZSTD_LEVEL, write_content_size=True)
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        compressor.copy_stream(src, dst, size=os.path.getsize(source))
+
+
+COMPRESSORS = {'zstd': _compress_zstd, 'gzip': _compress_gzip}
+
+
+def compress_model_file(file_path):
+    """Write every encoded copy of ``file_path`` that does not exist yet; returns ``{encoding: size}``.
+
+    Copies are written under a temporary name and renamed, so a copy that
+    exists is always complete. Copies that are not smaller than the file
+    are dropped; downloads then fall back to the raw file.
+    """
+    raw_size = os.path.getsize(file_path)
+    sizes = {}
+    for encoding, _ in ENCODINGS:
+        target = encoded_path(file_path, encoding)
+        if os.path.exists(target):
+            sizes[encoding] = os.path.getsize(target)
+            continue
+        try:
+            _run_native(COMPRESSORS[encoding], file_path, target + '.tmp')
+        except ImportError as e:
+            logger.warning(f"Skipping {encoding} copy of {file_path}: {str(e)}")
+            continue
+        except Exception as e:
+            logger.error(f"Failed to write {encoding} copy of {file_path}: {str(e)}")
+            if os.path.exists(target + '.tmp'): os.remove(target + '.tmp')
+            continue
+
+        size = os.path.getsize(target + '.tmp')
+        if size >= raw_size:
+            os.remove(target + '.tmp')
+            continue
+        os.replace(target + '.tmp', target)
+        sizes[encoding] = size
+    return sizes
+
+
+def compress_model_file_async(model):
+    """Compress ``model``'s file in the background; until a copy is ready downloads send the raw file."""
+    file_path = os.path.join(current_app.config['MODEL_STORAGE'], model.filePath)
+    version = model.version
+
+    def run():
+        try:
+            sizes = compress_model_file(file_path)
+            logger.info(f"Compressed model {version}: {sizes}")
+        except Exception as e:
+            logger.error(f"Failed to compress model {version}: {str(e)}")
+
+    threading.Thread(target=run, name="model-compressor", daemon=True).start()
+
+
+def negotiate_encoding(accept_encodings, file_path):
+    """The stored encoding of ``file_path`` the client prefers, as ``(encoding, path)``, or None for the raw file."""
+    best, best_quality = None, 0
+    for encoding, _ in ENCODINGS:
+        quality = accept_encodings[encoding]
+        path = encoded_path(file_path, encoding)
+        if quality > best_quality and os.path.exists(path):
+            best, best_quality = (encoding, path), quality
+    return best
@@ -1,40 +1,175 @@
 from flask import request, send_file, current_app
 from flask_restful import Resource, abort
-from models import DiagnosisResult, db, ModelVersion, ModelRating
+from models import DiagnosisResult, db, ModelVersion, ModelRating, ModelRatingStats, ModelEvaluation
+from models.ModelRatingStats import STARS
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import hashlib, os
+from routes.prediction_route.cascade import MODEL_ROLES, ROLE_CLASSIFIER, ROLE_DISEASE
+from routes.prediction_route.catalog import prediction_catalog
+from routes.prediction_route.config import (
+    BENCHMARK_GATE, BENCHMARK_GATE_RUNS, BENCHMARK_GATE_TIMEOUT, BENCHMARK_LATENCY_TOLERANCE, BENCHMARK_RSS_TOLERANCE,
+    BENCHMARK_THROUGHPUT_TOLERANCE, MODEL_COMPRESSION_ENABLED, MODEL_DELTA_ENABLED, MODEL_UPLOAD_CHUNK_SIZE,
+    MODEL_UPLOAD_MAX_SIZE, MODEL_UPLOAD_TTL_HOURS
+)
+from routes.prediction_route.persistence import diagnosis_writer
+from routes.prediction_route.prediction import decode_and_transform, shadow_evaluator
+from routes.prediction_route.registry import model_registry, parse_class_names
+from routes.prediction_route.telemetry import inference_telemetry
+from .deltas import DELTA_FORMAT, build_deltas_async, find_delta
+from .encodings import compress_model_file_async, encoding_etag, negotiate_encoding
+from .uploads import (
+    create_upload, discard_upload, expire_uploads, finalize_upload, load_upload, restore_upload, save_stream, write_chunk
+)
+from sqlalchemy import func
+from werkzeug.http import parse_content_range_header
+import json, os, uuid
 
 
 
+# Model files are immutable per version, so clients can keep them for a year
+MODEL_DOWNLOAD_MAX_AGE = 365 * 24 * 60 * 60
+RATINGS_PAGE_SIZE = 50
+RATINGS_MAX_PAGE_SIZE = 200
+
 def is_admin():
     claims = get_jwt_identity()
     return claims.get('role') == 'admin'
 
+def send_immutable_file(file_path, download_name, etag):
+    """Send a file that never changes under ``etag``; supports If-None-Match (304) and Range/If-Range (206)."""
+    response = send_file(
+        file_path,
+        as_attachment=True,
+        download_name=download_name,
+        etag=etag,
+        conditional=True,
+        max_age=MODEL_DOWNLOAD_MAX_AGE
+    )
+    # Downloads need a token, so only the client itself may cache the file
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    # Werkzeug only advertises ranges on range requests; say so up front so clients know they can resume
+    if response.status_code == 200:
+        response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+def benchmark_candidate(model):
+    """Benchmark ``model`` against the active model before it is activated.
+
+    Each model runs in its own spawned process (see ``benchmark.benchmark_against``),
+    so the gate neither competes with live predictions for the inference
+    pool nor mixes the two models' memory. Returns the comparison, or
+    ``{"passed": False, "error": ...}`` if either model could not be loaded or run.
+    """
+    # Imported here so loading the blueprint does not pull in torch
+    from routes.prediction_route.benchmark import benchmark_against
+
+    if model.role not in (None, ROLE_CLASSIFIER):
+        return {"passed": True, "skipped": f"Benchmark gate only applies to {ROLE_CLASSIFIER} models"}
+
+    active = model_registry.get_active()
+    baseline = db.session.get(ModelVersion, active.modelId) if active is not None and active.modelId else None
+    if baseline is None:
+        return {"passed": True, "skipped": "No active model to compare against"}
+
+    try:
+        comparison = benchmark_against(
+            model_registry.snapshot(baseline), model_registry.snapshot(model),
+            runs=BENCHMARK_GATE_RUNS,
+            timeout=BENCHMARK_GATE_TIMEOUT,
+            latency_tolerance=BENCHMARK_LATENCY_TOLERANCE,
+            throughput_tolerance=BENCHMARK_THROUGHPUT_TOLERANCE,
+            rss_tolerance=BENCHMARK_RSS_TOLERANCE
+        )
+    except Exception as e:
+        current_app.logger.error(f"Benchmark of model {model.version} failed: {str(e)}")
+        return {"passed": False, "error": str(e)}
+    if comparison.get("error"):
+        current_app.logger.error(f"Benchmark of model {model.version} failed: {comparison['error']}")
+
+    # The full reports are large; the response only needs the verdict and deltas
+    comparison.pop("reports", None)
+    return comparison
+
+def activate_model(model, force=False):
+    """Mark ``model`` active and swap it in, unless the benchmark gate blocks it.
+
+    Returns ``(activated, benchmark)``; ``benchmark`` is None when the gate
+    did not run.
+    """
+    benchmark = None
+    if BENCHMARK_GATE in ('block', 'warn') and not force:
+        benchmark = benchmark_candidate(model)
+        if not benchmark["passed"] and BENCHMARK_GATE == 'block':
+            return False, benchmark
+
+    model.isActive = True
+    db.session.commit()
+
+    # Load and warm the new weights in the background, then swap them in
+    model_registry.activate_async(model)
+    prediction_catalog.invalidate(labels=parse_class_names(model.classNames), crop=model.crop)
+    return True, benchmark
+
 class LatestModelResource(Resource):
     @jwt_required()
     def get(self):
         
-        model = ModelVersion.query.filter_by(isActive=True).order_by(ModelVersion.releaseDate.desc()).first()
+        # Cascade stages are server-side only; clients download the single-stage classifier
+        model = ModelVersion.query.filter_by(isActive=True, role=ROLE_CLASSIFIER).order_by(ModelVersion.releaseDate.desc()).first()
         if not model:
             abort(404, message="No active model found.")
-        return {"model": model.to_dict()}, 200
+
+        # Clients that report the file they already have learn whether a patch is available
+        delta = find_delta(model, request.args.get('fromHash'))
+        return {
+            "model": model.to_dict(),
+            "delta": {**delta.to_dict(), "format": DELTA_FORMAT} if delta else None
+        }, 200
 
 
 class DownloadModelResource(Resource):
     @jwt_required()
     def get(self, model_id):
-        
+        """Download a model file, or with ``fromHash`` the patch from that file when one exists.
+
+        Patches are sent with X-Delta-From and X-Model-Hash (the sha256 the
+        patched file must have); without a patch the full file is sent,
+        zstd- or gzip-encoded when the client accepts it.
+        """
         model = ModelVersion.query.get_or_404(model_id)
-        file_path = os.path.join(current_app.config['MODEL_STORAGE'], model.filePath)
+        storage = current_app.config['MODEL_STORAGE']
+
+        delta = find_delta(model, request.args.get('fromHash'))
+        if delta and os.path.exists(os.path.join(storage, delta.filePath)):
+            response = send_immutable_file(
+                os.path.join(storage, delta.filePath),
+                f"plant_disease_model_v{model.version}.{DELTA_FORMAT}",
+                delta.patchHash
+            )
+            response.headers['X-Delta-Format'] = DELTA_FORMAT
+            response.headers['X-Delta-From'] = delta.fromHash
+            response.headers['X-Model-Hash'] = model.fileHash
+            return response
+
+        file_path = os.path.join(storage, model.filePath)
         if not os.path.exists(file_path):
             abort(404, message="Model file not found.")
 
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=f"plant_disease_model_v{model.version}.pt"
-        )
+        # A version's file never changes, so its content hash is a strong ETag.
+        # Compressed copies were written at upload; each encoding gets its own ETag
+        download_name = f"plant_disease_model_v{model.version}.pt"
+        encoded = negotiate_encoding(request.accept_encodings, file_path)
+        if encoded:
+            encoding, encoded_path = encoded
+            response = send_immutable_file(encoded_path, download_name, encoding_etag(model.fileHash, encoding))
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_immutable_file(file_path, download_name, model.fileHash)
+        response.vary.add('Accept-Encoding')
+        response.headers['X-Model-Hash'] = model.fileHash
+        return response
 
 class RateModelResource(Resource):
     @jwt_required()
@@ -45,12 +180,32 @@ class RateModelResource(Resource):
         # Get data from request
         data = request.json
         result_id = data.get('resultId')
+        diagnosis_id = data.get('diagnosisId')
         
-        if not result_id:
-            return {"message": "resultId is required"}, 400
+        if not result_id and not diagnosis_id:
+            return {"message": "resultId or diagnosisId is required"}, 400
+
+        # Star counts are kept per value, so only whole stars are accepted
+        try:
+            rating = int(data.get('rating'))
+        except (TypeError, ValueError):
+            rating = None
+        if rating not in STARS:
+            return {"message": "rating must be a whole number of stars from 1 to 5"}, 400
+        diagnosis_correct = data.get('diagnosisCorrect')
+        if diagnosis_correct not in (True, False, None):
+            return {"message": "diagnosisCorrect must be true, false or null"}, 400
         
         # Find the diagnosis result
-        diagnosis_result = DiagnosisResult.query.get_or_404(result_id)
+        if result_id:
+            diagnosis_result = DiagnosisResult.query.get_or_404(result_id)
+        else:
+            diagnosis_result = DiagnosisResult.query.filter_by(diagnosisId=diagnosis_id).first()
+            if not diagnosis_result:
+                # Predictions are stored in the background; the row may not have landed yet
+                if diagnosis_writer.is_pending(diagnosis_id):
+                    return {"message": "This diagnosis is still being saved. Please try again shortly."}, 409, {"Retry-After": "1"}
+                return {"message": "Diagnosis result not found"}, 404
         
         # Check if this result belongs to the current user
         if diagnosis_result.userId != userId:
@@ -60,11 +215,10 @@ class RateModelResource(Resource):
         if diagnosis_result.rated:
             return {"message": "This diagnosis has already been rated"}, 400
         
-        # Get the model version from the result
-        model_version = diagnosis_result.modelVersion
-        
-        # Find the model record by version
-        model = ModelVersion.query.filter_by(version=model_version).first()
+        # Find the model record by key; rows stored before modelId existed fall back to the version text
+        model = db.session.get(ModelVersion, diagnosis_result.modelId) if diagnosis_result.modelId else None
+        if not model:
+            model = ModelVersion.query.filter_by(version=diagnosis_result.modelVersion).first()
         
         # If no matching model found, use the first available model as fallback
         if not model:
@@ -78,14 +232,18 @@ class RateModelResource(Resource):
         new_rating = ModelRating(
             modelId=model.modelId,
             userId=userId,
-            rating=data.get('rating'),
+            resultId=diagnosis_result.resultId,
+            rating=rating,
             feedback=data.get('feedback'),
-            diagnosisCorrect=data.get('diagnosisCorrect'),
+            diagnosisCorrect=diagnosis_correct,
         )
         
         try:
             # Add the rating
             db.session.add(new_rating)
+
+            # Keep the model's running totals in the same transaction
+            ModelRatingStats.record(model.modelId, rating, diagnosis_correct)
             
             # Mark the diagnosis as rated
             diagnosis_result.rated = True
@@ -107,32 +265,58 @@ class AdminModelResource(Resource):
         if not is_admin():
             return {"message": "Admins only: You are not authorized to access this resource."}, 403
         
-        models = ModelVersion.query.order_by(ModelVersion.releaseDate.desc()).all()
+        # Rating totals and the latest evaluation of every model, in one query
+        latest_evaluations = db.session.query(
+            func.max(ModelEvaluation.evaluationId)
+        ).group_by(ModelEvaluation.modelId).scalar_subquery()
+        rows = db.session.query(ModelVersion, ModelRatingStats, ModelEvaluation).outerjoin(
+            ModelRatingStats, ModelRatingStats.modelId == ModelVersion.modelId
+        ).outerjoin(
+            ModelEvaluation, (ModelEvaluation.modelId == ModelVersion.modelId) & ModelEvaluation.evaluationId.in_(latest_evaluations)
+        ).order_by(ModelVersion.releaseDate.desc()).all()
+
+        # Models rated before the totals table existed have no row until their next rating;
+        # aggregate those from the ratings themselves
+        unseeded = [model.modelId for model, stats, _ in rows if stats is None]
+        computed = ModelRatingStats.compute(unseeded) if unseeded else {}
 
         result = []
-        for model in models:
-            ratings = ModelRating.query.filter_by(modelId=model.modelId).all()
+        for model, stats, evaluation in rows:
             result.append({
                 "model": model.to_dict(),
-                "ratings": [r.to_dict() for r in ratings]
+                # Individual ratings: GET /models/admin/<modelId>/ratings
+                "ratingStats": (stats or computed[model.modelId]).to_dict(),
+                # Latest offline evaluation (flask model evaluate), which also sets model.accuracy
+                "evaluation": evaluation.to_dict() if evaluation else None,
+                # Stage latency histograms from this worker's telemetry; None until the version has served
+                "latency": inference_telemetry.summary(model.version)
             })
 
         return {"data": result}, 200
     
     @jwt_required()
     def post(self):
-        """Create a new model version (with .pt + classes.json)"""
+        """Create a new model version (with .pt + classes.json)
+
+        The model file is either sent as ``model_file`` or, for large files,
+        uploaded in chunks beforehand (see AdminModelUploadResource) and
+        referenced by ``uploadId``.
+        """
         if not is_admin():
             return {"message": "Admins only: You are not authorized to perform this action."}, 403
         
         data = request.form
         model_file = request.files.get('model_file')
+        storage = current_app.config['MODEL_STORAGE']
+        upload = load_upload(storage, data['uploadId']) if data.get('uploadId') else None
 
-        if not model_file:
+        if data.get('uploadId') and not upload:
+            return {"message": "Upload not found; it may have expired."}, 404
+        if not model_file and not upload:
             abort(400, message="No model file provided.")
         
         # Check if the file has a .pt extension
-        file_extension = os.path.splitext(model_file.filename)[1].lower()
+        file_extension = os.path.splitext(upload['filename'] if upload else model_file.filename)[1].lower()
         if file_extension != '.pt':
             return {"message": "Invalid file format. Only PyTorch model files (.pt) are accepted."}, 400
 
@@ -144,32 +328,60 @@ class AdminModelResource(Resource):
         if existing_model:
             return {"message": f"A model with version {version} already exists."}, 400
 
+        # Cascade role: a router picks the crop, a disease model diagnoses one crop
+        role = (data.get('role') or ROLE_CLASSIFIER).lower()
+        if role not in MODEL_ROLES:
+            return {"message": f"Invalid role. Expected one of: {', '.join(MODEL_ROLES)}."}, 400
+        crop = (data.get('crop') or '').strip().lower() or None
+        if role == ROLE_DISEASE and not crop:
+            return {"message": "A crop is required for disease models."}, 400
+
+        # Output index -> label mapping, from classes.json or an inline form field
+        classes_file = request.files.get('classes_file')
+        try:
+            if classes_file:
+                class_names = parse_class_names(json.loads(classes_file.read().decode('utf-8')))
+            else:
+                class_names = parse_class_names(data.get('classNames'))
+        except (ValueError, UnicodeDecodeError) as e:
+            return {"message": f"Invalid class names: {str(e)}"}, 400
+
         # Generate file names and paths
         model_filename = f"plant_disease_model_v{version}.pt"
-        model_path = os.path.join(current_app.config['MODEL_STORAGE'], model_filename)
-
-        # Save files
-        model_file.save(model_path)
+        model_path = os.path.join(storage, model_filename)
 
-        # Calculate file sizes and hashes
+        # Both paths hash while the bytes stream to disk. The file is staged next to its
+        # final path and only renamed into place once its ModelVersion row is committed.
+        staging_path = f"{model_path}.{uuid.uuid4().hex}.staging"
         try:
-            model_size = os.path.getsize(model_path) // 1024
-            model_hash = hashlib.sha256(open(model_path, 'rb').read()).hexdigest()
-
+            if upload:
+                model_bytes, model_hash = finalize_upload(storage, upload, staging_path)
+            else:
+                model_bytes, model_hash = save_stream(model_file.stream, staging_path, MODEL_UPLOAD_MAX_SIZE)
+            model_size = model_bytes // 1024
+        except ValueError as e:
+            return {"message": str(e)}, 400
         except Exception as e:
-            # Clean up on error
-            if os.path.exists(model_path): os.remove(model_path)
             abort(500, message=f"Failed to process files: {str(e)}")
 
 
+        # Benchmark before activation unless the gate is off or an admin forces it
+        activate = str(data.get('isActive', True)).lower() not in ('false', '0', 'no')
+        force = str(data.get('force', False)).lower() in ('true', '1', 'yes')
+        gated = activate and BENCHMARK_GATE in ('block', 'warn') and not force
+
         # Save model record
         new_model = ModelVersion(
             version=version,
             fileSize=model_size,
             fileHash=model_hash,
             filePath=model_filename,
+            classNames=json.dumps(class_names) if class_names else None,
+            role=role,
+            crop=crop,
             accuracy=data.get('accuracy'),
-            isActive=data.get('isActive', True)
+            # Stays inactive until the benchmark passes so no worker picks it up early
+            isActive=activate and not gated
         )
 
         try:
@@ -178,11 +390,234 @@ class AdminModelResource(Resource):
         
         except Exception as e:
             db.session.rollback()
+            # A chunked upload can be finalized again with the same uploadId
+            if upload:
+                restore_upload(storage, upload, staging_path)
+            else:
+                os.remove(staging_path)
             return {"message": "An error occurred", "error": str(e)}, 500
 
+        os.replace(staging_path, model_path)
+
+        benchmark = None
+        message = "Model created successfully"
+        if gated:
+            try:
+                activated, benchmark = activate_model(new_model, force=False)
+            except Exception as e:
+                db.session.rollback()
+                return {"message": "An error occurred", "error": str(e)}, 500
+            if not activated:
+                message = f"Model created but not activated: it regressed against the active model. POST /api/v1/models/admin/{new_model.modelId}/activate with force=true to activate anyway."
+        elif new_model.isActive:
+            # Load and warm the new weights in the background, then swap them in
+            model_registry.activate_async(new_model)
+            prediction_catalog.invalidate(labels=class_names, crop=new_model.crop)
+
+        if MODEL_COMPRESSION_ENABLED:
+            compress_model_file_async(new_model)
+        if MODEL_DELTA_ENABLED:
+            # Patches from earlier versions, so updating clients need not fetch the whole file
+            build_deltas_async(new_model)
+
         return {
-            "message": "Model created successfully",
-            "model": new_model.to_dict()
+            "message": message,
+            "model": new_model.to_dict(),
+            "benchmark": benchmark
         }, 201
-        
-        
+
+
+class AdminModelActivateResource(Resource):
+
+    @jwt_required()
+    def post(self, model_id):
+        """Activate an existing model version, subject to the benchmark gate unless forced."""
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to perform this action."}, 403
+
+        model = ModelVersion.query.get_or_404(model_id)
+        data = request.get_json(silent=True) or request.form
+        force = str(data.get('force', False)).lower() in ('true', '1', 'yes')
+
+        try:
+            activated, benchmark = activate_model(model, force=force)
+        except Exception as e:
+            db.session.rollback()
+            return {"message": "An error occurred", "error": str(e)}, 500
+
+        if not activated:
+            return {
+                "message": "Model not activated: it regressed against the active model. Retry with force=true to activate anyway.",
+                "model": model.to_dict(),
+                "benchmark": benchmark
+            }, 409
+
+        return {"message": "Model activated", "model": model.to_dict(), "benchmark": benchmark}, 200
+
+
+class AdminModelShadowResource(Resource):
+
+    @jwt_required()
+    def get(self, model_id):
+        """Agreement and latency of a candidate shadowing live traffic, to back the activation decision."""
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to access this resource."}, 403
+
+        model = ModelVersion.query.get_or_404(model_id)
+        summary = shadow_evaluator.summary(model.modelId)
+        if summary is None:
+            return {"message": "Model is not being shadow evaluated."}, 404
+
+        return {"data": summary, "model": model.to_dict(), "latency": inference_telemetry.summary(model.version)}, 200
+
+    @jwt_required()
+    def post(self, model_id):
+        """Start scoring a sample of live predictions with an inactive classifier."""
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to perform this action."}, 403
+
+        model = ModelVersion.query.get_or_404(model_id)
+        if model.isActive:
+            return {"message": "Model is already active; shadow evaluation is for candidate versions."}, 400
+        if model.role not in (None, ROLE_CLASSIFIER):
+            return {"message": f"Shadow evaluation only applies to {ROLE_CLASSIFIER} models."}, 400
+
+        try:
+            run = shadow_evaluator.start(model)
+        except Exception as e:
+            return {"message": "An error occurred", "error": str(e)}, 500
+
+        return {"message": "Shadow evaluation started", "data": run.summary(shadow_evaluator.sample_rate)}, 202
+
+    @jwt_required()
+    def delete(self, model_id):
+        """Stop shadow evaluation and return its final summary."""
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to perform this action."}, 403
+
+        summary = shadow_evaluator.stop(model_id)
+        if summary is None:
+            return {"message": "Model is not being shadow evaluated."}, 404
+
+        return {"message": "Shadow evaluation stopped", "data": summary}, 200
+
+
+class AdminModelRatingsResource(Resource):
+
+    @jwt_required()
+    def get(self, model_id):
+        """A model's ratings, newest first, in keyset pages.
+
+        ``limit`` (default 50, at most 200) ratings are returned; pass the
+        ``next`` value of a page as ``before`` to get the following one.
+        """
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to access this resource."}, 403
+
+        model = ModelVersion.query.get_or_404(model_id)
+        limit = max(1, min(request.args.get('limit', RATINGS_PAGE_SIZE, type=int), RATINGS_MAX_PAGE_SIZE))
+        before = request.args.get('before', type=int)
+
+        # Seeks on (modelId, ratingId), so deep pages cost the same as the first
+        query = ModelRating.query.filter(ModelRating.modelId == model.modelId)
+        if before is not None:
+            query = query.filter(ModelRating.ratingId < before)
+        ratings = query.order_by(ModelRating.ratingId.desc()).limit(limit + 1).all()
+
+        page = ratings[:limit]
+        stats = db.session.get(ModelRatingStats, model.modelId) or ModelRatingStats.compute([model.modelId])[model.modelId]
+        return {
+            "data": [rating.to_dict() for rating in page],
+            "next": page[-1].ratingId if len(ratings) > limit else None,
+            "stats": stats.to_dict()
+        }, 200
+
+
+def serialize_upload(upload):
+    return {
+        "uploadId": upload['uploadId'],
+        "filename": upload['filename'],
+        "size": upload['size'],
+        "offset": upload['offset'],
+        "chunkSize": MODEL_UPLOAD_CHUNK_SIZE,
+        "complete": upload['size'] is not None and upload['offset'] == upload['size']
+    }
+
+
+class AdminModelUploadResource(Resource):
+
+    @jwt_required()
+    def post(self):
+        """Start a chunked model upload; send the chunks with PUT, then create the model with the uploadId."""
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to perform this action."}, 403
+
+        data = request.get_json(silent=True) or request.form
+        filename = data.get('filename')
+        if not filename or os.path.splitext(filename)[1].lower() != '.pt':
+            return {"message": "Invalid file format. Only PyTorch model files (.pt) are accepted."}, 400
+
+        storage = current_app.config['MODEL_STORAGE']
+        expire_uploads(storage, MODEL_UPLOAD_TTL_HOURS * 3600)
+        try:
+            size = int(data['size']) if data.get('size') is not None else None
+            upload = create_upload(storage, filename, size=size, sha256=data.get('sha256'))
+        except ValueError as e:
+            return {"message": str(e)}, 400
+
+        return {"message": "Upload started", "data": serialize_upload(upload)}, 201
+
+
+class AdminModelUploadChunkResource(Resource):
+
+    @jwt_required()
+    def get(self, upload_id):
+        """How much of the upload was received; an interrupted client resumes from ``offset``."""
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to perform this action."}, 403
+
+        upload = load_upload(current_app.config['MODEL_STORAGE'], upload_id)
+        if not upload:
+            return {"message": "Upload not found; it may have expired."}, 404
+        return {"data": serialize_upload(upload)}, 200
+
+    @jwt_required()
+    def put(self, upload_id):
+        """Append one chunk, sent as the raw body with ``Content-Range: bytes start-end/total``.
+
+        ``start`` must equal the current offset. An optional X-Chunk-Sha256
+        header is checked before the chunk is accepted.
+        """
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to perform this action."}, 403
+
+        storage = current_app.config['MODEL_STORAGE']
+        upload = load_upload(storage, upload_id)
+        if not upload:
+            return {"message": "Upload not found; it may have expired."}, 404
+
+        content_range = parse_content_range_header(request.headers.get('Content-Range'))
+        if content_range is None or request.content_length != content_range.stop - content_range.start:
+            return {"message": "A Content-Range header matching the body length is required."}, 400
+        if content_range.start != upload['offset']:
+            return {"message": f"Expected the chunk at offset {upload['offset']}.", "data": serialize_upload(upload)}, 409
+
+        try:
+            upload = write_chunk(storage, upload, request.stream, request.content_length, request.headers.get('X-Chunk-Sha256'))
+        except ValueError as e:
+            return {"message": str(e)}, 400
+
+        return {"data": serialize_upload(upload)}, 200
+
+    @jwt_required()
+    def delete(self, upload_id):
+        """Abandon an upload and delete what was received."""
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to perform this action."}, 403
+
+        storage = current_app.config['MODEL_STORAGE']
+        upload = load_upload(storage, upload_id)
+        if not upload:
+            return {"message": "Upload not found; it may have expired."}, 404
+        discard_upload(storage, upload['uploadId'])
+        return {"message": "Upload discarded"}, 200
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from routes.prediction_route.config import MODEL_UPLOAD_MAX_SIZE
+
+UPLOAD_DIR = 'uploads'
+# Bytes read from the request per step, so memory stays flat whatever the file size
+READ_SIZE = 1024 * 1024
+
+# uploadId -> (offset, sha256 of the bytes before offset); rebuilt from the part file when missing
+_hashers = {}
+_locks = {}
+_lock = threading.Lock()
+
+
+def _paths(storage, upload_id):
+    base = os.path.join(storage, UPLOAD_DIR, upload_id)
+    return base + '.json', base + '.part'
+
+
+def _write_meta(storage, meta):
+    meta_path, _ = _paths(storage, meta['uploadId'])
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _upload_lock(upload_id):
+    with _lock:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+def copy_stream(stream, f, hashers, length=None):
+    """Copy ``stream`` (up to ``length`` bytes) into ``f`` in READ_SIZE pieces, updating every hasher; returns the byte count."""
+    copied = 0
+    while length is None or copied < length:
+        piece = stream.read(READ_SIZE if length is None else min(READ_SIZE, length - copied))
+        if not piece:
+            break
+        f.write(piece)
+        for hasher in hashers:
+            hasher.update(piece)
+        copied += len(piece)
+    return copied
+
+
+def save_stream(stream, target_path, max_size=MODEL_UPLOAD_MAX_SIZE):
+    """Stream an upload to ``target_path``, hashing it on the way; returns ``(size, sha256)``.
+
+    The file only appears at ``target_path`` (by rename) once it is complete.
+    Raises ValueError, keeping nothing, for a stream longer than ``max_size`` bytes.
+    """
+    hasher = hashlib.sha256()
+    try:
+        with open(target_path + '.tmp', 'wb') as f:
+            # One byte past the limit is enough to tell an oversized upload without reading all of it
+            size = copy_stream(stream, f, [hasher], max_size + 1)
+        if size > max_size:
+            raise ValueError(f"Model file exceeds the maximum size of {max_size} bytes")
+        os.replace(target_path + '.tmp', target_path)
+    finally:
+        if os.path.exists(target_path + '.tmp'): os.remove(target_path + '.tmp')
+    return size, hasher.hexdigest()
+
+
+def create_upload(storage, filename, size=None, sha256=None):
+    """Start a chunked upload; ``size`` and ``sha256`` of the whole file are optional and checked when known."""
+    if size is not None and not 0 < size <= MODEL_UPLOAD_MAX_SIZE:
+        raise ValueError(f"size must be between 1 and {MODEL_UPLOAD_MAX_SIZE} bytes")
+    os.makedirs(os.path.join(storage, UPLOAD_DIR), exist_ok=True)
+
+    meta = {
+        "uploadId": uuid.uuid4().hex,
+        "filename": filename,
+        "size": size,
+        "sha256": sha256.lower() if sha256 else None,
+        "offset": 0,
+        "createdAt": time.time(),
+    }
+    open(_paths(storage, meta['uploadId'])[1], 'wb').close()
+    _write_meta(storage, meta)
+    return meta
+
+
+def load_upload(storage, upload_id):
+    """The metadata of an unfinished upload, or None."""
+    try:
+        upload_id = uuid.UUID(hex=upload_id).hex
+    except ValueError:
+        return None
+    meta_path, _ = _paths(storage, upload_id)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _running_hash(storage, meta):
+    cached = _hashers.get(meta['uploadId'])
+    if cached and cached[0] == meta['offset']:
+        return cached[1]
+
+    # Restarted since the last chunk: hash what was received so far
+    hasher = hashlib.sha256()
+    with open(_paths(storage, meta['uploadId'])[1], 'rb') as f:
+        remaining = meta['offset']
+        while remaining:
+            piece = f.read(min(READ_SIZE, remaining))
+            if not piece:
+                raise ValueError("Upload data is missing; start a new upload")
+            hasher.update(piece)
+            remaining -= len(piece)
+    return hasher
+
+
+def write_chunk(storage, meta, stream, length, chunk_sha256=None):
+    """Append ``length`` bytes from ``stream`` at the upload's offset; returns the updated metadata.
+
+    The offset only advances once the whole chunk is on disk (and matches
+    ``chunk_sha256`` if given), so a chunk cut off mid-way is discarded and
+    the client resumes from the last chunk that was fully received.
+    """
+    upload_id = meta['uploadId']
+    with _upload_lock(upload_id):
+        # Another request may have advanced it while this one waited
+        meta = load_upload(storage, upload_id)
+        if meta is None:
+            raise ValueError("Upload not found")
+        offset = meta['offset']
+        limit = meta['size'] if meta['size'] is not None else MODEL_UPLOAD_MAX_SIZE
+        if offset + length > limit:
+            raise ValueError(f"Chunk would exceed the upload size of {limit} bytes")
+
+        file_hasher = _running_hash(storage, meta).copy()
+        chunk_hasher = hashlib.sha256()
+        _, part_path = _paths(storage, upload_id)
+        with open(part_path, 'r+b') as f:
+            # Drop anything a previous, interrupted chunk left past the offset
+            f.truncate(offset)
+            f.seek(offset)
+            received = copy_stream(stream, f, [file_hasher, chunk_hasher], length)
+            if received == length and (not chunk_sha256 or chunk_hasher.hexdigest() == chunk_sha256.lower()):
+                f.flush()
+                os.fsync(f.fileno())
+            else:
+                f.truncate(offset)
+                if received != length:
+                    raise ValueError(f"Chunk ended after {received} of {length} bytes")
+                raise ValueError("Chunk does not match its checksum")
+
+        meta['offset'] = offset + length
+        _write_meta(storage, meta)
+        _hashers[upload_id] = (meta['offset'], file_hasher)
+        return meta
+
+
+def finalize_upload(storage, meta, target_path):
+    """Move a complete upload to ``target_path`` with an atomic rename; returns ``(size, sha256)``."""
+    upload_id = meta['uploadId']
+    with _upload_lock(upload_id):
+        meta = load_upload(storage, upload_id)
+        if meta is None:
+            raise ValueError("Upload not found")
+        if meta['offset'] == 0 or (meta['size'] is not None and meta['offset'] != meta['size']):
+            raise ValueError(f"Upload is incomplete: {meta['offset']} of {meta['size']} bytes received")
+
+        digest = _running_hash(storage, meta).hexdigest()
+        if meta['sha256'] and digest != meta['sha256']:
+            raise ValueError("Uploaded file does not match the declared sha256")
+
+        meta_path, part_path = _paths(storage, upload_id)
+        os.replace(part_path, target_path)
+        os.remove(meta_path)
+        _forget(upload_id)
+        return meta['offset'], digest
+
+
+def restore_upload(storage, meta, source_path):
+    """Undo ``finalize_upload``: move the file back so the upload can be finalized again."""
+    _, part_path = _paths(storage, meta['uploadId'])
+    os.replace(source_path, part_path)
+    _write_meta(storage, meta)
+
+
+def discard_upload(storage, upload_id):
+    for path in _paths(storage, upload_id):
+        if os.path.exists(path): os.remove(path)
+    _forget(upload_id)
+
+
+def _forget(upload_id):
+    with _lock:
+        _hashers.pop(upload_id, None)
+        _locks.pop(upload_id, None)
+
+
+def expire_uploads(storage, max_age_seconds):
+    """Discard unfinished uploads started more than ``max_age_seconds`` ago."""
+    directory = os.path.join(storage, UPLOAD_DIR)
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            meta = load_upload(storage, name[:-len('.json')])
+            if meta and meta['createdAt'] < cutoff:
+                discard_upload(storage, meta['uploadId'])
@@ -6,7 +6,15 @@ predictApi = Api(predictBlueprint)
 
 
 # Import and register resources
-from .prediction import PredictionResource
+from .prediction import PredictionReadinessResource, PredictionResource, PredictionStatsResource
+from .batchPrediction import BatchPredictionResource
+from .originalImage import OriginalImageResource
+from .similarDiagnoses import SimilarDiagnosesResource
 
 # Add login and signup resources
-predictApi.add_resource(PredictionResource, "")
\ No newline at end of file
+predictApi.add_resource(PredictionResource, "")
+predictApi.add_resource(PredictionStatsResource, "/stats")
+predictApi.add_resource(PredictionReadinessResource, "/ready")
+predictApi.add_resource(BatchPredictionResource, "/batch")
+predictApi.add_resource(OriginalImageResource, "/<string:diagnosis_id>/original")
+predictApi.add_resource(SimilarDiagnosesResource, "/<string:diagnosis_id>/similar")
\ No newline at end of file
@@ -0,0 +1,136 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import (
+    ADMISSION_MAX_BULK_IN_FLIGHT, ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_RETRY_AFTER, ADMISSION_PER_USER_LIMIT
+)
+from .engine import PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+REJECT_QUEUE_FULL = 'queue_full'
+REJECT_BULK_LIMIT = 'bulk_limit'
+REJECT_USER_LIMIT = 'user_limit'
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; ``retry_after`` is in whole seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds how many prediction requests are in flight at once.
+
+    A request is admitted only while fewer than ``max_in_flight`` requests
+    are being served, its user has fewer than ``per_user_limit`` of their
+    own, and, for bulk/offline-sync traffic, fewer than ``max_bulk_in_flight``
+    bulk requests are running. Bulk traffic is therefore always rejected
+    before interactive uploads are. Everyone else gets an immediate
+    ``AdmissionRejected`` carrying a ``Retry-After`` estimate based on recent
+    service times, instead of queueing until they time out.
+
+    Limits are per process; production runs a single eventlet worker.
+    """
+
+    def __init__(self, max_in_flight=32, max_bulk_in_flight=8, per_user_limit=2, max_retry_after=30):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_bulk_in_flight = max(1, min(int(max_bulk_in_flight), self.max_in_flight))
+        self.per_user_limit = max(1, int(per_user_limit))
+        self.max_retry_after = max_retry_after
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._bulk_in_flight = 0
+        self._per_user = {}
+        self._service_time = None
+
+        self.admitted = {PRIORITY_INTERACTIVE: 0, PRIORITY_BULK: 0}
+        self.rejected = {REJECT_QUEUE_FULL: 0, REJECT_BULK_LIMIT: 0, REJECT_USER_LIMIT: 0}
+
+    @contextmanager
+    def admit(self, userId, priority=PRIORITY_INTERACTIVE):
+        """Hold a slot for the duration of the block or raise ``AdmissionRejected``."""
+        self.acquire(userId, priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(userId, priority, time.monotonic() - started)
+
+    def acquire(self, userId, priority=PRIORITY_INTERACTIVE):
+        bulk = priority == PRIORITY_BULK
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                reason = REJECT_QUEUE_FULL
+            elif bulk and self._bulk_in_flight >= self.max_bulk_in_flight:
+                reason = REJECT_BULK_LIMIT
+            elif self._per_user.get(userId, 0) >= self.per_user_limit:
+                reason = REJECT_USER_LIMIT
+            else:
+                reason = None
+
+            if reason is not None:
+                self.rejected[reason] += 1
+                raise AdmissionRejected(reason, self._retry_after_locked())
+
+            self._in_flight += 1
+            if bulk:
+                self._bulk_in_flight += 1
+            self._per_user[userId] = self._per_user.get(userId, 0) + 1
+            self.admitted[priority] = self.admitted.get(priority, 0) + 1
+
+    def release(self, userId, priority=PRIORITY_INTERACTIVE, service_time=None):
+        with self._lock:
+            self._in_flight -= 1
+            if priority == PRIORITY_BULK:
+                self._bulk_in_flight -= 1
+            remaining = self._per_user.get(userId, 1) - 1
+            if remaining > 0:
+                self._per_user[userId] = remaining
+            else:
+                self._per_user.pop(userId, None)
+
+            if service_time is not None:
+                # Exponentially weighted so the estimate follows load changes quickly
+                if self._service_time is None:
+                    self._service_time = service_time
+                else:
+                    self._service_time = 0.8 * self._service_time + 0.2 * service_time
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "bulk_in_flight": self._bulk_in_flight,
+                "users_in_flight": len(self._per_user),
+                "max_in_flight": self.max_in_flight,
+                "max_bulk_in_flight": self.max_bulk_in_flight,
+                "per_user_limit": self.per_user_limit,
+                "mean_service_ms": self._service_time * 1000.0 if self._service_time is not None else None,
+                "admitted": {"interactive": self.admitted[PRIORITY_INTERACTIVE], "bulk": self.admitted[PRIORITY_BULK]},
+                "rejected": dict(self.rejected),
+            }
+
+    def _retry_after_locked(self):
+        # Roughly the time for the requests ahead of a retry to drain
+        service_time = self._service_time or 1.0
+        estimate = service_time * self._in_flight / self.max_in_flight
+        return int(min(self.max_retry_after, max(1, math.ceil(estimate))))
+
+
+def request_priority(request):
+    """Bulk if the client marks the upload as background work, interactive otherwise."""
+    value = (request.headers.get('X-Request-Priority') or request.args.get('priority') or '').lower()
+    return PRIORITY_BULK if value in ('bulk', 'offline', 'sync', 'background') else PRIORITY_INTERACTIVE
+
+
+admission_controller = AdmissionController(
+    max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+    max_bulk_in_flight=ADMISSION_MAX_BULK_IN_FLIGHT,
+    per_user_limit=ADMISSION_PER_USER_LIMIT,
+    max_retry_after=ADMISSION_MAX_RETRY_AFTER
+)
@@ -0,0 +1,180 @@
+import io
+import logging
+import os
+
+import torch
+from PIL import Image
+
+from .config import (
+    BACKEND_CHANNELS_LAST, BACKEND_EAGER, BACKEND_FROZEN, BACKEND_QUANTIZED, IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH
+)
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+
+
+def to_channels_last(inputs):
+    return inputs.contiguous(memory_format=torch.channels_last)
+
+
+class ChannelsLastRunner:
+    """Feeds NHWC-strided inputs to a module whose weights were converted to channels_last."""
+
+    def __init__(self, module):
+        self.module = module
+
+    def __call__(self, inputs):
+        return self.module(to_channels_last(inputs))
+
+
+def _pooled(features):
+    # Global-average-pool any spatial dimensions down to one vector per image
+    if features.dim() == 4:
+        features = torch.nn.functional.adaptive_avg_pool2d(features, 1)
+    return torch.flatten(features, 1)
+
+
+class _Headless:
+    """Every top-level child of a model except the last (the classifier head), applied in order."""
+
+    def __init__(self, children):
+        self.children = children
+
+    def __call__(self, inputs):
+        features = inputs
+        for child in self.children:
+            features = child(features)
+        return features
+
+
+class FeatureRunner:
+    """Runs a model as body then classifier head, returning ``(logits, features)`` from one forward pass.
+
+    ``features`` are the pooled penultimate-layer activations the head
+    consumed, so every prediction yields its embedding at no extra cost
+    (the engine hands them out as ``future.features``). ``prepare``
+    converts inputs first, as ChannelsLastRunner does.
+    """
+
+    def __init__(self, body, head, prepare=None):
+        self.body = body
+        self.head = head
+        self.prepare = prepare
+
+    def __call__(self, inputs):
+        if self.prepare is not None:
+            inputs = self.prepare(inputs)
+        features = _pooled(self.body(inputs))
+        return self.head(features), features
+
+    def embed(self, inputs):
+        return self(inputs)[1]
+
+
+def find_feature_runner(module, prepare=None, sample=None):
+    """Return a FeatureRunner for ``module`` whose logits match the module's own, or None if there is none.
+
+    The body is an exported ``embed``/``forward_features`` method, or else
+    every child but the last. Either is accepted only if applying the last
+    child (the head) to the pooled body output reproduces the model's
+    outputs on a sample batch (ResNet, MobileNet, EfficientNet and similar).
+    """
+    children = list(module.children())
+    if not children:
+        return None
+    bodies = [getattr(module, name) for name in ('embed', 'forward_features') if hasattr(module, name)]
+    if len(children) >= 2:
+        bodies.append(_Headless(children[:-1]))
+
+    if sample is None:
+        sample = torch.randn(2, IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH, generator=torch.Generator().manual_seed(0))
+    with torch.no_grad():
+        expected = module(prepare(sample) if prepare is not None else sample)
+
+    for body in bodies:
+        runner = FeatureRunner(body, children[-1], prepare)
+        try:
+            with torch.no_grad():
+                actual, _ = runner(sample)
+        except Exception as e:
+            logger.info(f"Model cannot be split before its classifier head: {str(e)}")
+            continue
+        if actual.shape == expected.shape and torch.allclose(actual, expected, rtol=1e-3, atol=1e-4):
+            return runner
+    logger.info("Model outputs differ when split before its classifier head; embeddings disabled")
+    return None
+
+
+def build_variant(module, backend):
+    """Produce the ``backend`` variant of an eager TorchScript module.
+
+    Returns ``(serializable_module, runner)``; the runner is what the engine
+    calls and only differs from the module for channels_last.
+    """
+    if backend == BACKEND_FROZEN:
+        frozen = torch.jit.optimize_for_inference(torch.jit.freeze(module.eval()))
+        return frozen, frozen
+
+    if backend == BACKEND_QUANTIZED:
+        # Dynamic int8 quantization of Linear layers; TorchScript needs the jit flavour
+        qconfig = torch.ao.quantization.default_dynamic_qconfig
+        quantized = torch.ao.quantization.quantize_dynamic_jit(module, {'': qconfig})
+        return quantized, quantized
+
+    if backend == BACKEND_CHANNELS_LAST:
+        converted = module.to(memory_format=torch.channels_last)
+        return converted, ChannelsLastRunner(converted)
+
+    return module, module
+
+
+def wrap_runner(module, backend):
+    """Rebuild the callable for a variant that was loaded back from disk."""
+    if backend == BACKEND_CHANNELS_LAST:
+        return ChannelsLastRunner(module)
+    return module
+
+
+def serialized_size(module):
+    """Size in bytes of the saved variant, used to compare memory footprints."""
+    stream = io.BytesIO()
+    torch.jit.save(module, stream)
+    return stream.tell()
+
+
+def load_calibration_inputs(calibration_dir, count, preprocess):
+    """Load up to ``count`` calibration images, or seeded random tensors if none are available."""
+    tensors = []
+    if calibration_dir and os.path.isdir(calibration_dir):
+        for name in sorted(os.listdir(calibration_dir)):
+            if len(tensors) >= count:
+                break
+            if name.rsplit('.', 1)[-1].lower() not in CALIBRATION_EXTENSIONS:
+                continue
+            try:
+                with Image.open(os.path.join(calibration_dir, name)) as image:
+                    tensors.append(preprocess(image.convert("RGB")))
+            except Exception as e:
+                logger.warning(f"Skipping calibration image {name}: {str(e)}")
+
+    if not tensors:
+        generator = torch.Generator().manual_seed(0)
+        return torch.randn(count, IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH, generator=generator), 'synthetic'
+    return torch.stack(tensors), 'images'
+
+
+def check_parity(reference_outputs, runner, inputs, min_agreement):
+    """Compare a variant against the eager reference outputs on the calibration inputs."""
+    with torch.no_grad():
+        expected = torch.softmax(reference_outputs, dim=1)
+        actual = torch.softmax(runner(inputs), dim=1)
+
+    agreement = (expected.argmax(dim=1) == actual.argmax(dim=1)).float().mean().item()
+    max_prob_diff = (expected - actual).abs().max().item()
+    return {
+        "samples": int(inputs.shape[0]),
+        "top1_agreement": agreement,
+        "max_prob_diff": max_prob_diff,
+        "passed": agreement >= min_agreement,
+    }
@@ -0,0 +1,252 @@
+import io
+import json
+import logging
+import os
+import time
+import uuid
+import zipfile
+from concurrent.futures import TimeoutError as FutureTimeoutError, as_completed
+from datetime import datetime
+from flask import Response, request, stream_with_context
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from PIL import UnidentifiedImageError
+from .admission import AdmissionRejected, admission_controller
+from .catalog import prediction_catalog
+from .config import BATCH_MAX_IMAGES, BATCH_MAX_IMAGE_BYTES, INFERENCE_TIMEOUT
+from .engine import PRIORITY_BULK
+from .prediction import (
+    active_predictor, admission_rejected_response, allocate_image_path, allowed_file, prediction_cache, preprocess_image,
+    record_prediction, submit_prediction
+)
+from .persistence import DiagnosisJob, diagnosis_writer
+
+logger = logging.getLogger(__name__)
+
+
+def collect_uploads():
+    """Gather uploads from repeated ``images`` fields and/or a zip ``archive``.
+
+    Returns a list of dicts with ``filename``, ``data`` and ``error`` so that
+    rejected files still get a line in the streamed response. Raises
+    ValueError before reading any image if more than BATCH_MAX_IMAGES were
+    submitted.
+    """
+    images = [image for image in request.files.getlist('images') if image and image.filename]
+
+    archive = request.files.get('archive')
+    if not archive or not archive.filename:
+        _check_count(len(images))
+        return [_image_upload(image) for image in images]
+
+    try:
+        with zipfile.ZipFile(archive.stream) as zip_file:
+            entries = []
+            for info in zip_file.infolist():
+                name = os.path.basename(info.filename)
+                # Skip directories, OS metadata such as __MACOSX/._IMG_0001.jpg and other file types
+                if info.is_dir() or not name or name.startswith('.') or not allowed_file(name):
+                    continue
+                entries.append((name, info))
+            _check_count(len(images) + len(entries))
+
+            uploads = [_image_upload(image) for image in images]
+            for name, info in entries:
+                if info.file_size > BATCH_MAX_IMAGE_BYTES:
+                    uploads.append({"filename": name, "data": None, "error": "Image is too large"})
+                    continue
+                uploads.append({"filename": name, "data": zip_file.read(info), "error": None})
+            return uploads
+    except zipfile.BadZipFile:
+        raise ValueError("The provided archive is not a valid zip file")
+
+
+def _check_count(count):
+    if count > BATCH_MAX_IMAGES:
+        raise ValueError(f"At most {BATCH_MAX_IMAGES} images can be submitted per batch")
+
+
+def _image_upload(image):
+    if not allowed_file(image.filename):
+        return {"filename": image.filename, "data": None, "error": "File format not supported"}
+    # One byte past the limit is enough to tell an oversized file without reading all of it
+    data = image.stream.read(BATCH_MAX_IMAGE_BYTES + 1)
+    if len(data) > BATCH_MAX_IMAGE_BYTES:
+        return {"filename": image.filename, "data": None, "error": "Image is too large"}
+    return {"filename": image.filename, "data": data, "error": None}
+
+
+def ndjson(payload):
+    return json.dumps(payload) + "\n"
+
+
+class BatchPredictionResource(Resource):
+    @jwt_required()
+    def post(self):
+        """Predict many images in one request and stream one NDJSON line per image."""
+        user_identity = get_jwt_identity()
+        userId = int(user_identity["userId"])
+
+        # Batches are bulk work: they are the first to be turned away and queue behind interactive uploads
+        try:
+            admission_controller.acquire(userId, PRIORITY_BULK)
+        except AdmissionRejected as e:
+            return admission_rejected_response(e)
+        started = time.monotonic()
+
+        def release():
+            admission_controller.release(userId, PRIORITY_BULK, time.monotonic() - started)
+
+        try:
+            uploads = collect_uploads()
+            if not uploads:
+                raise ValueError("No image files provided")
+
+            loaded_model = active_predictor()
+            if loaded_model is None:
+                raise ValueError("Model is not loaded")
+        except ValueError as e:
+            release()
+            return {"message": str(e)}, 400
+        except Exception:
+            release()
+            raise
+
+        stream = stream_with_context(self._stream(userId, uploads, loaded_model))
+        response = Response(stream, mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+        # Holds the admission slot until the last line is sent (or the client goes away)
+        response.call_on_close(release)
+        return response
+
+    def _stream(self, userId, uploads, loaded_model):
+        started = time.time()
+        # index -> diagnosisId of every diagnosis handed to the writer
+        diagnoses = {}
+        pending = {}
+        counts = {"succeeded": 0, "failed": 0, "cached": 0}
+
+        for index, upload in enumerate(uploads):
+            if upload["error"]:
+                counts["failed"] += 1
+                yield ndjson({"index": index, "filename": upload["filename"], "error": upload["error"]})
+                continue
+
+            image_started = time.perf_counter()
+            key = prediction_cache.key_for(upload["data"], loaded_model.fileHash)
+            cached = prediction_cache.get(key)
+            if cached is not None:
+                cached["cached"] = True
+                sample = record_prediction(cached, {}, image_started, cached=True)
+                counts["succeeded"] += 1
+                counts["cached"] += 1
+                yield ndjson(self._finish(index, upload, cached, userId, diagnoses, sample=sample))
+                continue
+
+            timings = {}
+            try:
+                tensor = preprocess_image(io.BytesIO(upload["data"]), timings)
+            except (UnidentifiedImageError, OSError):
+                counts["failed"] += 1
+                yield ndjson({"index": index, "filename": upload["filename"], "error": "The provided file is not a valid image"})
+                continue
+
+            pending[submit_prediction(tensor, loaded_model, PRIORITY_BULK)] = (index, key, timings, image_started)
+
+            # Stream whatever the engine has already finished while we keep decoding
+            for future in [f for f in pending if f.done()]:
+                yield ndjson(self._collect(pending.pop(future), future, uploads, userId, diagnoses, counts))
+
+        try:
+            for future in as_completed(list(pending), timeout=INFERENCE_TIMEOUT):
+                yield ndjson(self._collect(pending.pop(future), future, uploads, userId, diagnoses, counts))
+        except FutureTimeoutError:
+            for future, (index, *_) in pending.items():
+                future.cancel()
+                counts["failed"] += 1
+                yield ndjson({"index": index, "filename": uploads[index]["filename"], "error": "Prediction timed out"})
+
+        yield ndjson({
+            "summary": True,
+            "total": len(uploads),
+            **counts,
+            "saved": len(diagnoses),
+            "diagnosisIds": {str(index): diagnosisId for index, diagnosisId in diagnoses.items()},
+            "model_version": loaded_model.version,
+            "processing_time": f"{time.time() - started:.3f} seconds"
+        })
+
+    def _collect(self, pending_item, future, uploads, userId, diagnoses, counts):
+        index, key, timings, image_started = pending_item
+        upload = uploads[index]
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Batch prediction failed for {upload['filename']}: {str(e)}")
+            counts["failed"] += 1
+            return {"index": index, "filename": upload["filename"], "error": "Prediction failed"}
+
+        timings.update(result.pop("timing", {}))
+        embedding = result.pop("embedding", None)
+        prediction_cache.set(key, result)
+        # Total includes the time spent queued behind the rest of the upload
+        sample = record_prediction(result, timings, image_started)
+        counts["succeeded"] += 1
+        return self._finish(index, upload, result, userId, diagnoses, embedding, sample)
+
+    def _finish(self, index, upload, result, userId, diagnoses, embedding=None, sample=None):
+        line = {
+            "index": index,
+            "filename": upload["filename"],
+            "detected": result["plant_type"] != 'unknown',
+            "disease_status": result["disease_status"],
+            "plant_type": result["plant_type"],
+            "model_version": result["model_version"],
+            "backend": result.get("backend"),
+            "cached": result.get("cached", False),
+            "cascade": result.get("cascade"),
+            "rated": False
+        }
+
+        if not line["detected"]:
+            return line
+
+        entry = prediction_catalog.lookup(result["label"], result["plant_type"])
+        if not entry["crop"]:
+            return line
+        line.update(entry["crop"])
+
+        disease = entry["disease"]
+        if not disease:
+            return line
+        line.update(disease)
+
+        # The image and row are stored by the diagnosis writer, like single uploads
+        extension = upload["filename"].rsplit('.', 1)[1].lower()
+        file_path, image_url = allocate_image_path(extension)
+        diagnosisId = str(uuid.uuid4())
+        if sample is not None:
+            sample.diagnosisId = diagnosisId
+        try:
+            diagnosis_writer.submit(DiagnosisJob(
+                diagnosisId=diagnosisId,
+                userId=userId,
+                diseaseId=disease["diseaseId"],
+                date=datetime.utcnow(),
+                imageBytes=upload["data"],
+                filePath=file_path,
+                imageUrl=image_url,
+                modelVersion=result["model_version"],
+                modelId=result.get("model_id"),
+                inferenceBackend=result.get("backend"),
+                embedding=embedding,
+                sample=sample
+            ))
+        except Exception as e:
+            logger.error(f"Could not queue diagnosis for {upload['filename']}: {str(e)}")
+            line["error"] = "Failed to save diagnosis"
+            return line
+
+        line["image_url"] = image_url
+        line["diagnosisId"] = diagnosisId
+        diagnoses[index] = diagnosisId
+        return line
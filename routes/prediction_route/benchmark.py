@@ -0,0 +1,249 @@
+import io
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import resource
+import statistics
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+# (width, height) of a thumbnail, a typical phone upload and a full 12 MP camera frame
+DEFAULT_IMAGE_SIZES = ((224, 224), (1280, 960), (4000, 3000))
+DEFAULT_FORMATS = ('JPEG', 'PNG', 'WEBP')
+DEFAULT_BATCH_SIZES = (1, 8)
+
+# A short profile that is cheap enough to run while an admin waits on an upload
+GATE_IMAGE_SIZES = ((224, 224), (1280, 960))
+GATE_FORMATS = ('JPEG',)
+GATE_BATCH_SIZES = (1, 8)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def synthetic_image(width, height, image_format='JPEG', seed=0):
+    """Encoded image with a gradient plus noise so codecs cannot compress it trivially."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)), (x + y) / 2], axis=-1)
+    noise = rng.normal(0, 20, size=(height, width, 3)).astype(np.float32)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+    Image.fromarray(pixels).save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def scenario_key(scenario):
+    return f"{scenario['width']}x{scenario['height']}/{scenario['format']}/b{scenario['batch_size']}/t{scenario['threads']}"
+
+
+def run_scenario(loaded_model, preprocess, image_bytes, batch_size, runs, warmup_runs=2):
+    """Time decode + preprocess + forward for ``runs`` batches of ``batch_size`` copies of one image.
+
+    Latencies are per batch; throughput is images per second over the whole run.
+    """
+    def once():
+        tensors = [preprocess(io.BytesIO(image_bytes)) for _ in range(batch_size)]
+        with torch.no_grad():
+            loaded_model.module(torch.stack(tensors))
+
+    for _ in range(warmup_runs):
+        once()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(runs):
+        batch_started = time.perf_counter()
+        once()
+        latencies.append((time.perf_counter() - batch_started) * 1000.0)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "runs": runs,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "throughput_ips": runs * batch_size / elapsed if elapsed else None,
+    }
+
+
+def run_benchmark(loaded_model, preprocess, image_sizes=DEFAULT_IMAGE_SIZES, formats=DEFAULT_FORMATS,
+                  batch_sizes=DEFAULT_BATCH_SIZES, thread_counts=(None,), runs=30, isolated=False):
+    """Benchmark one loaded model across image sizes, formats, batch sizes and torch thread counts.
+
+    A thread count of ``None`` keeps the current torch setting. ``isolated``
+    marks reports produced in a dedicated process, whose peak RSS is
+    meaningful enough to compare between runs.
+    """
+    baseline_rss = peak_rss_mb()
+    original_threads = torch.get_num_threads()
+    scenarios = []
+
+    try:
+        for width, height in image_sizes:
+            for image_format in formats:
+                image_bytes = synthetic_image(width, height, image_format)
+                for batch_size in batch_sizes:
+                    for threads in thread_counts:
+                        torch.set_num_threads(threads or original_threads)
+                        scenario = {
+                            "width": width,
+                            "height": height,
+                            "format": image_format,
+                            "image_bytes": len(image_bytes),
+                            "batch_size": batch_size,
+                            "threads": threads or original_threads,
+                        }
+                        scenario.update(run_scenario(loaded_model, preprocess, image_bytes, batch_size, runs))
+                        scenario["peak_rss_mb"] = peak_rss_mb()
+                        scenario["key"] = scenario_key(scenario)
+                        scenarios.append(scenario)
+    finally:
+        torch.set_num_threads(original_threads)
+
+    return {
+        "model": {
+            "modelId": loaded_model.modelId,
+            "version": loaded_model.version,
+            "fileHash": loaded_model.fileHash,
+            "backend": loaded_model.backend,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "createdAt": time.time(),
+        "isolated": isolated,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "scenarios": scenarios,
+    }
+
+
+def compare_reports(baseline, candidate, latency_tolerance=0.10, throughput_tolerance=0.10, rss_tolerance=0.25):
+    """Compare two benchmark reports scenario by scenario.
+
+    A regression is a p95/p99 latency more than ``latency_tolerance`` above
+    the baseline, a throughput more than ``throughput_tolerance`` below it,
+    or (for isolated runs only) a peak RSS more than ``rss_tolerance`` above
+    it. Scenarios missing from either report are listed but never fail the
+    comparison.
+    """
+    baseline_scenarios = {scenario["key"]: scenario for scenario in baseline.get("scenarios", [])}
+    candidate_scenarios = {scenario["key"]: scenario for scenario in candidate.get("scenarios", [])}
+    regressions = []
+    deltas = []
+
+    def check(key, metric, before, after, tolerance, higher_is_better=False):
+        if not before or after is None:
+            return
+        change = (after - before) / before
+        deltas.append({"scenario": key, "metric": metric, "baseline": before, "candidate": after, "change": change})
+        worse = -change if higher_is_better else change
+        if worse > tolerance:
+            regressions.append({"scenario": key, "metric": metric, "baseline": before, "candidate": after, "change": change})
+
+    for key, before in baseline_scenarios.items():
+        after = candidate_scenarios.get(key)
+        if after is None:
+            continue
+        check(key, "p95_ms", before["p95_ms"], after["p95_ms"], latency_tolerance)
+        check(key, "p99_ms", before["p99_ms"], after["p99_ms"], latency_tolerance)
+        check(key, "throughput_ips", before["throughput_ips"], after["throughput_ips"], throughput_tolerance, higher_is_better=True)
+
+    if baseline.get("isolated") and candidate.get("isolated"):
+        check("overall", "peak_rss_mb", baseline.get("peak_rss_mb"), candidate.get("peak_rss_mb"), rss_tolerance)
+
+    return {
+        "baseline": baseline.get("model"),
+        "candidate": candidate.get("model"),
+        "passed": not regressions,
+        "regressions": regressions,
+        "deltas": deltas,
+        "missingScenarios": sorted(set(baseline_scenarios) ^ set(candidate_scenarios)),
+    }
+
+
+def wait_for_report(process, queue, timeout=None):
+    """The report ``process`` puts on ``queue``, or an ``{"error": ...}`` if it dies or times out first."""
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        alive = process.is_alive()
+        try:
+            return queue.get(timeout=0.5)
+        except queue_module.Empty:
+            pass
+        if not alive:
+            return {"error": f"Benchmark process exited with code {process.exitcode} before reporting"}
+        if deadline is not None and time.monotonic() > deadline:
+            process.terminate()
+            return {"error": f"Benchmark did not finish within {timeout} seconds"}
+
+
+def _benchmark_snapshot(snapshot, profile, queue):
+    # Runs in a spawned process; always reports, so the parent never waits on a dead child
+    try:
+        from .prediction import decode_and_transform
+        from .registry import model_registry
+
+        loaded_model = model_registry.load_snapshot(snapshot)
+        queue.put(run_benchmark(loaded_model, decode_and_transform, isolated=True, **profile))
+    except Exception as e:
+        queue.put({"error": str(e)})
+
+
+def benchmark_isolated(snapshot, profile, timeout=None):
+    """Benchmark the model of ``snapshot`` (see ``ModelRegistry.snapshot``) in a fresh spawned process.
+
+    The server's own threads and memory are untouched, and the report's
+    peak RSS belongs to that one model.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_benchmark_snapshot, args=(snapshot, profile, queue), daemon=True)
+    process.start()
+    try:
+        return wait_for_report(process, queue, timeout)
+    finally:
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+
+
+def benchmark_against(baseline_snapshot, candidate_snapshot, runs=10, timeout=None, **tolerances):
+    """Run the short gate profile on two models, each in its own process, and compare them.
+
+    Returns ``{"passed": False, "error": ...}`` if either run failed.
+    """
+    profile = {"image_sizes": GATE_IMAGE_SIZES, "formats": GATE_FORMATS, "batch_sizes": GATE_BATCH_SIZES, "runs": runs}
+    baseline = benchmark_isolated(baseline_snapshot, profile, timeout)
+    if "error" in baseline:
+        return {"passed": False, "error": f"Baseline benchmark failed: {baseline['error']}"}
+    candidate = benchmark_isolated(candidate_snapshot, profile, timeout)
+    if "error" in candidate:
+        return {"passed": False, "error": candidate["error"]}
+    comparison = compare_reports(baseline, candidate, **tolerances)
+    comparison["reports"] = {"baseline": baseline, "candidate": candidate}
+    return comparison
@@ -0,0 +1,135 @@
+import hashlib
+import io
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODE_CONTENT = 'content'
+CACHE_MODE_PERCEPTUAL = 'perceptual'
+
+
+def content_hash(image_bytes):
+    """SHA-256 of the raw upload; identical files always share a key."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(image_bytes, hash_size=8):
+    """64-bit difference hash (dHash) that survives re-encoding and resizing.
+
+    JPEGs are decoded in draft mode so only a heavily downscaled version of
+    the image is ever materialised.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft('L', (hash_size * 8, hash_size * 8))
+    image = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(image.getdata())
+
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+class PredictionCache:
+    """Caches prediction outputs keyed by image hash and model fileHash.
+
+    Entries go to Redis when the app has a client configured (shared across
+    workers, expiring after ``ttl`` seconds) and always to a bounded
+    in-process LRU, which also serves as the fallback when Redis is absent or
+    unreachable.
+    """
+
+    def __init__(self, max_entries=1024, ttl=86400, mode=CACHE_MODE_CONTENT, prefix='prediction'):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = int(ttl)
+        self.mode = mode if mode in (CACHE_MODE_CONTENT, CACHE_MODE_PERCEPTUAL) else CACHE_MODE_CONTENT
+        self.prefix = prefix
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, image_bytes, model_hash, input_format='image'):
+        """Key of ``image_bytes`` read as ``input_format`` (see ``PredictionUpload.input_format``) under one model.
+
+        Raw tensor bytes in hwc and chw order are the same bytes but different
+        images, so the format is always part of the key.
+        """
+        if self.mode == CACHE_MODE_PERCEPTUAL:
+            try:
+                image_key = f"p:{perceptual_hash(image_bytes)}"
+            except Exception:
+                # Undecodable input; let the prediction path report the error
+                image_key = f"c:{content_hash(image_bytes)}"
+        else:
+            image_key = f"c:{content_hash(image_bytes)}"
+        return f"{self.prefix}:{model_hash}:{input_format}:{image_key}"
+
+    def get(self, key):
+        with self._lock:
+            value = self._local.get(key)
+            if value is not None:
+                self._local.move_to_end(key)
+
+        if value is None:
+            redis_client = self._redis()
+            if redis_client is not None:
+                try:
+                    raw = redis_client.get(key)
+                    if raw is not None:
+                        value = json.loads(raw)
+                        self._store_local(key, value)
+                except Exception as e:
+                    logger.warning(f"Prediction cache read from Redis failed: {str(e)}")
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return dict(value) if value is not None else None
+
+    def set(self, key, value):
+        self._store_local(key, dict(value))
+
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                redis_client.setex(key, self.ttl, json.dumps(value))
+            except Exception as e:
+                logger.warning(f"Prediction cache write to Redis failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "backend": "redis" if self._redis() is not None else "memory",
+                "entries": len(self._local),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+    def _store_local(self, key, value):
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    @staticmethod
+    def _redis():
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('redis')
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+
+# ModelVersion.role values
+ROLE_CLASSIFIER = 'classifier'
+ROLE_ROUTER = 'router'
+ROLE_DISEASE = 'disease'
+MODEL_ROLES = (ROLE_CLASSIFIER, ROLE_ROUTER, ROLE_DISEASE)
+
+# Router labels meaning "not a crop we diagnose"
+UNKNOWN_LABELS = {'unknown', 'other', 'none', 'background'}
+
+
+class Cascade:
+    """An immutable snapshot of the two-stage models.
+
+    ``router`` is the cheap first-stage model whose labels are crop names (or
+    unknown); ``diseaseModels`` maps a lower-cased crop name to the model that
+    diagnoses that crop. ``reference`` is the active single-stage classifier:
+    it handles crops without a disease model and low-confidence routing, and
+    its measured forward time is the baseline for the compute saved.
+    """
+    __slots__ = ("router", "diseaseModels", "reference", "key", "fileHash", "version")
+
+    def __init__(self, router, diseaseModels, reference=None, key=None):
+        self.router = router
+        self.diseaseModels = diseaseModels
+        self.reference = reference
+        self.key = key
+
+        parts = [router.fileHash] + [f"{crop}={model.fileHash}" for crop, model in sorted(diseaseModels.items())]
+        if reference is not None:
+            parts.append(f"reference={reference.fileHash}")
+        # Stands in for a single model's fileHash in prediction cache keys
+        self.fileHash = hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()
+        self.version = f"cascade:{router.version}"
+
+    def with_reference(self, reference):
+        return Cascade(self.router, self.diseaseModels, reference, self.key)
+
+    def describe(self):
+        def model_info(model):
+            return {
+                "modelId": model.modelId,
+                "version": model.version,
+                "fileHash": model.fileHash,
+                "forwardMs": model.backendInfo.get("forwardMs"),
+            }
+
+        return {
+            "router": model_info(self.router),
+            "diseaseModels": {crop: model_info(model) for crop, model in self.diseaseModels.items()},
+            "reference": model_info(self.reference) if self.reference else None,
+        }
+
+
+def forward_ms(model):
+    return model.backendInfo.get("forwardMs") if model is not None else None
+
+
+class CascadeStats:
+    """Running totals of how far requests went through the cascade and the compute that saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.stopped_at_router = 0
+        self.disease_stage = 0
+        self.reference_fallbacks = 0
+        self.compute_ms = 0.0
+        self.compute_saved_ms = 0.0
+
+    def record(self, stage, compute_ms, saved_ms):
+        with self._lock:
+            self.requests += 1
+            if stage == ROLE_ROUTER:
+                self.stopped_at_router += 1
+            elif stage == ROLE_DISEASE:
+                self.disease_stage += 1
+            else:
+                self.reference_fallbacks += 1
+            self.compute_ms += compute_ms or 0.0
+            self.compute_saved_ms += saved_ms or 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "stopped_at_router": self.stopped_at_router,
+                "disease_stage": self.disease_stage,
+                "reference_fallbacks": self.reference_fallbacks,
+                "compute_ms": self.compute_ms,
+                "compute_saved_ms": self.compute_saved_ms,
+                "mean_compute_saved_ms": self.compute_saved_ms / self.requests if self.requests else 0.0,
+            }
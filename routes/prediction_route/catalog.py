@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import func
+
+from models import Crop, Disease, UserDetails
+from .cascade import UNKNOWN_LABELS
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'prediction:catalog:generation'
+
+
+# Labels of the bundled DEFAULT_CLASS_NAMES, which carry no crop of their own
+LEGACY_LABELS = {
+    'healthly_banana': ('banana', 'Healthy'),
+    'healthly_coffee': ('coffee', 'Healthy'),
+    'black_sigatoka': ('banana', 'black_sigatoka'),
+    'yellow_sigatoka': ('banana', 'yellow_sigatoka'),
+    'leaf_rust': ('coffee', 'leaf_rust'),
+}
+HEALTHY_LABELS = {'healthy', 'healthly'}
+
+
+def qualify_label(label, crop=None):
+    """``crop:label`` for a label that belongs to ``crop``; labels already qualified are kept."""
+    if not crop or ':' in label:
+        return label
+    return f"{crop}:{label}"
+
+
+def label_to_result(predicted_label, crop=None):
+    """Map a raw model label to the plant type and disease status it stands for.
+
+    A version names the crop of each label itself, either as ``crop:label``
+    in its classNames or through its ``crop`` column (disease-stage models).
+    Labels without a crop fall back to the table for DEFAULT_CLASS_NAMES.
+    """
+    label = qualify_label(predicted_label, crop)
+    if ':' not in label:
+        plant_type, disease_status = LEGACY_LABELS.get(label, ('unknown', 'unknown'))
+        return {'plant_type': plant_type, 'disease_status': disease_status}
+
+    plant_type, disease_status = (part.strip() for part in label.split(':', 1))
+    plant_type = plant_type.lower()
+    if not plant_type or plant_type in UNKNOWN_LABELS or disease_status.lower() in UNKNOWN_LABELS:
+        return {'plant_type': 'unknown', 'disease_status': 'unknown'}
+    if disease_status.lower() in HEALTHY_LABELS or disease_status.lower() in (f"healthy_{plant_type}", f"healthly_{plant_type}"):
+        disease_status = 'Healthy'
+    return {'plant_type': plant_type, 'disease_status': disease_status}
+
+
+def serialize_disease(disease):
+    """Disease fields included in a prediction response."""
+    return {
+        "diseaseId": disease.diseaseId,
+        "diseaseName": disease.name,
+        "diseaseDescription": disease.description,
+        "diseaseLabel": disease.label,
+        "diseaseSymptoms": disease.symptoms,
+        "diseaseTreatment": disease.treatment,
+        "diseasePrevention": disease.prevention,
+        "relatedDiseases": disease.relatedDiseases.split(",") if disease.relatedDiseases else []
+    }
+
+
+class PredictionCatalog:
+    """Precomputed model label -> crop/disease payload table for prediction responses.
+
+    The table is rebuilt from Crop and Disease whenever an admin resource
+    calls ``invalidate()``. Other workers notice through a generation counter
+    in Redis (checked at most every ``sync_interval`` seconds), so the
+    prediction hot path itself never reads the catalog tables.
+    """
+
+    def __init__(self, sync_interval=1.0):
+        self.sync_interval = sync_interval
+        self._entries = None
+        self._generation = None
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, label, crop=None):
+        """Return ``{"crop": ..., "disease": ...}`` for a model label (either may be None).
+
+        ``crop`` is the plant type the label was resolved to, so plain labels
+        that only name a crop through their model version still find it.
+        """
+        label = qualify_label(label, crop)
+        self._sync()
+        entries = self._entries
+        if entries is None:
+            entries = self.rebuild()
+
+        entry = entries.get(label)
+        if entry is None:
+            # A label we have not seen yet (e.g. a newly activated model); add it once
+            entry = self._build_entry(label, *self._load_tables())
+            with self._lock:
+                if self._entries is not None:
+                    self._entries[label] = entry
+        return entry
+
+    def rebuild(self, labels=None, crop=None):
+        """Reload the table; requires an app context."""
+        crops, diseases = self._load_tables()
+        known = {qualify_label(label, crop) for label in labels or []}
+        if self._entries:
+            known.update(self._entries.keys())
+        crop_names = {crop.cropId: name for name, crop in crops.items()}
+        for (cropId, disease_label) in diseases.keys():
+            known.add(qualify_label(disease_label, crop_names.get(cropId)))
+
+        entries = {label: self._build_entry(label, crops, diseases) for label in known}
+        with self._lock:
+            self._entries = entries
+        logger.info(f"Prediction catalog rebuilt with {len(entries)} labels")
+        return entries
+
+    def invalidate(self, labels=None, crop=None):
+        """Rebuild after a catalog change and tell other workers to do the same."""
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                self._generation = redis_client.incr(GENERATION_KEY)
+            except Exception as e:
+                logger.warning(f"Failed to publish catalog invalidation: {str(e)}")
+
+        try:
+            self.rebuild(labels, crop)
+        except Exception as e:
+            # Fall back to a lazy rebuild on the next lookup
+            logger.error(f"Failed to rebuild prediction catalog: {str(e)}")
+            with self._lock:
+                self._entries = None
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        redis_client = self._redis()
+        if redis_client is None:
+            return
+        try:
+            generation = int(redis_client.get(GENERATION_KEY) or 0)
+        except Exception:
+            return
+        if generation != self._generation:
+            self._generation = generation
+            with self._lock:
+                self._entries = None
+
+    @staticmethod
+    def _load_tables():
+        crops = {crop.name.lower(): crop for crop in Crop.query.all()}
+        diseases = {(disease.cropId, disease.label): disease for disease in Disease.query.all()}
+        return crops, diseases
+
+    @staticmethod
+    def _build_entry(label, crops, diseases):
+        result = label_to_result(label)
+        crop = crops.get(result["plant_type"])
+        if crop is None:
+            return {"crop": None, "disease": None}
+
+        disease = diseases.get((crop.cropId, result["disease_status"]))
+        return {
+            "crop": {"cropId": crop.cropId, "cropName": crop.name},
+            "disease": serialize_disease(disease) if disease else None
+        }
+
+    @staticmethod
+    def _redis():
+        if not has_app_context():
+            return None
+        return current_app.extensions.get('redis')
+
+
+class UserDistrictCache:
+    """Short-lived LRU of userId -> districtId for tagging diagnoses."""
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, userId):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(userId)
+            if cached is not None and now - cached[1] < self.ttl:
+                self._entries.move_to_end(userId)
+                return cached[0]
+
+        try:
+            user_details = UserDetails.query.filter_by(userId=userId).first()
+            districtId = user_details.districtId if user_details else None
+        except Exception as e:
+            logger.warning(f"Failed to get user district: {str(e)}")
+            return None
+
+        with self._lock:
+            self._entries[userId] = (districtId, now)
+            self._entries.move_to_end(userId)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return districtId
+
+    def invalidate(self, userId):
+        with self._lock:
+            self._entries.pop(userId, None)
+
+
+prediction_catalog = PredictionCatalog()
+user_districts = UserDistrictCache()
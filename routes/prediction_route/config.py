@@ -1,5 +1,109 @@
+import os
+
 # Image parameters
 IMG_HEIGHT = 224
 IMG_WIDTH = 224
 IMG_CHANNELS = 3
-IMG_SHAPE = (IMG_HEIGHT, IMG_WIDTH, IMG_CHANNELS)
\ No newline at end of file
+IMG_SHAPE = (IMG_HEIGHT, IMG_WIDTH, IMG_CHANNELS)
+
+# Micro-batching inference engine
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', 8))
+INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', 10))
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', 30))
+
+# Model registry
+# Room for the classifier plus a cascade router and a disease model per crop
+MODEL_CACHE_SIZE = int(os.getenv('MODEL_CACHE_SIZE', 6))
+MODEL_REFRESH_INTERVAL = float(os.getenv('MODEL_REFRESH_INTERVAL', 30))
+MODEL_WARMUP_RUNS = int(os.getenv('MODEL_WARMUP_RUNS', 2))
+# Full dummy predictions a web worker runs before reporting ready
+INFERENCE_WARMUP_RUNS = int(os.getenv('INFERENCE_WARMUP_RUNS', 3))
+
+# Prediction result cache ('content' or 'perceptual' keys)
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 1024))
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', 86400))
+PREDICTION_CACHE_MODE = os.getenv('PREDICTION_CACHE_MODE', 'content')
+
+# Bulk prediction endpoint
+BATCH_MAX_IMAGES = int(os.getenv('BATCH_MAX_IMAGES', 100))
+BATCH_MAX_IMAGE_BYTES = int(os.getenv('BATCH_MAX_IMAGE_BYTES', 20 * 1024 * 1024))
+
+# Inference worker pool ('tpool' offloads to eventlet's native threads, 'inline' runs on the caller)
+INFERENCE_POOL_MODE = os.getenv('INFERENCE_POOL_MODE', 'tpool')
+INFERENCE_POOL_SIZE = int(os.getenv('INFERENCE_POOL_SIZE', 4))
+TORCH_NUM_THREADS = int(os.getenv('TORCH_NUM_THREADS', 0))
+TORCH_NUM_INTEROP_THREADS = int(os.getenv('TORCH_NUM_INTEROP_THREADS', 0))
+
+# Inference backend ('eager', 'frozen', 'quantized' or 'channels_last') and its parity check
+BACKEND_EAGER = 'eager'
+BACKEND_FROZEN = 'frozen'
+BACKEND_QUANTIZED = 'quantized'
+BACKEND_CHANNELS_LAST = 'channels_last'
+BACKENDS = (BACKEND_EAGER, BACKEND_FROZEN, BACKEND_QUANTIZED, BACKEND_CHANNELS_LAST)
+
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'eager')
+CALIBRATION_DIR = os.getenv('CALIBRATION_DIR', 'models_storage/calibration')
+CALIBRATION_SAMPLES = int(os.getenv('CALIBRATION_SAMPLES', 16))
+PARITY_MIN_AGREEMENT = float(os.getenv('PARITY_MIN_AGREEMENT', 0.95))
+
+# Use the draft-mode/vectorised preprocessing instead of the torchvision transform the models
+# were trained with. JPEG draft decoding shifts pixels slightly, so it is opt-in
+FAST_PREPROCESSING = os.getenv('FAST_PREPROCESSING', 'false').lower() in ('1', 'true', 'yes')
+
+# Background diagnosis persistence (image write + DiagnosisResult insert after the response)
+DIAGNOSIS_WRITE_BATCH_SIZE = int(os.getenv('DIAGNOSIS_WRITE_BATCH_SIZE', 32))
+DIAGNOSIS_WRITE_RETRIES = int(os.getenv('DIAGNOSIS_WRITE_RETRIES', 3))
+DIAGNOSIS_WRITE_RETRY_DELAY = float(os.getenv('DIAGNOSIS_WRITE_RETRY_DELAY', 0.5))
+DIAGNOSIS_DRAIN_TIMEOUT = float(os.getenv('DIAGNOSIS_DRAIN_TIMEOUT', 10))
+
+# Benchmark check before activating an uploaded model ('block', 'warn' or 'off')
+BENCHMARK_GATE = os.getenv('BENCHMARK_GATE', 'warn')
+BENCHMARK_GATE_RUNS = int(os.getenv('BENCHMARK_GATE_RUNS', 10))
+# Seconds each model's benchmark process may run before the gate gives up on it
+BENCHMARK_GATE_TIMEOUT = int(os.getenv('BENCHMARK_GATE_TIMEOUT', 300))
+BENCHMARK_LATENCY_TOLERANCE = float(os.getenv('BENCHMARK_LATENCY_TOLERANCE', 0.15))
+BENCHMARK_THROUGHPUT_TOLERANCE = float(os.getenv('BENCHMARK_THROUGHPUT_TOLERANCE', 0.15))
+BENCHMARK_RSS_TOLERANCE = float(os.getenv('BENCHMARK_RSS_TOLERANCE', 0.25))
+
+# Admission control for prediction requests (per worker process)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', 32))
+ADMISSION_MAX_BULK_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_BULK_IN_FLIGHT', 8))
+ADMISSION_PER_USER_LIMIT = int(os.getenv('ADMISSION_PER_USER_LIMIT', 2))
+ADMISSION_MAX_RETRY_AFTER = int(os.getenv('ADMISSION_MAX_RETRY_AFTER', 30))
+
+# Two-stage cascade (router -> per-crop disease model); used once a router and a disease model are active
+CASCADE_ENABLED = os.getenv('CASCADE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CASCADE_MIN_ROUTER_CONFIDENCE = float(os.getenv('CASCADE_MIN_ROUTER_CONFIDENCE', 0.5))
+
+# Per-prediction telemetry: ring buffer size and latency histogram bucket bounds (ms)
+TELEMETRY_CAPACITY = int(os.getenv('TELEMETRY_CAPACITY', 4096))
+TELEMETRY_BUCKETS_MS = tuple(
+    float(bound) for bound in os.getenv('TELEMETRY_BUCKETS_MS', '1,2,5,10,20,50,100,200,500,1000,2000,5000').split(',')
+)
+
+# Shadow evaluation: fraction of live predictions also scored by candidate models, and its queue bound
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', 0.1))
+SHADOW_MAX_IN_FLIGHT = int(os.getenv('SHADOW_MAX_IN_FLIGHT', 8))
+
+# Embedding index of stored diagnoses for similar-case search
+EMBEDDING_INDEX_ENABLED = os.getenv('EMBEDDING_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+EMBEDDING_INDEX_DIR = os.getenv('EMBEDDING_INDEX_DIR', 'models_storage/embeddings')
+# Coarse IVF partitioning: probe this many of the trained lists per query (0 = exact search only)
+EMBEDDING_IVF_NPROBE = int(os.getenv('EMBEDDING_IVF_NPROBE', 8))
+# Cosine similarity at or above which a neighbour is reported as a near-duplicate upload
+EMBEDDING_DUPLICATE_THRESHOLD = float(os.getenv('EMBEDDING_DUPLICATE_THRESHOLD', 0.98))
+
+# Binary patches from earlier model versions to each newly uploaded one
+MODEL_DELTA_ENABLED = os.getenv('MODEL_DELTA_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Only patch from this many of the most recent earlier versions (0 = all of them)
+MODEL_DELTA_MAX_SOURCES = int(os.getenv('MODEL_DELTA_MAX_SOURCES', 10))
+
+# Compressed copies of each model file, written once at upload and served by Accept-Encoding
+MODEL_COMPRESSION_ENABLED = os.getenv('MODEL_COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+MODEL_GZIP_LEVEL = int(os.getenv('MODEL_GZIP_LEVEL', 9))
+MODEL_ZSTD_LEVEL = int(os.getenv('MODEL_ZSTD_LEVEL', 19))
+
+# Chunked, resumable model uploads: suggested chunk size, largest accepted file and how long unfinished uploads are kept
+MODEL_UPLOAD_CHUNK_SIZE = int(os.getenv('MODEL_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+MODEL_UPLOAD_MAX_SIZE = int(os.getenv('MODEL_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))
+MODEL_UPLOAD_TTL_HOURS = float(os.getenv('MODEL_UPLOAD_TTL_HOURS', 24))
@@ -0,0 +1,393 @@
+import atexit
+import fcntl
+import json
+import logging
+import math
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from .config import EMBEDDING_INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DTYPE = np.float16
+ID_DTYPE = 'S36'  # diagnosisId (uuid4 string)
+INITIAL_CAPACITY = 1024
+# Rows scored per step of an exact search, so float32 upcasts stay small
+SEARCH_CHUNK_ROWS = 65536
+
+
+class EmbeddingIndex:
+    """Append-only, memory-mapped float16 embeddings of one model version, keyed by diagnosisId.
+
+    ``directory`` holds ``meta.json`` (dimension), ``vectors.f16`` (capacity
+    x dim) and ``ids.bin`` (capacity x 36 bytes); both grow by doubling.
+    Vectors are L2-normalised on insert, so cosine similarity is a dot
+    product and exact search is one vectorised pass over the memmap.
+
+    ``train_ivf`` adds a coarse inverted-file partitioning: spherical
+    k-means centroids (``centroids.npy``) and the list of every row
+    (``lists.i32``). Rows added later are assigned to their nearest list,
+    and ``search(..., nprobe=n)`` only scores rows in the ``n`` lists
+    closest to the query.
+
+    Several processes may open the same directory (the server and the
+    ``flask model index-embeddings`` CLI). Writes take an exclusive
+    ``flock`` on ``writer.lock`` and first catch up with the files, so
+    there is one writer at a time. Growing the files or training IVF bumps
+    the ``generation`` in ``meta.json``; other instances remap when they
+    see it change, and pick up appended rows from the shared mapping.
+    """
+
+    def __init__(self, directory, dim=None):
+        self.directory = directory
+        self._lock = threading.RLock()
+
+        meta = self._read_meta()
+        if meta is not None:
+            self.dim = meta["dim"]
+        elif dim is None:
+            raise ValueError(f"No embedding index in {directory}")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self.dim = int(dim)
+            self._write_meta(0)
+
+        self._lock_file = open(self._path('writer.lock'), 'a+b')
+        self._load()
+
+    def _read_meta(self):
+        try:
+            with open(self._path('meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, generation):
+        # Replaced atomically, so readers never see a half-written file
+        temporary = self._path(f'meta.json.{os.getpid()}')
+        with open(temporary, 'w') as f:
+            json.dump({"dim": self.dim, "dtype": np.dtype(VECTOR_DTYPE).name, "generation": generation}, f)
+        os.replace(temporary, self._path('meta.json'))
+        self.generation = generation
+
+    def _load(self):
+        """(Re)map the files as they are on disk now."""
+        self.generation = (self._read_meta() or {}).get("generation", 0)
+        self.centroids = None
+        centroids_path = self._path('centroids.npy')
+        if os.path.exists(centroids_path):
+            self.centroids = np.load(centroids_path)
+
+        existing = os.path.getsize(self._path('ids.bin')) // np.dtype(ID_DTYPE).itemsize if os.path.exists(self._path('ids.bin')) else 0
+        self._map(max(INITIAL_CAPACITY, existing))
+
+        self.count = 0
+        # diagnosisId -> row, so lookups and duplicate checks never scan the ids
+        self._rows = {}
+        self._catch_up()
+
+    def _catch_up(self):
+        """Count rows appended since we last looked, by us or by another process."""
+        # Rows are appended in order and the id is written last, so the first empty id marks the end
+        while self.count < self.capacity:
+            chunk = self._ids[self.count:min(self.capacity, self.count + INITIAL_CAPACITY)]
+            empty = np.flatnonzero(chunk == b'')
+            filled = int(empty[0]) if len(empty) else len(chunk)
+            for offset in range(filled):
+                self._rows.setdefault(bytes(chunk[offset]), self.count + offset)
+            self.count += filled
+            if filled < len(chunk):
+                break
+
+    def _refresh(self):
+        meta = self._read_meta() or {}
+        if meta.get("generation", 0) != self.generation:
+            self._load()
+        else:
+            self._catch_up()
+
+    @contextmanager
+    def _writing(self):
+        with self._lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _map(self, capacity):
+        self.capacity = capacity
+        self._vectors = self._memmap('vectors.f16', VECTOR_DTYPE, (capacity, self.dim))
+        self._ids = self._memmap('ids.bin', ID_DTYPE, (capacity,))
+        self._lists = self._memmap('lists.i32', np.int32, (capacity,), fill=-1) if self.centroids is not None else None
+
+    def _memmap(self, name, dtype, shape, fill=None):
+        path = self._path(name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        current = os.path.getsize(path) if os.path.exists(path) else 0
+        if current < size:
+            # Extending with truncate leaves the new rows zeroed (and sparse on disk)
+            with open(path, 'ab') as f:
+                f.truncate(size)
+        array = np.memmap(path, dtype=dtype, mode='r+', shape=shape)
+        if fill is not None and current < size:
+            array.reshape(-1)[current // np.dtype(dtype).itemsize:] = fill
+        return array
+
+    def _grow(self):
+        self.flush()
+        self._map(self.capacity * 2)
+        self._write_meta(self.generation + 1)
+
+    def flush(self):
+        with self._lock:
+            for array in (self._vectors, self._ids, self._lists):
+                if array is not None:
+                    array.flush()
+
+    @staticmethod
+    def _normalized(vector):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def add(self, diagnosisId, vector, check_existing=True):
+        """Append one embedding; returns False for a zero vector or an id that is already indexed.
+
+        Bulk loaders that already skip indexed ids (see ``indexed_ids``) may
+        pass ``check_existing=False``.
+        """
+        vector = self._normalized(vector)
+        if vector is None:
+            return False
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Embedding has {vector.shape[0]} dimensions, index expects {self.dim}")
+
+        key = diagnosisId.encode('ascii')
+        with self._writing():
+            if check_existing and self._row_of(key) is not None:
+                return False
+            if self.count >= self.capacity:
+                self._grow()
+            row = self.count
+            self._vectors[row] = vector
+            if self._lists is not None:
+                self._lists[row] = int(np.argmax(self.centroids @ vector))
+            # Written last: a row only counts once its id is set
+            self._ids[row] = key
+            self._rows.setdefault(key, row)
+            self.count += 1
+        return True
+
+    def _row_of(self, key):
+        return self._rows.get(key)
+
+    def indexed_ids(self):
+        with self._lock:
+            self._refresh()
+            return {key.decode('ascii') for key in self._rows}
+
+    def lookup(self, diagnosisId):
+        """The stored (normalised) embedding of a diagnosis, or None."""
+        with self._lock:
+            self._refresh()
+            row = self._row_of(diagnosisId.encode('ascii'))
+            return np.array(self._vectors[row], dtype=np.float32) if row is not None else None
+
+    def search(self, vector, k=10, nprobe=0, exclude=()):
+        """Nearest neighbours by cosine similarity as ``[(diagnosisId, score)]``, best first.
+
+        With ``nprobe`` and a trained IVF, only rows in the ``nprobe``
+        closest lists are scored; otherwise the search is exact. Also
+        returns how many rows were scored and whether IVF was used.
+        """
+        query = self._normalized(vector)
+        if query is None:
+            return [], {"mode": "exact", "scored": 0}
+
+        with self._lock:
+            self._refresh()
+            count = self.count
+            vectors, ids, lists, centroids = self._vectors, self._ids, self._lists, self.centroids
+
+        wanted = k + len(exclude)
+        if nprobe and centroids is not None and lists is not None:
+            probes = np.argsort(-(centroids @ query))[:nprobe]
+            rows = np.flatnonzero(np.isin(lists[:count], probes))
+            scores = vectors[rows].astype(np.float32) @ query
+            best_rows, best_scores = self._top(rows, scores, wanted)
+            mode, scored = "ivf", len(rows)
+        else:
+            best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            for start in range(0, count, SEARCH_CHUNK_ROWS):
+                end = min(count, start + SEARCH_CHUNK_ROWS)
+                scores = vectors[start:end].astype(np.float32) @ query
+                rows, scores = self._top(np.arange(start, end), scores, wanted)
+                best_rows, best_scores = self._top(np.concatenate([best_rows, rows]), np.concatenate([best_scores, scores]), wanted)
+            mode, scored = "exact", count
+
+        excluded = {value.encode('ascii') for value in exclude}
+        results = []
+        for row, score in zip(best_rows, best_scores):
+            key = bytes(ids[row])
+            if not key or key in excluded:
+                continue
+            results.append((key.decode('ascii'), float(score)))
+            if len(results) == k:
+                break
+        return results, {"mode": mode, "scored": int(scored)}
+
+    @staticmethod
+    def _top(rows, scores, k):
+        if len(scores) > k:
+            keep = np.argpartition(-scores, k)[:k]
+            rows, scores = rows[keep], scores[keep]
+        order = np.argsort(-scores)
+        return rows[order], scores[order]
+
+    def train_ivf(self, lists=None, iterations=10, sample_size=65536, seed=0):
+        """Cluster the indexed vectors into ``lists`` (default sqrt(count)) and assign every row.
+
+        The clustering reads a sample without holding the writer lock; only
+        saving the centroids and assigning the rows (including any appended
+        meanwhile) blocks other writers.
+        """
+        with self._lock:
+            self._refresh()
+            count, vectors = self.count, self._vectors
+        if count == 0:
+            raise ValueError("Cannot partition an empty index")
+        lists = max(1, min(int(lists or math.sqrt(count)), count))
+        rng = np.random.default_rng(seed)
+
+        sample_rows = np.sort(rng.choice(count, size=min(count, sample_size), replace=False))
+        sample = vectors[sample_rows].astype(np.float32)
+        centroids = sample[rng.choice(len(sample), size=lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for index in range(lists):
+                members = sample[assignment == index]
+                if len(members):
+                    mean = members.sum(axis=0)
+                    norm = np.linalg.norm(mean)
+                    if norm > 0:
+                        centroids[index] = mean / norm
+
+        with self._writing():
+            self.centroids = centroids.astype(np.float32)
+            temporary = self._path(f'centroids.{os.getpid()}.npy')
+            np.save(temporary, self.centroids)
+            os.replace(temporary, self._path('centroids.npy'))
+            self._lists = self._memmap('lists.i32', np.int32, (self.capacity,), fill=-1)
+            for start in range(0, self.count, SEARCH_CHUNK_ROWS):
+                end = min(self.count, start + SEARCH_CHUNK_ROWS)
+                self._lists[start:end] = np.argmax(self._vectors[start:end].astype(np.float32) @ self.centroids.T, axis=1)
+            self._lists.flush()
+            self._write_meta(self.generation + 1)
+        return lists
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+        return {
+            "count": self.count,
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "ivf_lists": len(self.centroids) if self.centroids is not None else 0,
+        }
+
+
+class EmbeddingStore:
+    """One EmbeddingIndex per model version under ``root``; embeddings of different models never mix."""
+
+    def __init__(self, root):
+        self.root = root
+        self._indexes = {}
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _dirname(modelVersion):
+        return re.sub(r'[^A-Za-z0-9._-]', '_', modelVersion)
+
+    def index_for(self, modelVersion, dim=None):
+        """The index of ``modelVersion``, created with ``dim`` if needed; None if absent and no ``dim``."""
+        with self._lock:
+            index = self._indexes.get(modelVersion)
+            if index is None:
+                directory = os.path.join(self.root, self._dirname(modelVersion))
+                if dim is None and not os.path.exists(os.path.join(directory, 'meta.json')):
+                    return None
+                index = EmbeddingIndex(directory, dim)
+                self._indexes[modelVersion] = index
+            return index
+
+    def flush(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            index.flush()
+
+    def stats(self):
+        with self._lock:
+            return {version: index.stats() for version, index in self._indexes.items()}
+
+
+class EmbeddingCapture:
+    """Adds the embedding of every stored diagnosis to the index of the model that diagnosed it.
+
+    The embedding is the pooled feature vector of the prediction's own
+    forward pass (see ``backends.FeatureRunner``), carried on the
+    DiagnosisJob, so capturing it costs no extra decode or inference. It is
+    added after the diagnosis row is committed (see DiagnosisWriter).
+    Diagnoses without one (cached results, models without a feature
+    runner) are skipped.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self.indexed = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def capture_written(self, job, elapsed_ms=None):
+        """DiagnosisWriter listener."""
+        self.capture(job.diagnosisId, job.modelVersion, job.embedding)
+
+    def capture(self, diagnosisId, modelVersion, embedding):
+        if embedding is None or not modelVersion:
+            self._count("skipped")
+            return
+
+        try:
+            index = self.store.index_for(modelVersion, dim=embedding.shape[-1])
+            index.add(diagnosisId, embedding)
+            self._count("indexed")
+        except Exception as e:
+            logger.warning(f"Could not index diagnosis {diagnosisId}: {str(e)}")
+            self._count("failed")
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        return {
+            "indexed": self.indexed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "indexes": self.store.stats(),
+        }
+
+
+embedding_store = EmbeddingStore(EMBEDDING_INDEX_DIR)
@@ -0,0 +1,206 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Lower values are batched first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+# Background work is batched only once nothing more urgent is waiting on the same engine
+PRIORITY_BACKGROUND = 2
+PRIORITY_SHADOW = PRIORITY_BACKGROUND
+
+_sequence = itertools.count()
+
+
+class _InferenceRequest:
+    __slots__ = ("tensor", "model", "future", "enqueuedAt", "priority", "sequence")
+
+    def __init__(self, tensor, model, priority=PRIORITY_INTERACTIVE):
+        self.tensor = tensor
+        self.model = model
+        self.future = Future()
+        self.enqueuedAt = time.perf_counter()
+        self.priority = priority
+        self.sequence = next(_sequence)
+
+    def __lt__(self, other):
+        # FIFO within a priority level
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class InferenceEngine:
+    """Merges concurrent single-image requests into batched forward passes.
+
+    Callers submit one preprocessed (C, H, W) tensor together with the model
+    that should score it and block on their own result. A background worker
+    drains the queue, waits at most ``max_wait_ms`` for more requests to
+    arrive, stacks up to ``max_batch_size`` of them and runs a single forward
+    pass per model. Requests pinned to different models (e.g. while a new
+    version is being swapped in) are never mixed in one batch. The forward
+    pass itself is handed to ``executor`` (see ``InferencePool.run``) so it
+    can run on a native thread.
+
+    Each resolved Future carries a ``timing`` dict with the request's queue
+    wait, the forward time of its batch and the batch size. Models that
+    return ``(logits, features)`` (see ``backends.FeatureRunner``) also set
+    ``features`` on each Future to that image's pooled feature vector;
+    otherwise it is None.
+
+    The queue is ordered by ``priority``: interactive uploads are batched
+    ahead of any bulk or offline-sync images already waiting.
+    """
+
+    def __init__(self, max_batch_size=8, max_wait_ms=10, executor=None):
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.PriorityQueue()
+        self._lock = threading.Lock()
+        self._worker = None
+        # Reused for every batch; only the worker thread touches it
+        self._input_buffer = None
+
+        self._stats_lock = threading.Lock()
+        self._total_requests = 0
+        self._total_batches = 0
+        self._last_batch_size = 0
+        self._max_batch_seen = 0
+        self._batch_size_counts = {}
+        self._total_wait = 0.0
+
+    def start(self):
+        """Start the background worker if it is not already running."""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="inference-engine", daemon=True)
+                self._worker.start()
+
+    def submit(self, tensor, model, priority=PRIORITY_INTERACTIVE):
+        """Queue a single (C, H, W) tensor and return a Future for its output row."""
+        if model is None:
+            raise ValueError("Model is not loaded")
+
+        self.start()
+        request = _InferenceRequest(tensor, model, priority)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, tensor, model, timeout=None, priority=PRIORITY_INTERACTIVE):
+        """Run a single tensor through the batched model and wait for its output."""
+        return self.submit(tensor, model, priority).result(timeout=timeout)
+
+    def queue_depth(self):
+        """Requests waiting for a batch (not counting the one being run)."""
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "total_requests": self._total_requests,
+                "total_batches": self._total_batches,
+                "last_batch_size": self._last_batch_size,
+                "largest_batch_size": self._max_batch_seen,
+                "mean_batch_size": (self._total_requests / self._total_batches) if self._total_batches else 0.0,
+                "mean_queue_wait_ms": (self._total_wait / self._total_requests * 1000.0) if self._total_requests else 0.0,
+                "batch_size_counts": {str(size): count for size, count in sorted(self._batch_size_counts.items())},
+            }
+
+    def _collect_batch(self):
+        # Block until there is at least one request, then keep collecting
+        # until the batch is full or the wait window closes.
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            for batch in self._group_by_model(self._collect_batch()):
+                try:
+                    self._run_batch(batch)
+                except Exception as e:
+                    # Never let a bad batch kill the worker
+                    logger.error(f"Inference batch failed: {str(e)}", exc_info=True)
+                    for request in batch:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+
+    @staticmethod
+    def _group_by_model(batch):
+        groups = {}
+        for request in batch:
+            groups.setdefault(id(request.model), []).append(request)
+        return list(groups.values())
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        model = batch[0].model
+        inputs = self._stack([request.tensor for request in batch])
+
+        forward_started = time.perf_counter()
+        if self.executor is not None:
+            outputs = self.executor(self._forward, model, inputs)
+        else:
+            outputs = self._forward(model, inputs)
+        forward_ms = (time.perf_counter() - forward_started) * 1000.0
+
+        self._record(batch, started)
+
+        features = [None] * len(batch)
+        if isinstance(outputs, tuple):
+            outputs, features = outputs
+
+        for request, output, feature in zip(batch, outputs, features):
+            request.future.features = feature
+            request.future.timing = {
+                "queue_ms": (started - request.enqueuedAt) * 1000.0,
+                "forward_ms": forward_ms,
+                "batch_size": len(batch),
+            }
+            request.future.set_result(output)
+
+    def _stack(self, tensors):
+        import torch
+
+        shape = tuple(tensors[0].shape)
+        if (self._input_buffer is None or tuple(self._input_buffer.shape[1:]) != shape
+                or self._input_buffer.dtype != tensors[0].dtype):
+            self._input_buffer = torch.empty((self.max_batch_size,) + shape, dtype=tensors[0].dtype)
+        return torch.stack(tensors, out=self._input_buffer[:len(tensors)])
+
+    @staticmethod
+    def _forward(model, inputs):
+        import torch
+
+        # no_grad is thread-local, so it must be entered on the executing thread
+        with torch.no_grad():
+            return model(inputs)
+
+    def _record(self, batch, started):
+        size = len(batch)
+        with self._stats_lock:
+            self._total_requests += size
+            self._total_batches += 1
+            self._last_batch_size = size
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+            self._total_wait += sum(started - request.enqueuedAt for request in batch)
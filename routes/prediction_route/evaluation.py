@@ -0,0 +1,179 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+# Set in each worker process by _init_worker
+_worker_model = None
+
+
+def normalize_label(label):
+    return label.strip().lower().replace('_', ' ').replace('-', ' ')
+
+
+def discover_dataset(root):
+    """List ``(path, label)`` for every image in ``root/<label>/``; the folder name is the label."""
+    items = []
+    for entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if not entry.is_dir():
+            continue
+        for dirpath, _, filenames in os.walk(entry.path):
+            for filename in sorted(filenames):
+                if filename.rsplit('.', 1)[-1].lower() in IMAGE_EXTENSIONS:
+                    items.append((os.path.join(dirpath, filename), entry.name))
+    return items
+
+
+def match_labels(folder_labels, class_names):
+    """Map dataset folder names onto the model's class names, ignoring case, '_' and '-'.
+
+    Returns ``(mapping, unmatched)``; images under unmatched folders are skipped.
+    """
+    by_normalized = {normalize_label(name): name for name in class_names}
+    mapping, unmatched = {}, []
+    for label in sorted(set(folder_labels)):
+        class_name = by_normalized.get(normalize_label(label))
+        if class_name is None:
+            unmatched.append(label)
+        else:
+            mapping[label] = class_name
+    return mapping, unmatched
+
+
+def latency_summary(values):
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"mean": float(np.mean(values)), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def summarize(records, class_names):
+    """Accuracy, per-class precision/recall, a confusion matrix and latency percentiles.
+
+    ``records`` are the dicts produced by the workers: ``label`` and
+    ``predicted`` class names plus ``decode_ms``/``forward_ms``, or an
+    ``error`` for images that could not be read.
+    """
+    scored = [record for record in records if not record.get("error")]
+    index = {name: position for position, name in enumerate(class_names)}
+    matrix = [[0] * len(class_names) for _ in class_names]
+    for record in scored:
+        matrix[index[record["label"]]][index[record["predicted"]]] += 1
+
+    correct = sum(matrix[position][position] for position in range(len(class_names)))
+    per_class = {}
+    for position, name in enumerate(class_names):
+        support = sum(matrix[position])
+        predicted = sum(row[position] for row in matrix)
+        if not support and not predicted:
+            continue
+        hits = matrix[position][position]
+        per_class[name] = {
+            "support": support,
+            "correct": hits,
+            "precision": hits / predicted if predicted else None,
+            "recall": hits / support if support else None,
+        }
+
+    return {
+        "images": len(records),
+        "scored": len(scored),
+        "failed": len(records) - len(scored),
+        "correct": correct,
+        "accuracy": correct / len(scored) if scored else None,
+        "per_class": per_class,
+        "confusion": {"labels": list(class_names), "matrix": matrix},
+        "latency": {
+            "decode_ms": latency_summary([record["decode_ms"] for record in scored]),
+            "forward_ms": latency_summary([record["forward_ms"] for record in scored]),
+            "total_ms": latency_summary([record["decode_ms"] + record["forward_ms"] for record in scored]),
+        },
+    }
+
+
+def _init_worker(snapshot, torch_threads):
+    global _worker_model
+    import torch
+    from .registry import model_registry
+
+    # Each process gets its share of the cores instead of every process using all of them
+    torch.set_num_threads(torch_threads)
+    _worker_model = model_registry.load_snapshot(snapshot)
+
+
+def _evaluate_chunk(chunk):
+    """Decode and classify one batch of ``(path, class_name)`` items in a worker process."""
+    import torch
+    from .prediction import decode_and_transform
+
+    records, tensors, decoded = [], [], []
+    for path, label in chunk:
+        timings = {}
+        try:
+            tensors.append(decode_and_transform(path, timings))
+            decoded.append((path, label, timings["decode_ms"] + timings["preprocess_ms"]))
+        except Exception as e:
+            records.append({"path": path, "label": label, "error": str(e)})
+
+    if not tensors:
+        return records
+
+    started = time.perf_counter()
+    with torch.no_grad():
+        outputs = _worker_model.module(torch.stack(tensors))
+    # The batch's forward time is shared evenly by its images
+    forward_ms = (time.perf_counter() - started) * 1000.0 / len(tensors)
+
+    class_names = _worker_model.classNames
+    for (path, label, decode_ms), output in zip(decoded, outputs):
+        predicted = int(torch.argmax(output))
+        if predicted >= len(class_names):
+            records.append({"path": path, "label": label, "error": f"Model has no class name for output {predicted}"})
+            continue
+        records.append({
+            "path": path,
+            "label": label,
+            "predicted": class_names[predicted],
+            "decode_ms": decode_ms,
+            "forward_ms": forward_ms,
+        })
+    return records
+
+
+def evaluate_model(snapshot, dataset, workers=None, batch_size=16, progress=None):
+    """Evaluate the model described by ``snapshot`` (see ``ModelRegistry.snapshot``) on ``dataset``.
+
+    ``dataset`` is a list of ``(path, class_name)``. Decoding and inference
+    run in ``workers`` processes, each taking batches of ``batch_size``
+    images. ``progress(done, total)`` is called as batches complete.
+    """
+    from .registry import model_registry
+
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    chunks = [dataset[start:start + batch_size] for start in range(0, len(dataset), batch_size)]
+
+    started = time.perf_counter()
+    records = []
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers, initializer=_init_worker, initargs=(snapshot, torch_threads)) as pool:
+        for chunk_records in pool.imap_unordered(_evaluate_chunk, chunks):
+            records.extend(chunk_records)
+            if progress is not None:
+                progress(len(records), len(dataset))
+    duration = time.perf_counter() - started
+
+    report = summarize(records, list(snapshot["classNames"]))
+    report.update({
+        "backend": model_registry.backend,
+        "workers": workers,
+        "torch_threads": torch_threads,
+        "batch_size": batch_size,
+        "duration_seconds": duration,
+        "throughput": len(dataset) / duration if duration else None,
+        "errors": [{"path": record["path"], "error": record["error"]} for record in records if record.get("error")][:20],
+    })
+    return report
@@ -0,0 +1,61 @@
+import logging
+import os
+from flask import request
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import DiagnosisResult, db
+from .persistence import diagnosis_writer
+from .prediction import UPLOADS_DIR, allowed_file, save_image_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class OriginalImageResource(Resource):
+    @jwt_required()
+    def post(self, diagnosis_id):
+        """Replace the compact image stored with a diagnosis by the full-resolution photo.
+
+        Clients that predicted from a pre-resized payload send the original
+        here afterwards, typically on Wi-Fi; the prediction itself never waits
+        for it.
+        """
+        userId = int(get_jwt_identity()["userId"])
+
+        image = request.files.get('image')
+        if not image or not image.filename:
+            return {"message": "No image file provided"}, 400
+        if not allowed_file(image.filename):
+            return {"message": "File format not supported. Please upload png, jpg, jpeg, or gif, webp."}, 400
+
+        image_bytes = image.read()
+        if not image_bytes:
+            return {"message": "Empty image file provided"}, 400
+
+        result = DiagnosisResult.query.filter_by(diagnosisId=diagnosis_id).first()
+        if not result:
+            if diagnosis_writer.is_pending(diagnosis_id):
+                return {"message": "Diagnosis is still being saved, retry shortly."}, 409, {"Retry-After": "1"}
+            return {"message": "Diagnosis result not found."}, 404
+        if result.userId != userId:
+            return {"message": "You are not authorized to update this diagnosis."}, 403
+
+        previous_url = result.image_path
+        try:
+            permanent_file_path, image_url = save_image_bytes(image_bytes, image.filename.rsplit('.', 1)[1].lower())
+            result.image_path = image_url
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error storing original image: {str(e)}")
+            return {"message": "Failed to store original image"}, 500
+
+        # The compact copy is no longer referenced
+        if previous_url:
+            previous_path = os.path.join(UPLOADS_DIR, os.path.basename(previous_url))
+            try:
+                if os.path.exists(previous_path):
+                    os.remove(previous_path)
+            except OSError as e:
+                logger.warning(f"Could not remove replaced image {previous_path}: {str(e)}")
+
+        return {"message": "Original image stored", "diagnosisId": diagnosis_id, "image_url": image_url}, 200
@@ -0,0 +1,112 @@
+import io
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from .config import IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH
+
+PAYLOAD_IMAGE = 'image'
+PAYLOAD_COMPACT = 'compact'
+PAYLOAD_TENSOR = 'tensor'
+
+# Pre-resized uploads the server can feed to the model without resizing
+COMPACT_FORMATS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+TENSOR_BYTES = IMG_HEIGHT * IMG_WIDTH * IMG_CHANNELS
+TENSOR_LAYOUTS = ('hwc', 'chw')
+
+
+class PredictionUpload:
+    """The model input of a prediction request plus the image to keep if a diagnosis is stored.
+
+    ``kind`` is one of PAYLOAD_IMAGE (any supported image, resized on the
+    server), PAYLOAD_COMPACT (a IMG_WIDTH x IMG_HEIGHT JPEG/WebP resized on
+    the phone) or PAYLOAD_TENSOR (raw uint8 RGB pixels, nothing to decode).
+    ``original`` is the optional full-resolution photo sent alongside a
+    compact payload.
+    """
+    __slots__ = ("kind", "data", "extension", "layout", "original", "originalExtension")
+
+    def __init__(self, kind, data, extension, layout='hwc', original=None, originalExtension=None):
+        self.kind = kind
+        self.data = data
+        self.extension = extension
+        self.layout = layout
+        self.original = original
+        self.originalExtension = originalExtension
+
+    @property
+    def compact(self):
+        return self.kind != PAYLOAD_IMAGE
+
+    @property
+    def input_format(self):
+        """How ``data`` turns into pixels; identical bytes in different formats are different inputs."""
+        return f"{self.kind}-{self.layout}" if self.kind == PAYLOAD_TENSOR else self.kind
+
+
+def inspect_compact(image_bytes):
+    """Return the file extension if ``image_bytes`` is a IMG_WIDTH x IMG_HEIGHT JPEG/WebP, else None.
+
+    Only the header is parsed; no pixels are decoded.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            if image.size == (IMG_WIDTH, IMG_HEIGHT) and image.format in COMPACT_FORMATS:
+                return COMPACT_FORMATS[image.format]
+    except (UnidentifiedImageError, OSError):
+        pass
+    return None
+
+
+def encode_raw_image(data, layout='hwc', quality=90):
+    """JPEG-encode a raw uint8 tensor payload so it can be stored like any other upload."""
+    pixels = np.frombuffer(data, dtype=np.uint8)
+    if layout == 'chw':
+        pixels = pixels.reshape(IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH).transpose(1, 2, 0)
+    else:
+        pixels = pixels.reshape(IMG_HEIGHT, IMG_WIDTH, IMG_CHANNELS)
+    buffer = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(pixels), 'RGB').save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def read_prediction_upload(files, form, allowed_file):
+    """Build a PredictionUpload from the request's ``tensor``/``image`` and optional ``original`` parts.
+
+    Raises ValueError with a client-facing message for invalid payloads.
+    """
+    original, original_extension = None, None
+    original_file = files.get('original')
+    if original_file and original_file.filename:
+        if not allowed_file(original_file.filename):
+            raise ValueError("Original image format not supported. Please upload png, jpg, jpeg, or gif, webp.")
+        original = original_file.read() or None
+        original_extension = original_file.filename.rsplit('.', 1)[1].lower()
+
+    tensor_file = files.get('tensor')
+    if tensor_file is not None:
+        layout = (form.get('layout') or 'hwc').lower()
+        if layout not in TENSOR_LAYOUTS:
+            raise ValueError(f"Tensor layout must be one of: {', '.join(TENSOR_LAYOUTS)}")
+        data = tensor_file.read()
+        if len(data) != TENSOR_BYTES:
+            raise ValueError(f"Tensor payload must be exactly {TENSOR_BYTES} bytes ({IMG_WIDTH}x{IMG_HEIGHT}x{IMG_CHANNELS} uint8 RGB)")
+        return PredictionUpload(PAYLOAD_TENSOR, data, 'jpg', layout, original, original_extension)
+
+    if 'image' not in files:
+        raise ValueError("No image file provided")
+
+    image = files.get('image')
+    if not image or not image.filename:
+        raise ValueError("Empty image file provided")
+    if not allowed_file(image.filename):
+        raise ValueError("File format not supported. Please upload png, jpg, jpeg, or gif, webp.")
+
+    data = image.read()
+    if not data:
+        raise ValueError("Empty image file provided")
+
+    compact_extension = inspect_compact(data)
+    if compact_extension:
+        return PredictionUpload(PAYLOAD_COMPACT, data, compact_extension, original=original, originalExtension=original_extension)
+    return PredictionUpload(PAYLOAD_IMAGE, data, image.filename.rsplit('.', 1)[1].lower(), original=original, originalExtension=original_extension)
@@ -0,0 +1,296 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from models import DiagnosisResult, db
+from .catalog import user_districts
+from .payloads import encode_raw_image
+from .telemetry import inference_telemetry
+from .config import (
+    DIAGNOSIS_DRAIN_TIMEOUT, DIAGNOSIS_WRITE_BATCH_SIZE, DIAGNOSIS_WRITE_RETRIES, DIAGNOSIS_WRITE_RETRY_DELAY
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DiagnosisJob:
+    """Everything needed to store one diagnosis after the response has been sent."""
+    __slots__ = ("diagnosisId", "userId", "diseaseId", "date", "imageBytes", "filePath", "imageUrl",
+                 "modelVersion", "modelId", "inferenceBackend", "rawLayout", "embedding", "sample", "attempts", "submittedAt")
+
+    def __init__(self, diagnosisId, userId, diseaseId, date, imageBytes, filePath, imageUrl,
+                 modelVersion, inferenceBackend, rawLayout=None, modelId=None, embedding=None, sample=None):
+        self.diagnosisId = diagnosisId
+        self.userId = userId
+        self.diseaseId = diseaseId
+        self.date = date
+        self.imageBytes = imageBytes
+        self.filePath = filePath
+        self.imageUrl = imageUrl
+        self.modelVersion = modelVersion
+        self.modelId = modelId
+        self.inferenceBackend = inferenceBackend
+        # Set when imageBytes are raw pixels that still need encoding (see payloads.encode_raw_image)
+        self.rawLayout = rawLayout
+        # Pooled features from the prediction's forward pass, for the similar-case index
+        self.embedding = embedding
+        # The prediction's telemetry sample (see InferenceTelemetry), which gets the write time
+        self.sample = sample
+        self.attempts = 0
+        self.submittedAt = None
+
+    def pending_view(self):
+        return {
+            "diagnosisId": self.diagnosisId,
+            "userId": self.userId,
+            "diseaseId": self.diseaseId,
+            "date": self.date.isoformat(),
+            "image_path": self.imageUrl,
+            "model_version": self.modelVersion,
+            "model_id": self.modelId,
+            "inference_backend": self.inferenceBackend,
+        }
+
+
+class DiagnosisWriter:
+    """Background worker that stores diagnosis images and rows off the request path.
+
+    Jobs queued together are inserted with a single commit. If that commit
+    fails, each job is inserted in its own transaction so one bad row cannot
+    take the rest of the batch down; only the jobs that still fail are
+    retried with exponential backoff, up to ``max_retries`` times, after
+    which the image is removed and the job is dropped with an error log.
+    Jobs whose image file could not be written take the same retry path. On
+    interpreter exit the queue is drained for up to ``drain_timeout``
+    seconds. ``on_written(job, elapsed_ms)`` and any listener added with
+    ``add_listener`` are called for every stored job, while its image bytes
+    are still available.
+    """
+
+    def __init__(self, batch_size=32, max_retries=3, retry_delay=0.5, drain_timeout=10.0, district_lookup=None,
+                 on_written=None):
+        self.batch_size = max(1, int(batch_size))
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.drain_timeout = drain_timeout
+        self.district_lookup = district_lookup
+        self._listeners = [on_written] if on_written is not None else []
+
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._app = None
+        self._stopping = False
+
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+
+        atexit.register(self.shutdown)
+
+    def submit(self, job):
+        """Queue a job; needs an app context the first time so the worker can open its own."""
+        if self._stopping:
+            raise RuntimeError("Diagnosis writer is shutting down")
+
+        job.submittedAt = time.perf_counter()
+        with self._pending_lock:
+            self._pending[job.diagnosisId] = job
+        self._start(current_app._get_current_object())
+        self._queue.put(job)
+
+    def add_listener(self, listener):
+        """Call ``listener(job, elapsed_ms)`` after each job is stored."""
+        self._listeners.append(listener)
+
+    def is_pending(self, diagnosisId):
+        with self._pending_lock:
+            return diagnosisId in self._pending
+
+    def pending_for_user(self, userId):
+        with self._pending_lock:
+            return [job.pending_view() for job in self._pending.values() if job.userId == userId]
+
+    def stats(self):
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "pending": pending,
+            "written": self.written,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    def shutdown(self):
+        """Stop accepting work and flush what is queued."""
+        self._stopping = True
+        if self._worker is None or not self._worker.is_alive():
+            return
+
+        deadline = time.monotonic() + self.drain_timeout
+        while not self._queue.empty() or self._has_pending():
+            if time.monotonic() > deadline:
+                logger.error(f"Diagnosis writer shut down with {self._queue.qsize()} unsaved diagnoses")
+                return
+            time.sleep(0.05)
+
+    def _has_pending(self):
+        with self._pending_lock:
+            return bool(self._pending)
+
+    def _start(self, app):
+        with self._lock:
+            if self._app is None:
+                self._app = app
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="diagnosis-writer", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._app.app_context():
+                self._write(jobs)
+
+    def _write(self, jobs):
+        ready, unwritten = [], []
+        for job in jobs:
+            try:
+                if not os.path.exists(job.filePath):
+                    self._write_file(job)
+                ready.append(job)
+            except Exception as e:
+                logger.warning(f"File storage failed for diagnosis {job.diagnosisId}: {str(e)}")
+                unwritten.append(job)
+        self._retry(unwritten)
+
+        if not ready:
+            return
+
+        try:
+            stored = self._insert(ready)
+        finally:
+            db.session.remove()
+
+        for job in stored:
+            # Submit-to-commit time, including queueing and any retries
+            elapsed_ms = (time.perf_counter() - job.submittedAt) * 1000.0
+            for listener in self._listeners:
+                try:
+                    listener(job, elapsed_ms)
+                except Exception as e:
+                    logger.warning(f"Diagnosis listener failed for {job.diagnosisId}: {str(e)}")
+            self._finish(job, succeeded=True)
+
+    @staticmethod
+    def _write_file(job):
+        if job.rawLayout:
+            job.imageBytes = encode_raw_image(job.imageBytes, job.rawLayout)
+            job.rawLayout = None
+        # Renamed into place, so a write that fails halfway never leaves a file a retry would skip
+        temporary = f"{job.filePath}.part"
+        try:
+            with open(temporary, 'wb') as f:
+                f.write(job.imageBytes)
+            os.replace(temporary, job.filePath)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def _insert(self, jobs):
+        """Commit the rows of ``jobs``, falling back to one transaction per row; returns the stored jobs."""
+        try:
+            db.session.add_all([self._to_row(job) for job in jobs])
+            db.session.commit()
+            return jobs
+        except Exception as e:
+            db.session.rollback()
+            if len(jobs) == 1:
+                logger.warning(f"Saving diagnosis {jobs[0].diagnosisId} failed: {str(e)}")
+                self._retry(jobs)
+                return []
+            logger.warning(f"Saving {len(jobs)} diagnoses together failed, saving them one by one: {str(e)}")
+
+        stored, failed = [], []
+        for job in jobs:
+            try:
+                db.session.add(self._to_row(job))
+                db.session.commit()
+                stored.append(job)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Saving diagnosis {job.diagnosisId} failed: {str(e)}")
+                failed.append(job)
+        self._retry(failed)
+        return stored
+
+    def _retry(self, jobs):
+        for job in jobs:
+            job.attempts += 1
+            if job.attempts > self.max_retries:
+                logger.error(f"Giving up on diagnosis {job.diagnosisId} after {job.attempts} attempts")
+                if os.path.exists(job.filePath):
+                    os.remove(job.filePath)
+                self._finish(job, succeeded=False)
+                continue
+
+            self.retried += 1
+            delay = self.retry_delay * (2 ** (job.attempts - 1))
+            # Requeue after a backoff without blocking the jobs behind it
+            timer = threading.Timer(delay, self._queue.put, args=(job,))
+            timer.daemon = True
+            timer.start()
+
+    def _finish(self, job, succeeded):
+        job.imageBytes = None
+        job.embedding = None
+        job.sample = None
+        with self._pending_lock:
+            self._pending.pop(job.diagnosisId, None)
+        if succeeded:
+            self.written += 1
+        else:
+            self.failed += 1
+
+    def _to_row(self, job):
+        return DiagnosisResult(
+            diagnosisId=job.diagnosisId,
+            userId=job.userId,
+            diseaseId=job.diseaseId,
+            districtId=self.district_lookup(job.userId) if self.district_lookup else None,
+            date=job.date,
+            image_path=job.imageUrl,
+            detected=True,
+            modelVersion=job.modelVersion,
+            modelId=job.modelId,
+            inferenceBackend=job.inferenceBackend,
+            rated=False
+        )
+
+
+def record_persisted(job, elapsed_ms):
+    inference_telemetry.record_persisted(job.modelVersion, elapsed_ms, job.sample)
+
+
+diagnosis_writer = DiagnosisWriter(
+    batch_size=DIAGNOSIS_WRITE_BATCH_SIZE,
+    max_retries=DIAGNOSIS_WRITE_RETRIES,
+    retry_delay=DIAGNOSIS_WRITE_RETRY_DELAY,
+    drain_timeout=DIAGNOSIS_DRAIN_TIMEOUT,
+    district_lookup=user_districts.get,
+    on_written=record_persisted
+)
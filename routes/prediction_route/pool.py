@@ -0,0 +1,90 @@
+import logging
+
+from .config import INFERENCE_POOL_MODE, INFERENCE_POOL_SIZE, TORCH_NUM_INTEROP_THREADS, TORCH_NUM_THREADS
+
+logger = logging.getLogger(__name__)
+
+POOL_MODE_TPOOL = 'tpool'
+POOL_MODE_INLINE = 'inline'
+
+
+def configure_torch_threads(num_threads=0, num_interop_threads=0):
+    """Apply intra-op/inter-op thread counts; 0 keeps torch's defaults."""
+    import torch
+
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError as e:
+            # Can only be set before the first parallel region runs
+            logger.warning(f"Could not set torch inter-op threads: {str(e)}")
+
+
+def _eventlet_patched():
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+    return patcher.is_monkey_patched('thread')
+
+
+class InferencePool:
+    """Runs CPU-bound work (image decode, forward passes) off the eventlet hub.
+
+    Under the eventlet worker every "thread" is a green thread, so a forward
+    pass executed directly would freeze all other requests and Socket.IO
+    heartbeats until it returns. With ``mode='tpool'`` the call is handed to
+    eventlet's pool of native OS threads and the calling green thread yields
+    until it completes; torch and PIL release the GIL for the heavy lifting.
+    Outside eventlet (or with ``mode='inline'``) work runs on the caller's
+    thread, which is already a real OS thread.
+
+    Torch thread counts are applied the first time work is submitted, so
+    processes that never run inference never import torch.
+    """
+
+    def __init__(self, mode=POOL_MODE_TPOOL, size=4, torch_threads=0, torch_interop_threads=0):
+        self.mode = mode
+        self.size = max(1, int(size))
+        self.torch_threads = torch_threads
+        self.torch_interop_threads = torch_interop_threads
+        self._tpool = None
+        self._resolved = False
+
+    def run(self, fn, *args, **kwargs):
+        tpool = self._get_tpool()
+        if tpool is None:
+            return fn(*args, **kwargs)
+        return tpool.execute(fn, *args, **kwargs)
+
+    def describe(self):
+        import torch
+
+        return {
+            "mode": self.mode if self._get_tpool() is not None else POOL_MODE_INLINE,
+            "size": self.size,
+            "torch_threads": torch.get_num_threads(),
+            "torch_interop_threads": torch.get_num_interop_threads(),
+        }
+
+    def _get_tpool(self):
+        # Resolved lazily: the eventlet worker patches threading after import
+        if not self._resolved:
+            configure_torch_threads(self.torch_threads, self.torch_interop_threads)
+            if self.mode == POOL_MODE_TPOOL and _eventlet_patched():
+                from eventlet import tpool
+                tpool.set_num_threads(self.size)
+                self._tpool = tpool
+                logger.info(f"Running inference on eventlet tpool with {self.size} native threads")
+            self._resolved = True
+        return self._tpool
+
+
+inference_pool = InferencePool(
+    mode=INFERENCE_POOL_MODE,
+    size=INFERENCE_POOL_SIZE,
+    torch_threads=TORCH_NUM_THREADS,
+    torch_interop_threads=TORCH_NUM_INTEROP_THREADS
+)
@@ -1,22 +1,37 @@
+import io
 import os
 import time
 import logging
 import uuid
+from concurrent.futures import Future
 from datetime import datetime
 from flask import jsonify, request
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Crop, DiagnosisResult, Disease, ModelVersion, Notification, UserDetails, db
-from sqlalchemy import func
+from models import Notification
 # import cloudinary.uploader
 import cloudinary.uploader
 from PIL import Image, UnidentifiedImageError
-import torch
-import torch.nn.functional as F
-import torchvision.transforms as transforms
 from werkzeug.exceptions import BadRequest
-import shutil
 from dotenv import load_dotenv
+from .admission import AdmissionRejected, admission_controller, request_priority
+from .cache import PredictionCache
+from .cascade import ROLE_CLASSIFIER, ROLE_DISEASE, ROLE_ROUTER, UNKNOWN_LABELS, Cascade, CascadeStats, forward_ms
+from .catalog import label_to_result, prediction_catalog
+from .config import (
+    INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS, INFERENCE_TIMEOUT,
+    CASCADE_ENABLED, CASCADE_MIN_ROUTER_CONFIDENCE, FAST_PREPROCESSING, INFERENCE_WARMUP_RUNS, PREDICTION_CACHE_MODE, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL,
+    SHADOW_MAX_IN_FLIGHT, SHADOW_SAMPLE_RATE
+)
+from .embeddings import EmbeddingCapture, embedding_store
+from .engine import PRIORITY_INTERACTIVE, InferenceEngine
+from .payloads import PAYLOAD_COMPACT, PAYLOAD_TENSOR, read_prediction_upload
+from .persistence import DiagnosisJob, diagnosis_writer
+from .pool import inference_pool
+from .registry import model_registry
+from .shadow import ShadowEvaluator, per_image_ms
+from .telemetry import inference_telemetry
+from .warmup import InferenceWarmup
 
 # Load environment variables
 load_dotenv()
@@ -26,36 +41,31 @@ BACKEND_URL = os.getenv('BACKEND_URL')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Model and config
-class_names = [
-    'Unknown',
-    'black_sigatoka',
-    'healthly_banana',
-    'healthly_coffee',
-    'leaf_rust',
-    'yellow_sigatoka'
-]
-
-try:
-    model = torch.jit.load("models_storage/agri_model_mobile.pt")
-    model.to("cpu")
-    model.eval()
-except Exception as e:
-    logger.error(f"Failed to load model: {str(e)}")
-    model = None
-
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.4141, 0.4764, 0.2334], std=[0.2762, 0.2792, 0.2551])
-])
-
-TEMP_DIR = 'temp'
+# Concurrent requests share batched forward passes through this engine
+inference_engine = InferenceEngine(
+    max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+    executor=inference_pool.run
+)
+
+# How far requests get through the two-stage cascade and the compute that saves
+cascade_stats = CascadeStats()
+
+# Retries and resubmitted photos are answered without another forward pass
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    ttl=PREDICTION_CACHE_TTL,
+    mode=PREDICTION_CACHE_MODE
+)
+
 UPLOADS_DIR = 'static/uploads/images'  # Changed to static folder for serving via Flask
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+# Telemetry samples listed by the stats endpoint (?recent=)
+STATS_RECENT_SAMPLES = 20
+STATS_MAX_RECENT_SAMPLES = 500
 
 # Create necessary directories
-for directory in [TEMP_DIR, UPLOADS_DIR]:
+for directory in [UPLOADS_DIR]:
     if not os.path.exists(directory):
         try:
             os.makedirs(directory)
@@ -65,198 +75,493 @@ for directory in [TEMP_DIR, UPLOADS_DIR]:
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def predict_image_pytorch(image_path):
+def is_admin():
+    claims = get_jwt_identity()
+    return claims.get('role') == 'admin'
+
+def allocate_image_path(extension):
+    """Pick the storage path and public URL for an upload without writing it yet."""
+    unique_filename = f"{uuid.uuid4().hex}.{extension}"
+    permanent_file_path = os.path.join(UPLOADS_DIR, unique_filename)
+
+    # Ensure BACKEND_URL ends with a slash
+    backend_url = BACKEND_URL if BACKEND_URL.endswith('/') else BACKEND_URL + '/'
+    return permanent_file_path, f"{backend_url}static/uploads/images/{unique_filename}"
+
+def save_image_bytes(image_bytes, extension):
+    """Write an uploaded image to permanent storage in a single pass and return its URL."""
+    permanent_file_path, image_url = allocate_image_path(extension)
+
+    with open(permanent_file_path, 'wb') as f:
+        f.write(image_bytes)
+
+    return permanent_file_path, image_url
+
+def _record_decode(timings, started, decoded):
+    if timings is not None:
+        timings["decode_ms"] = (decoded - started) * 1000.0
+        timings["preprocess_ms"] = (time.perf_counter() - decoded) * 1000.0
+
+def decode_and_transform(image_source, timings=None):
+    """Decode an image into the model input tensor on the calling thread.
+
+    When a ``timings`` dict is given, the decode and preprocess durations are stored in it.
+    """
+    # torch/torchvision are only imported once the first image is processed
+    from .preprocessing import image_to_tensor, load_image, transform
+
+    started = time.perf_counter()
+    image = load_image(image_source) if FAST_PREPROCESSING else Image.open(image_source).convert("RGB")
+    decoded = time.perf_counter()
+    tensor = image_to_tensor(image) if FAST_PREPROCESSING else transform(image)
+    _record_decode(timings, started, decoded)
+    return tensor
+
+def decode_compact(image_source, timings=None):
+    """Decode a pre-resized upload; it is already model-sized, so nothing is resized."""
+    from .preprocessing import image_to_tensor, load_image
+
+    started = time.perf_counter()
+    image = load_image(image_source)
+    decoded = time.perf_counter()
+    tensor = image_to_tensor(image)
+    _record_decode(timings, started, decoded)
+    return tensor
+
+def upload_to_tensor(upload):
+    """The cheapest decode for a PredictionUpload's kind."""
+    if upload.kind == PAYLOAD_TENSOR:
+        from .preprocessing import raw_to_tensor
+
+        def decode_raw(source, timings=None):
+            started = time.perf_counter()
+            tensor = raw_to_tensor(source, layout=upload.layout)
+            # Nothing to decode; normalising the pixels is all the work
+            _record_decode(timings, started, started)
+            return tensor
+
+        return decode_raw
+    if upload.kind == PAYLOAD_COMPACT:
+        return decode_compact
+    return decode_and_transform
+
+def preprocess_image(image_source, timings=None):
+    """Decode an image and turn it into the normalised (C, H, W) tensor the model expects."""
+    return inference_pool.run(decode_and_transform, image_source, timings)
+
+def with_timing(result, *engine_futures):
+    """Attach the engine's queue/forward times of every stage (see InferenceEngine) to a result."""
+    timings = [getattr(future, 'timing', None) for future in engine_futures]
+    timings = [timing for timing in timings if timing]
+    if timings:
+        result["timing"] = {
+            "queue_ms": sum(timing["queue_ms"] for timing in timings),
+            "forward_ms": sum(timing["forward_ms"] for timing in timings),
+            "batch_size": timings[-1]["batch_size"],
+        }
+    return result
+
+def with_embedding(result, engine_future):
+    """Attach the pooled features the engine returned with this image (see InferenceEngine), if any."""
+    features = getattr(engine_future, 'features', None)
+    if features is not None:
+        result["embedding"] = features.numpy()
+    return result
+
+def record_prediction(result, timings, started, cached=False):
+    """Store one prediction's stage durations in the telemetry ring buffer and per-version histograms."""
+    return inference_telemetry.record(
+        result["model_version"],
+        backend=result.get("backend"),
+        batchSize=timings.get("batch_size"),
+        cached=cached,
+        decodeMs=timings.get("decode_ms"),
+        preprocessMs=timings.get("preprocess_ms"),
+        queueMs=timings.get("queue_ms"),
+        forwardMs=timings.get("forward_ms"),
+        totalMs=(time.perf_counter() - started) * 1000.0
+    )
+
+def top_label(output, loaded_model):
+    """Return the most likely label of one row of model logits and its probability."""
+    import torch
+    import torch.nn.functional as F
+
+    probabilities = F.softmax(output, dim=0)
+    predicted_class = int(torch.argmax(output))
+    confidence = probabilities[predicted_class].item()
+
+    if predicted_class >= len(loaded_model.classNames):
+        raise ValueError(f"Model {loaded_model.version} has no class name for output {predicted_class}")
+    return loaded_model.classNames[predicted_class], confidence
+
+def interpret_output(output, loaded_model):
+    """Turn one row of model logits into a prediction result."""
+    predicted_label, confidence = top_label(output, loaded_model)
+    
+    logger.debug(f"Predicted {predicted_label} ({confidence:.3f}) with model {loaded_model.version}")
+
+    result = label_to_result(predicted_label, loaded_model.crop)
+    result.update({
+        'label': predicted_label,
+        'confidence': confidence,
+        'model_version': loaded_model.version,
+        'model_id': loaded_model.modelId,
+        'backend': loaded_model.backend
+    })
+    return result
+
+def active_predictor():
+    """The cascade when a router and disease models are active, otherwise the single classifier."""
+    loaded_model = model_registry.get_active()
+    if CASCADE_ENABLED and model_registry.cascade is not None:
+        return model_registry.cascade
+    return loaded_model
+
+def _chain(future, fn, target=None):
+    """Resolve ``target`` (a new Future by default) with ``fn(future.result())`` once ``future`` completes."""
+    target = target or Future()
+
+    def done(completed):
+        try:
+            value = fn(completed.result())
+        except Exception as e:
+            target.set_exception(e)
+            return
+        if value is not None:
+            target.set_result(value)
+
+    future.add_done_callback(done)
+    return target
+
+def submit_prediction(tensor, predictor, priority=PRIORITY_INTERACTIVE):
+    """Queue a preprocessed tensor on a LoadedModel or Cascade; returns a Future of the result dict."""
+    if isinstance(predictor, Cascade):
+        return _submit_cascade(tensor, predictor, priority)
+    engine_future = inference_engine.submit(tensor, predictor.runner, priority)
+    return _chain(
+        engine_future,
+        lambda output: with_embedding(with_timing(interpret_output(output, predictor), engine_future), engine_future)
+    )
+
+def _submit_cascade(tensor, cascade, priority):
+    """Route with the cheap first-stage model and only run a disease model on relevant crops.
+
+    Confidently unknown images stop after the router. Low-confidence routes,
+    and crops without a disease model, fall back to the reference classifier.
+    """
+    result_future = Future()
+    reference = cascade.reference
+
+    def finish(result, stage, route, stage_model=None):
+        compute_ms = forward_ms(cascade.router)
+        if stage_model is not None and compute_ms is not None and forward_ms(stage_model) is not None:
+            compute_ms += forward_ms(stage_model)
+        reference_ms = forward_ms(reference)
+        saved_ms = reference_ms - compute_ms if reference_ms is not None and compute_ms is not None else None
+
+        result["cascade"] = {
+            "stage": stage,
+            "router_version": cascade.router.version,
+            "router_label": route[0],
+            "router_confidence": route[1],
+            "compute_ms": compute_ms,
+            "compute_saved_ms": saved_ms,
+        }
+        cascade_stats.record(stage, compute_ms, saved_ms)
+        return result
+
+    def on_routed(output):
+        route = top_label(output, cascade.router)
+        crop = route[0].lower()
+        confident = route[1] >= CASCADE_MIN_ROUTER_CONFIDENCE
+        disease_model = cascade.diseaseModels.get(crop)
+
+        if (confident and crop in UNKNOWN_LABELS) or (reference is None and disease_model is None):
+            result = label_to_result('Unknown')
+            result.update({
+                'label': 'Unknown',
+                'confidence': route[1],
+                'model_version': cascade.router.version,
+                'model_id': cascade.router.modelId,
+                'backend': cascade.router.backend
+            })
+            return finish(with_timing(result, router_future), ROLE_ROUTER, route)
+
+        if disease_model is not None and (confident or reference is None):
+            stage, stage_model = ROLE_DISEASE, disease_model
+        else:
+            stage, stage_model = ROLE_CLASSIFIER, reference
+
+        # The second stage resolves result_future itself; returning None leaves it pending
+        stage_future = inference_engine.submit(tensor, stage_model.runner, priority)
+        _chain(
+            stage_future,
+            lambda stage_output: finish(
+                with_embedding(
+                    with_timing(interpret_output(stage_output, stage_model), router_future, stage_future), stage_future
+                ),
+                stage, route, stage_model
+            ),
+            result_future
+        )
+        return None
+
+    router_future = inference_engine.submit(tensor, cascade.router.module, priority)
+    _chain(router_future, on_routed, result_future)
+    return result_future
+
+def predict_image_pytorch(image_source, loaded_model=None, priority=PRIORITY_INTERACTIVE, to_tensor=None, timings=None, shadow=False):
+    """Classify an image given a path or a file-like object holding its encoded bytes.
+
+    ``loaded_model`` may be a LoadedModel or a Cascade; it defaults to ``active_predictor()``.
+    ``to_tensor`` replaces the default decode for compact payloads (see ``upload_to_tensor``).
+    ``timings``, when given, receives the stage durations and batch size.
+    With ``shadow``, the input may also be sampled for candidate models (see ``ShadowEvaluator``).
+    """
     try:
-        image = Image.open(image_path).convert("RGB")
-        input_tensor = transform(image).unsqueeze(0)
+        if timings is None:
+            timings = {}
+        input_tensor = inference_pool.run(to_tensor or decode_and_transform, image_source, timings)
         
-        if model is None:
+        # Pin the model for this request so the recorded version matches the weights that ran
+        if loaded_model is None:
+            loaded_model = active_predictor()
+        if loaded_model is None:
             raise ValueError("Model is not loaded")
             
-        with torch.no_grad():
-            output = model(input_tensor)
-            probabilities = F.softmax(output, dim=1)
-            predicted_class = torch.argmax(output, dim=1)
-            confidence = probabilities[0, predicted_class].item()
-
-        predicted_label = class_names[predicted_class]
-        
-        print(predicted_label)
-
-        if predicted_label == 'healthly_banana':
-            return {'plant_type': 'banana', 'disease_status': 'Healthy'}
-        elif predicted_label == 'healthly_coffee':
-            return {'plant_type': 'coffee', 'disease_status': 'Healthy'}
-        elif predicted_label in ['black_sigatoka', 'yellow_sigatoka']:
-            return {'plant_type': 'banana', 'disease_status': predicted_label}
-        elif predicted_label in ['leaf_rust']:
-            return {'plant_type': 'coffee', 'disease_status': predicted_label}
-        else:
-            return {'plant_type': 'unknown', 'disease_status': 'unknown'}
+        result = submit_prediction(input_tensor, loaded_model, priority).result(timeout=INFERENCE_TIMEOUT)
+        # Timings describe this run only, so they are kept out of the cached result
+        timings.update(result.pop("timing", {}))
+        if shadow:
+            shadow_evaluator.offer(input_tensor, result, per_image_ms(timings))
+        return result
     except UnidentifiedImageError:
-        logger.error(f"Could not identify image file: {image_path}")
+        logger.error("Could not identify uploaded image")
         raise ValueError("The provided file is not a valid image")
     except Exception as e:
         logger.error(f"Error in prediction: {str(e)}")
         raise
 
+def predict_image_cached(image_bytes, priority=PRIORITY_INTERACTIVE, to_tensor=None, input_format='image'):
+    """Predict from encoded image bytes, reusing the stored result for a known image and model.
+
+    ``input_format`` names how ``to_tensor`` reads the bytes and is part of the cache key.
+    """
+    started = time.perf_counter()
+    loaded_model = active_predictor()
+    if loaded_model is None:
+        raise ValueError("Model is not loaded")
+
+    key = prediction_cache.key_for(image_bytes, loaded_model.fileHash, input_format)
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        cached["cached"] = True
+        cached["sample"] = record_prediction(cached, {}, started, cached=True)
+        return cached
+
+    timings = {}
+    result = predict_image_pytorch(io.BytesIO(image_bytes), loaded_model, priority, to_tensor, timings, shadow=True)
+    # The embedding and telemetry sample belong to this upload only; cached copies are served without them
+    embedding = result.pop("embedding", None)
+    prediction_cache.set(key, result)
+    result = dict(result, sample=record_prediction(result, timings, started))
+    if embedding is not None:
+        result["embedding"] = embedding
+    return result
+
+def warm_up_probe(image_bytes):
+    """One full prediction on the active model (or cascade), used to warm a worker up."""
+    loaded_model = active_predictor()
+    if loaded_model is None:
+        raise ValueError("Model is not loaded")
+    predict_image_pytorch(io.BytesIO(image_bytes), loaded_model)
+    return loaded_model
+
+# Started from gunicorn's post_worker_init hook, or by the first readiness probe
+inference_warmup = InferenceWarmup(warm_up_probe, runs=INFERENCE_WARMUP_RUNS)
+
+# Candidate models run on their own engine so shadow batches never occupy the live engine's worker
+shadow_engine = InferenceEngine(
+    max_batch_size=SHADOW_MAX_IN_FLIGHT,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+    executor=inference_pool.run
+)
+
+# Inactive candidate models scored on a sample of live traffic, after the response is computed,
+# and only while no live request is waiting for the engine
+shadow_evaluator = ShadowEvaluator(
+    shadow_engine,
+    top_label,
+    model_registry.load_async,
+    sample_rate=SHADOW_SAMPLE_RATE,
+    max_in_flight=SHADOW_MAX_IN_FLIGHT,
+    busy=lambda: inference_engine.queue_depth() > 0
+)
+
+# Embeddings of stored diagnoses, for similar-case search; added once the row is committed
+embedding_capture = EmbeddingCapture(embedding_store)
+diagnosis_writer.add_listener(embedding_capture.capture_written)
+
+def admission_rejected_response(error):
+    """429 with a Retry-After hint for a request turned away by admission control."""
+    return {
+        "message": "The prediction service is busy. Please retry shortly.",
+        "reason": error.reason,
+        "retry_after": error.retry_after
+    }, 429, {"Retry-After": str(error.retry_after)}
+
 class PredictionResource(Resource):
     @jwt_required()
     def post(self):
-        temp_file_path = None
-        
+        user_identity = get_jwt_identity()
+        userId = int(user_identity["userId"])
+        priority = request_priority(request)
+
+        # Decide before the upload is parsed so overloaded workers shed load cheaply
         try:
-            # Get user identity
-            user_identity = get_jwt_identity()
-            userId = int(user_identity["userId"])
-            
-            # Get latest active model version
-            latest_model = ModelVersion.query.filter_by(isActive=True).order_by(ModelVersion.releaseDate.desc()).first()
-            if latest_model:
-                modelVersion = latest_model.version
-            else:
-                # Fallback to default version if no active model is found
-                logger.warning("No active model found, using default version")
-                modelVersion = "1.0.0"
-
-            # Validate image file
-            if 'image' not in request.files:
-                return {"message": "No image file provided"}, 400
-                
-            image = request.files.get('image')
-            if not image or not image.filename:
-                return {"message": "Empty image file provided"}, 400
-                
-            if not allowed_file(image.filename):
-                return {"message": "File format not supported. Please upload png, jpg, jpeg, or gif, webp."}, 400
+            with admission_controller.admit(userId, priority):
+                return self._predict(userId, priority)
+        except AdmissionRejected as e:
+            return admission_rejected_response(e)
 
-            # Save file temporarily
-            filename = image.filename
-            extension = filename.rsplit('.', 1)[1].lower()
-            temp_file_path = os.path.join(TEMP_DIR, filename)
-            image.save(temp_file_path)
+    def _predict(self, userId, priority):
+        try:
+            # A full image, a client-resized 224x224 JPEG/WebP or raw uint8 pixels,
+            # plus an optional original photo; kept in memory until a diagnosis is stored
+            upload = read_prediction_upload(request.files, request.form, allowed_file)
 
             # Process image and get prediction
             start_time = time.time()
-            result = predict_image_pytorch(temp_file_path)
+            result = predict_image_cached(upload.data, priority, upload_to_tensor(upload), upload.input_format)
             prediction_time = time.time() - start_time
+            modelVersion = result["model_version"]
 
             # Prepare response
             response = {
-                "detected": result["plant_type"] in ['banana', 'coffee'],
+                "detected": result["plant_type"] != 'unknown',
                 "disease_status": result["disease_status"],
                 "plant_type": result["plant_type"],
                 "prediction_time": f"{prediction_time:.3f} seconds",
                 "model_version": modelVersion,
+                "backend": result.get("backend"),
+                "cached": result.get("cached", False),
+                "cascade": result.get("cascade"),
                 "rated": False
             }
 
-            # If valid plant type detected, get additional data
-            if result["plant_type"] in ['banana', 'coffee']:
-                # Get crop information
-                crop_name = result["plant_type"].capitalize()
-                crop = Crop.query.filter(func.lower(Crop.name) == func.lower(crop_name)).first()
+            # If valid plant type detected, get additional data from the precomputed catalog
+            if result["plant_type"] != 'unknown':
+                entry = prediction_catalog.lookup(result["label"], result["plant_type"])
 
-                if crop:
-                    response["cropId"] = crop.cropId
-                    response["cropName"] = crop.name
+                if entry["crop"]:
+                    response.update(entry["crop"])
                     
-                    # Get disease information
                     try:
-                        disease = Disease.query.filter_by(cropId=crop.cropId, label=result["disease_status"]).first()
+                        disease = entry["disease"]
                         
                         if disease:
-                            response.update({
-                                "diseaseId": disease.diseaseId,
-                                "diseaseName": disease.name,
-                                "diseaseDescription": disease.description,
-                                "diseaseLabel": disease.label,
-                                "diseaseSymptoms": disease.symptoms,
-                                "diseaseTreatment": disease.treatment,
-                                "diseasePrevention": disease.prevention,
-                                "relatedDiseases": disease.relatedDiseases.split(",") if disease.relatedDiseases else []
-                            })
-
-                            # Get user district
-                            try:
-                                user_details = UserDetails.query.filter_by(userId=userId).first()
-                                districtId = user_details.districtId if user_details else None
-                            except Exception as e:
-                                logger.warning(f"Failed to get user district: {str(e)}")
-                                districtId = None
-
-                            # Generate a unique filename for permanent storage
-                            unique_filename = f"{uuid.uuid4().hex}.{extension}"
-                            permanent_file_path = os.path.join(UPLOADS_DIR, unique_filename)
+                            response.update(disease)
+
+                            # The image write and diagnosis insert happen after the response;
+                            # diagnosisId is usable for ratings and history once the row lands
+                            # Keep the original photo when one came along, otherwise the upload itself
+                            extension = upload.originalExtension if upload.original else upload.extension
+                            permanent_file_path, image_url = allocate_image_path(extension)
                             
-                            # Save file to permanent storage
-                            try:
-                                # Copy the file to permanent location
-                                shutil.copy2(temp_file_path, permanent_file_path)
-                                
-                                # Construct URL using BACKEND_URL from environment
-                                # Ensure BACKEND_URL ends with a slash
-                                if not BACKEND_URL.endswith('/'):
-                                    backend_url = BACKEND_URL + '/'
-                                else:
-                                    backend_url = BACKEND_URL
-                                
-                                image_url = f"{backend_url}static/uploads/images/{unique_filename}"
-                                response["image_url"] = image_url
-                                
-                                # Cloudinary upload code (commented out but preserved)
-                                """
-                                upload_result = cloudinary.uploader.upload(temp_file_path)
-                                image_url = upload_result.get('url')
-                                response["image_url"] = image_url
-                                """
-                            except Exception as e:
-                                logger.error(f"File storage failed: {str(e)}")
-                                raise ValueError("Failed to save image to storage")
-
-                            # Save diagnosis result to database
-                            try:
-                                new_diagnosis = DiagnosisResult(
-                                    userId=userId,
-                                    diseaseId=disease.diseaseId,
-                                    districtId=districtId,
-                                    date=datetime.utcnow(),
-                                    image_path=image_url,  # Use constructed URL
-                                    detected=True,
-                                    modelVersion=modelVersion,
-                                    rated=False
-                                )
-                                db.session.add(new_diagnosis)
-                                db.session.commit()
-                            except Exception as e:
-                                db.session.rollback()
-                                logger.error(f"Database operation failed: {str(e)}")
-                                raise ValueError("Failed to save diagnosis result to database")
+                            # Cloudinary upload code (commented out but preserved)
+                            """
+                            upload_result = cloudinary.uploader.upload(io.BytesIO(upload.original or upload.data))
+                            image_url = upload_result.get('url')
+                            """
+
+                            diagnosisId = str(uuid.uuid4())
+                            sample = result.get("sample")
+                            if sample is not None:
+                                sample.diagnosisId = diagnosisId
+                            diagnosis_writer.submit(DiagnosisJob(
+                                diagnosisId=diagnosisId,
+                                userId=userId,
+                                diseaseId=disease["diseaseId"],
+                                date=datetime.utcnow(),
+                                imageBytes=upload.original or upload.data,
+                                filePath=permanent_file_path,
+                                imageUrl=image_url,
+                                modelVersion=modelVersion,
+                                modelId=result.get("model_id"),
+                                inferenceBackend=result.get("backend"),
+                                rawLayout=upload.layout if upload.kind == PAYLOAD_TENSOR and not upload.original else None,
+                                embedding=result.get("embedding"),
+                                sample=sample
+                            ))
+                            response["image_url"] = image_url
+                            response["diagnosisId"] = diagnosisId
+
+                            # Compact payloads: the phone sends the full photo only for stored diagnoses
+                            if upload.compact and not upload.original:
+                                response["original_upload_url"] = f"/api/v1/predict/{diagnosisId}/original"
                     except Exception as e:
                         logger.error(f"Error processing disease data: {str(e)}")
                         # Continue with partial response rather than failing completely
-
-            # Clean up temporary file
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
                 
             return jsonify(response)
 
         except ValueError as e:
             # Handle known validation errors
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
             return {"message": str(e)}, 400
             
         except BadRequest as e:
             # Handle request parsing errors
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
             return {"message": "Invalid request: " + str(e)}, 400
             
         except Exception as e:
             # Handle unexpected errors
             logger.error(f"Unexpected error in prediction API: {str(e)}", exc_info=True)
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            return {"message": "An unexpected error occurred during processing"}, 500
\ No newline at end of file
+            return {"message": "An unexpected error occurred during processing"}, 500
+
+
+class PredictionReadinessResource(Resource):
+    def get(self):
+        """Readiness probe: 200 once the model is loaded and warmed up, 503 until then."""
+        inference_warmup.start()
+        status = inference_warmup.status()
+        return status, 200 if status["ready"] else 503
+
+
+class PredictionStatsResource(Resource):
+    @jwt_required()
+    def get(self):
+        """Expose inference engine queue and batching statistics."""
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to access this resource."}, 403
+
+        active = model_registry.active
+        recent = max(1, min(request.args.get('recent', STATS_RECENT_SAMPLES, type=int), STATS_MAX_RECENT_SAMPLES))
+        return {"data": {
+            "engine": inference_engine.stats(),
+            "cache": prediction_cache.stats(),
+            "pool": inference_pool.describe(),
+            "persistence": diagnosis_writer.stats(),
+            "admission": admission_controller.stats(),
+            "warmup": inference_warmup.status(),
+            "shadow": {**shadow_evaluator.stats(), "engine": shadow_engine.stats()},
+            "embeddings": embedding_capture.stats(),
+            "telemetry": {
+                **inference_telemetry.stats(),
+                "recent": inference_telemetry.recent(recent)
+            },
+            "cascade": {
+                "enabled": CASCADE_ENABLED,
+                "models": model_registry.cascade.describe() if model_registry.cascade else None,
+                **cascade_stats.stats()
+            },
+            "model": {
+                "modelId": active.modelId,
+                "version": active.version,
+                "fileHash": active.fileHash,
+                "classNames": active.classNames,
+                "backend": active.backend,
+                "backendInfo": active.backendInfo,
+            } if active else None,
+            "cachedModels": model_registry.cached_hashes()
+        }}, 200
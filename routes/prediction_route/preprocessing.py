@@ -0,0 +1,80 @@
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+
+from .config import IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH
+
+# Channel statistics of the training set
+NORMALIZE_MEAN = [0.4141, 0.4764, 0.2334]
+NORMALIZE_STD = [0.2762, 0.2792, 0.2551]
+
+# Reference torchvision pipeline; kept for calibration and benchmarking
+transform = transforms.Compose([
+    transforms.Resize((IMG_HEIGHT, IMG_WIDTH)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=NORMALIZE_MEAN, std=NORMALIZE_STD)
+])
+
+# (x / 255 - mean) / std folded into a single multiply-add on uint8 pixels
+_SCALE = torch.tensor([1.0 / (255.0 * std) for std in NORMALIZE_STD], dtype=torch.float32).view(IMG_CHANNELS, 1, 1)
+_BIAS = torch.tensor([-mean / std for mean, std in zip(NORMALIZE_MEAN, NORMALIZE_STD)], dtype=torch.float32).view(IMG_CHANNELS, 1, 1)
+
+
+def load_image(image_source, size=(IMG_WIDTH, IMG_HEIGHT)):
+    """Decode an image straight to ``size`` RGB.
+
+    For JPEGs, ``draft`` lets libjpeg decode at 1/2, 1/4 or 1/8 scale (never
+    below ``size``), so a 12 MP photo is never materialised at full
+    resolution.
+    """
+    image = Image.open(image_source)
+    image.draft('RGB', size)
+    image = image.convert('RGB')
+    if image.size != size:
+        image = image.resize(size, Image.BILINEAR)
+    return image
+
+
+def image_to_tensor(image, out=None):
+    """Normalise a ``size`` RGB image into ``out`` (C, H, W), allocating it if needed."""
+    return array_to_tensor(np.array(image, dtype=np.uint8), out=out)
+
+
+def array_to_tensor(pixels, out=None):
+    """Normalise an (H, W, C) uint8 array into ``out`` (C, H, W), allocating it if needed."""
+    pixels = torch.from_numpy(pixels).permute(2, 0, 1)
+    if out is None:
+        out = torch.empty((IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH), dtype=torch.float32)
+    return out.copy_(pixels).mul_(_SCALE).add_(_BIAS)
+
+
+def preprocess(image_source, out=None):
+    """Fast replacement for ``transform(Image.open(source).convert('RGB'))``."""
+    return image_to_tensor(load_image(image_source), out=out)
+
+
+def raw_to_tensor(source, layout='hwc', out=None):
+    """Normalise a raw IMG_HEIGHT x IMG_WIDTH x 3 uint8 payload; nothing is decoded or resized.
+
+    ``layout`` is the byte order the client used: ``hwc`` (interleaved RGB,
+    as produced by most camera/bitmap APIs) or ``chw`` (planar).
+    """
+    data = source.read() if hasattr(source, 'read') else source
+    # bytearray keeps the array writable, which torch.from_numpy expects
+    pixels = np.frombuffer(bytearray(data), dtype=np.uint8)
+    if layout == 'chw':
+        pixels = pixels.reshape(IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH).transpose(1, 2, 0)
+    else:
+        pixels = pixels.reshape(IMG_HEIGHT, IMG_WIDTH, IMG_CHANNELS)
+    return array_to_tensor(np.ascontiguousarray(pixels), out=out)
+
+
+def preprocess_batch(image_sources, out=None):
+    """Preprocess several images into one (N, C, H, W) tensor, reusing ``out`` when given."""
+    count = len(image_sources)
+    if out is None or out.shape[0] < count:
+        out = torch.empty((count, IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH), dtype=torch.float32)
+    for index, image_source in enumerate(image_sources):
+        preprocess(image_source, out=out[index])
+    return out[:count]
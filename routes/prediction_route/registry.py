@@ -0,0 +1,440 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from flask import current_app, has_app_context
+from sqlalchemy import or_
+
+from models import ModelVersion
+from .cascade import ROLE_CLASSIFIER, ROLE_DISEASE, ROLE_ROUTER, Cascade
+from .pool import inference_pool
+from .config import (
+    BACKEND_CHANNELS_LAST, BACKEND_EAGER, BACKENDS, CALIBRATION_DIR, CALIBRATION_SAMPLES, EMBEDDING_INDEX_ENABLED, IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH, INFERENCE_BACKEND,
+    MODEL_CACHE_SIZE, MODEL_REFRESH_INTERVAL, MODEL_WARMUP_RUNS, PARITY_MIN_AGREEMENT
+)
+
+logger = logging.getLogger(__name__)
+
+# Labels of the original bundled model, used when a version has no mapping of its own
+DEFAULT_CLASS_NAMES = [
+    'Unknown',
+    'black_sigatoka',
+    'healthly_banana',
+    'healthly_coffee',
+    'leaf_rust',
+    'yellow_sigatoka'
+]
+
+DEFAULT_MODEL_VERSION = "1.0.0"
+LEGACY_MODEL_FILE = "agri_model_mobile.pt"
+
+
+def parse_class_names(raw):
+    """Parse a class-name mapping given as a JSON list or a comma-separated string."""
+    if raw is None:
+        return None
+    if isinstance(raw, (list, tuple)):
+        names = list(raw)
+    else:
+        raw = raw.strip()
+        if not raw:
+            return None
+        try:
+            names = json.loads(raw)
+        except ValueError:
+            names = raw.split(",")
+
+    if not isinstance(names, list) or not all(isinstance(name, str) and name.strip() for name in names):
+        raise ValueError("Class names must be a non-empty list of strings.")
+    return [name.strip() for name in names]
+
+
+class LoadedModel:
+    """An immutable snapshot of a loaded model and the metadata that describes it.
+
+    ``module`` is the callable the engine runs: the selected backend variant
+    of the weights. ``backendInfo`` records the parity check and size of that
+    variant. ``features`` is the same variant split into body and head, which
+    returns ``(logits, embeddings)`` from one forward pass, or None when the
+    model cannot be split (see ``backends.find_feature_runner``). Live
+    predictions run ``runner``, so stored diagnoses get their embedding from
+    the pass that diagnosed them. ``crop`` is the version's crop column,
+    which names the crop of plain labels (see ``catalog.label_to_result``).
+    """
+    __slots__ = ("modelId", "version", "fileHash", "module", "classNames", "backend", "backendInfo", "features", "crop", "loadedAt")
+
+    def __init__(self, modelId, version, fileHash, module, classNames, backend=BACKEND_EAGER, backendInfo=None, features=None, crop=None):
+        self.modelId = modelId
+        self.version = version
+        self.fileHash = fileHash
+        self.module = module
+        self.classNames = classNames
+        self.backend = backend
+        self.backendInfo = backendInfo or {}
+        self.features = features
+        self.crop = crop
+        self.loadedAt = time.time()
+
+    @property
+    def runner(self):
+        return self.features or self.module
+
+
+class _CachedModule:
+    __slots__ = ("runner", "backend", "info", "features")
+
+    def __init__(self, runner, backend, info, features=None):
+        self.runner = runner
+        self.backend = backend
+        self.info = info
+        self.features = features
+
+
+class ModelRegistry:
+    """Keeps the active TorchScript model in memory and hot-swaps it on activation.
+
+    Loaded modules are cached by ``fileHash`` in a bounded LRU so switching
+    between recent versions is instant. A new version is loaded and warmed up
+    before it replaces the active one, so in-flight and subsequent requests
+    never wait on a cold load.
+
+    Weights are served through the configured ``backend``. Non-eager variants
+    are built once per fileHash, parity-checked against the eager outputs on
+    the calibration set and saved next to the model file; a variant that
+    fails the check is discarded in favour of eager.
+
+    Besides the single-stage classifier, the registry tracks the two-stage
+    cascade: the active ``router`` ModelVersion and the latest active
+    ``disease`` ModelVersion per crop. Both are refreshed together.
+    """
+
+    def __init__(self, cache_size=3, refresh_interval=30, warmup_runs=2, backend=BACKEND_EAGER):
+        if backend not in BACKENDS:
+            logger.warning(f"Unknown inference backend '{backend}', using {BACKEND_EAGER}")
+            backend = BACKEND_EAGER
+        self.backend = backend
+        self.cache_size = max(1, int(cache_size))
+        self.refresh_interval = refresh_interval
+        self.warmup_runs = warmup_runs
+
+        self._active = None
+        self._cascade = None
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_check = 0.0
+        self._refreshing = False
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def cascade(self):
+        return self._cascade
+
+    def get_cascade(self):
+        """Return the active cascade, or None unless a router and a disease model are active."""
+        self.get_active()
+        return self._cascade
+
+    def get_active(self):
+        """Return the active model, loading it on first use and refreshing it periodically."""
+        if self._active is None:
+            self.refresh()
+        elif self.refresh_interval and time.monotonic() - self._last_check > self.refresh_interval:
+            self.refresh_async()
+        return self._active
+
+    def refresh(self):
+        """Synchronise with the active ModelVersion rows; requires an app context."""
+        self._last_check = time.monotonic()
+        self._refresh_classifier()
+        self._refresh_cascade()
+        return self._active
+
+    def _refresh_classifier(self):
+        try:
+            model_version = ModelVersion.query.filter_by(isActive=True).filter(
+                or_(ModelVersion.role == ROLE_CLASSIFIER, ModelVersion.role.is_(None))
+            ).order_by(ModelVersion.releaseDate.desc()).first()
+        except Exception as e:
+            logger.error(f"Failed to look up active model version: {str(e)}")
+            model_version = None
+
+        if model_version is None:
+            if self._active is None:
+                self._activate_legacy()
+            return self._active
+
+        if self._active is not None and self._active.modelId == model_version.modelId:
+            return self._active
+
+        try:
+            self.activate(model_version)
+        except Exception as e:
+            logger.error(f"Failed to activate model {model_version.version}: {str(e)}")
+            if self._active is None:
+                self._activate_legacy()
+        return self._active
+
+    def _refresh_cascade(self):
+        try:
+            rows = ModelVersion.query.filter_by(isActive=True).filter(
+                ModelVersion.role.in_((ROLE_ROUTER, ROLE_DISEASE))
+            ).order_by(ModelVersion.releaseDate.desc()).all()
+        except Exception as e:
+            logger.error(f"Failed to look up cascade model versions: {str(e)}")
+            return
+
+        router = next((row for row in rows if row.role == ROLE_ROUTER), None)
+        disease_rows = {}
+        for row in rows:
+            if row.role == ROLE_DISEASE and row.crop:
+                disease_rows.setdefault(row.crop.lower(), row)
+
+        if router is None or not disease_rows:
+            self._cascade = None
+            return
+
+        key = (router.modelId, tuple(sorted((crop, row.modelId) for crop, row in disease_rows.items())))
+        if self._cascade is not None and self._cascade.key == key:
+            return
+
+        try:
+            cascade = Cascade(
+                self.load(router),
+                {crop: self.load(row) for crop, row in disease_rows.items()},
+                self._active,
+                key
+            )
+        except Exception as e:
+            logger.error(f"Failed to load cascade models: {str(e)}")
+            return
+
+        self._cascade = cascade
+        logger.info(f"Activated cascade with router {router.version} and disease models for {', '.join(sorted(disease_rows))}")
+
+    def refresh_async(self):
+        """Refresh on a background thread so the calling request is never blocked."""
+        if not has_app_context():
+            return
+
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._last_check = time.monotonic()
+
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="model-registry-refresh", daemon=True).start()
+
+    def activate(self, model_version):
+        """Load (or reuse) the weights of ``model_version`` and make them active."""
+        return self._activate(self._snapshot(model_version))
+
+    def load(self, model_version):
+        """Load (or reuse) the weights of ``model_version`` without activating them."""
+        return self._load(**self._snapshot(model_version))
+
+    def snapshot(self, model_version):
+        """The plain values ``load_snapshot`` needs; safe to pickle into another process."""
+        return self._snapshot(model_version)
+
+    def load_snapshot(self, snapshot):
+        """Load from a ``snapshot`` dict, e.g. in a worker process without a database session."""
+        return self._load(**snapshot)
+
+    def load_async(self, model_version):
+        """Load ``model_version`` on a background thread; returns a Future of the LoadedModel."""
+        snapshot = self._snapshot(model_version)
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self._load(**snapshot))
+            except Exception as e:
+                logger.error(f"Failed to load model {snapshot['version']}: {str(e)}")
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="model-registry-load", daemon=True).start()
+        return future
+
+    def activate_async(self, model_version):
+        """Warm up ``model_version`` in the background and swap it in once ready."""
+        if model_version.role not in (None, ROLE_CLASSIFIER):
+            # Cascade stages are picked up by re-reading all active rows
+            self.refresh_async()
+            return
+
+        snapshot = self._snapshot(model_version)
+
+        def run():
+            try:
+                self._activate(snapshot)
+            except Exception as e:
+                logger.error(f"Failed to activate model {snapshot['version']}: {str(e)}")
+
+        threading.Thread(target=run, name="model-registry-activate", daemon=True).start()
+
+    def _snapshot(self, model_version):
+        # Detach what we need from the ORM row so it can cross threads
+        return {
+            "modelId": model_version.modelId,
+            "version": model_version.version,
+            "fileHash": model_version.fileHash,
+            "path": self._resolve_path(model_version.filePath),
+            "classNames": parse_class_names(model_version.classNames) or DEFAULT_CLASS_NAMES,
+            "crop": model_version.crop,
+        }
+
+    def _activate(self, snapshot):
+        loaded = self._load(**snapshot)
+        # A single reference assignment: readers see either the old or the new model
+        self._active = loaded
+        if self._cascade is not None:
+            self._cascade = self._cascade.with_reference(loaded)
+        logger.info(f"Activated model version {loaded.version} ({loaded.fileHash[:12]})")
+        return loaded
+
+    def cached_hashes(self):
+        with self._lock:
+            return list(self._cache.keys())
+
+    def _resolve_path(self, file_path):
+        storage = current_app.config.get('MODEL_STORAGE', './models_storage') if has_app_context() else './models_storage'
+        return os.path.join(storage, file_path)
+
+    def _load(self, modelId, version, fileHash, path, classNames, crop=None):
+        cache_key = f"{fileHash}:{self.backend}"
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+
+        if cached is None:
+            # Loading and warming up is CPU-bound; keep it off the eventlet hub
+            cached = inference_pool.run(self._load_module, path, fileHash)
+
+            with self._lock:
+                self._cache[cache_key] = cached
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return LoadedModel(modelId, version, fileHash, cached.runner, list(classNames), cached.backend, cached.info, cached.features, crop)
+
+    def _load_module(self, path, fileHash):
+        import torch
+        from .backends import build_variant, check_parity, load_calibration_inputs, serialized_size, wrap_runner
+        from .preprocessing import transform
+
+        module = torch.jit.load(path, map_location="cpu")
+        module.eval()
+
+        if self.backend == BACKEND_EAGER:
+            return self._warmed(module, BACKEND_EAGER, {"sizeBytes": os.path.getsize(path)}, self._features(module, BACKEND_EAGER))
+
+        variant_path = os.path.join(os.path.dirname(path), 'variants', f"{fileHash.replace(':', '_')}.{self.backend}.pt")
+        info_path = variant_path[:-len('.pt')] + '.json'
+
+        if os.path.exists(variant_path) and os.path.exists(info_path):
+            variant = torch.jit.load(variant_path, map_location="cpu")
+            runner = wrap_runner(variant, self.backend)
+            with open(info_path) as f:
+                info = json.load(f)
+            return self._warmed(runner, self.backend, info, self._features(variant, self.backend))
+
+        try:
+            inputs, source = load_calibration_inputs(CALIBRATION_DIR, CALIBRATION_SAMPLES, transform)
+            with torch.no_grad():
+                reference_outputs = module(inputs)
+            variant, runner = build_variant(module, self.backend)
+            parity = check_parity(reference_outputs, runner, inputs, PARITY_MIN_AGREEMENT)
+            parity["calibration"] = source
+        except Exception as e:
+            logger.error(f"Failed to build {self.backend} variant of {fileHash[:12]}: {str(e)}")
+            parity = None
+
+        if not parity or not parity["passed"]:
+            logger.warning(f"{self.backend} variant of {fileHash[:12]} rejected ({parity}); serving eager weights")
+            # Some conversions (channels_last) modify the module in place, so reload it
+            module = torch.jit.load(path, map_location="cpu")
+            module.eval()
+            return self._warmed(module, BACKEND_EAGER, {
+                "sizeBytes": os.path.getsize(path),
+                "rejectedBackend": self.backend,
+                "parity": parity
+            }, self._features(module, BACKEND_EAGER))
+
+        info = {"sizeBytes": serialized_size(variant), "referenceSizeBytes": os.path.getsize(path), "parity": parity}
+        try:
+            os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+            torch.jit.save(variant, variant_path)
+            with open(info_path, 'w') as f:
+                json.dump(info, f)
+        except Exception as e:
+            logger.warning(f"Could not cache {self.backend} variant on disk: {str(e)}")
+
+        return self._warmed(runner, self.backend, info, self._features(variant, self.backend))
+
+    def _features(self, module, backend):
+        """Split the served weights into body and head so predictions also return embeddings."""
+        from .backends import find_feature_runner, to_channels_last
+
+        if not EMBEDDING_INDEX_ENABLED:
+            return None
+        return find_feature_runner(module, prepare=to_channels_last if backend == BACKEND_CHANNELS_LAST else None)
+
+    def _warmed(self, runner, backend, info, features=None):
+        # Live predictions run the feature runner when there is one, so that is what gets warmed and timed
+        info["forwardMs"] = self._warm_up(features or runner)
+        info["embeddings"] = features is not None
+        return _CachedModule(runner, backend, info, features)
+
+    def _warm_up(self, module):
+        """Run the warm-up passes and return the fastest single-image forward time in ms."""
+        import torch
+
+        dummy = torch.zeros(1, IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH)
+        timings = []
+        with torch.no_grad():
+            for _ in range(max(1, self.warmup_runs)):
+                started = time.perf_counter()
+                module(dummy)
+                timings.append((time.perf_counter() - started) * 1000.0)
+        return min(timings)
+
+    def _activate_legacy(self):
+        # No usable ModelVersion row: fall back to the bundled model file
+        path = self._resolve_path(LEGACY_MODEL_FILE)
+        try:
+            self._active = self._load(
+                modelId=None,
+                version=DEFAULT_MODEL_VERSION,
+                fileHash=f"legacy:{LEGACY_MODEL_FILE}",
+                path=path,
+                classNames=DEFAULT_CLASS_NAMES
+            )
+            logger.warning("No active model found, using bundled default model")
+        except Exception as e:
+            logger.error(f"Failed to load model: {str(e)}")
+
+
+model_registry = ModelRegistry(
+    cache_size=MODEL_CACHE_SIZE,
+    refresh_interval=MODEL_REFRESH_INTERVAL,
+    warmup_runs=MODEL_WARMUP_RUNS,
+    backend=INFERENCE_BACKEND
+)
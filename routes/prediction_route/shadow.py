@@ -0,0 +1,232 @@
+import logging
+import random
+import threading
+import time
+
+from .config import TELEMETRY_BUCKETS_MS
+from .engine import PRIORITY_SHADOW
+from .telemetry import STAGE_FORWARD, LatencyHistogram, inference_telemetry
+
+logger = logging.getLogger(__name__)
+
+STATE_LOADING = 'loading'
+STATE_RUNNING = 'running'
+STATE_FAILED = 'failed'
+
+
+def per_image_ms(timing):
+    """Forward time of one image: the batch's forward time split over the images in it."""
+    if not timing or timing.get("forward_ms") is None:
+        return None
+    return timing["forward_ms"] / max(1, timing.get("batch_size") or 1)
+
+
+class ShadowRun:
+    """Top-1 agreement and forward latency of one candidate against the live predictions it shadowed."""
+
+    def __init__(self, modelId, version, bounds):
+        self.modelId = modelId
+        self.version = version
+        self.candidate = None
+        self.state = STATE_LOADING
+        self.error = None
+        self.started_at = time.time()
+
+        self.samples = 0
+        self.agreed = 0
+        self.failed = 0
+        self.per_class = {}
+        self.disagreements = {}
+        self.live_versions = {}
+        self.candidate_forward = LatencyHistogram(bounds)
+        self.live_forward = LatencyHistogram(bounds)
+        self.delta_samples = 0
+        self.delta_total_ms = 0.0
+
+    def record(self, live_label, live_version, candidate_label, candidate_ms, live_ms):
+        agreed = candidate_label == live_label
+        self.samples += 1
+        self.live_versions[live_version] = self.live_versions.get(live_version, 0) + 1
+        counts = self.per_class.setdefault(live_label, [0, 0])
+        counts[0] += 1
+        if agreed:
+            self.agreed += 1
+            counts[1] += 1
+        else:
+            pair = (live_label, candidate_label)
+            self.disagreements[pair] = self.disagreements.get(pair, 0) + 1
+
+        if candidate_ms is not None:
+            self.candidate_forward.add(candidate_ms)
+        if live_ms is not None:
+            self.live_forward.add(live_ms)
+        if candidate_ms is not None and live_ms is not None:
+            self.delta_samples += 1
+            self.delta_total_ms += candidate_ms - live_ms
+
+    def summary(self, sample_rate):
+        def rate(agreed, samples):
+            return agreed / samples if samples else None
+
+        return {
+            "modelId": self.modelId,
+            "version": self.version,
+            "state": self.state,
+            "error": self.error,
+            "started_at": self.started_at,
+            "sample_rate": sample_rate,
+            "samples": self.samples,
+            "failed": self.failed,
+            "agreement_rate": rate(self.agreed, self.samples),
+            "per_class": {
+                label: {"samples": samples, "agreed": agreed, "agreement_rate": rate(agreed, samples)}
+                for label, (samples, agreed) in sorted(self.per_class.items())
+            },
+            "top_disagreements": [
+                {"live": live, "candidate": candidate, "count": count}
+                for (live, candidate), count in sorted(self.disagreements.items(), key=lambda item: -item[1])[:10]
+            ],
+            "live_versions": dict(self.live_versions),
+            "latency": {
+                "candidate_forward": self.candidate_forward.to_dict(),
+                "live_forward": self.live_forward.to_dict(),
+                "mean_delta_ms": self.delta_total_ms / self.delta_samples if self.delta_samples else None,
+            },
+        }
+
+
+class ShadowEvaluator:
+    """Runs a sampled fraction of live predictions through inactive candidate models.
+
+    ``offer`` is called once the live result is known and only queues work:
+    a sampled tensor is submitted to ``engine``, an InferenceEngine of its
+    own, so shadow batches never hold up the live engine's worker, and the
+    comparison runs in the engine's completion callback. Samples are
+    skipped while ``busy()`` reports live requests waiting. At most
+    ``max_in_flight`` shadow requests are queued at once; samples beyond
+    that are dropped rather than allowed to build a backlog.
+    Latencies are compared per image (see ``per_image_ms``), so batch sizes
+    on either side do not skew the delta.
+
+    ``label_of(output, loaded_model)`` turns a row of logits into
+    ``(label, confidence)``; ``loader(model_version)`` returns a Future of
+    the candidate's LoadedModel. Results are kept per process.
+    """
+
+    def __init__(self, engine, label_of, loader, sample_rate=0.1, max_in_flight=8, bounds=TELEMETRY_BUCKETS_MS, rng=random.random,
+                 busy=None):
+        self.engine = engine
+        self.label_of = label_of
+        self.loader = loader
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.bounds = bounds
+        self.rng = rng
+        self.busy = busy
+
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._in_flight = 0
+        self.offered = 0
+        self.dropped = 0
+        self.skipped_busy = 0
+
+    def start(self, model_version):
+        """Begin shadowing ``model_version``; its weights load in the background."""
+        with self._lock:
+            run = self._runs.get(model_version.modelId)
+            if run is not None and run.state != STATE_FAILED:
+                return run
+            run = ShadowRun(model_version.modelId, model_version.version, self.bounds)
+            self._runs[model_version.modelId] = run
+
+        def loaded(future):
+            try:
+                run.candidate = future.result()
+                run.state = STATE_RUNNING
+                logger.info(f"Shadowing live predictions with model {run.version}")
+            except Exception as e:
+                run.error = str(e)
+                run.state = STATE_FAILED
+
+        self.loader(model_version).add_done_callback(loaded)
+        return run
+
+    def stop(self, modelId):
+        """Stop shadowing and return the final summary, or None if the model was not shadowed."""
+        with self._lock:
+            run = self._runs.pop(modelId, None)
+        return run.summary(self.sample_rate) if run is not None else None
+
+    def summary(self, modelId):
+        with self._lock:
+            run = self._runs.get(modelId)
+            return run.summary(self.sample_rate) if run is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sample_rate": self.sample_rate,
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "offered": self.offered,
+                "dropped": self.dropped,
+                "skipped_busy": self.skipped_busy,
+                "candidates": {
+                    run.version: {"state": run.state, "samples": run.samples,
+                                  "agreement_rate": run.agreed / run.samples if run.samples else None}
+                    for run in self._runs.values()
+                },
+            }
+
+    def offer(self, tensor, live_result, live_forward_ms=None):
+        """Maybe shadow one live prediction; never blocks the caller.
+
+        ``live_forward_ms`` is the live forward time of this one image (see ``per_image_ms``).
+        """
+        if not self._runs or self.rng() >= self.sample_rate:
+            return
+        if self.busy is not None and self.busy():
+            with self._lock:
+                self.skipped_busy += 1
+            return
+
+        with self._lock:
+            runs = [run for run in self._runs.values()
+                    if run.state == STATE_RUNNING and run.modelId != live_result.get("model_id")]
+        for run in runs:
+            with self._lock:
+                if self._in_flight >= self.max_in_flight:
+                    self.dropped += 1
+                    continue
+                self._in_flight += 1
+                self.offered += 1
+            try:
+                future = self.engine.submit(tensor, run.candidate.module, PRIORITY_SHADOW)
+            except Exception as e:
+                logger.warning(f"Could not queue shadow prediction for {run.version}: {str(e)}")
+                self._done()
+                continue
+            future.add_done_callback(
+                lambda completed, run=run: self._compare(run, completed, live_result["label"], live_result["model_version"], live_forward_ms)
+            )
+
+    def _compare(self, run, future, live_label, live_version, live_forward_ms):
+        try:
+            candidate_label, _ = self.label_of(future.result(), run.candidate)
+            timing = getattr(future, 'timing', None) or {}
+            with self._lock:
+                run.record(live_label, live_version, candidate_label, per_image_ms(timing), live_forward_ms)
+            if timing.get("forward_ms") is not None:
+                # Same basis as the live telemetry: the forward time of the whole batch
+                inference_telemetry.record_stage(run.version, STAGE_FORWARD, timing["forward_ms"])
+        except Exception as e:
+            logger.warning(f"Shadow prediction with {run.version} failed: {str(e)}")
+            with self._lock:
+                run.failed += 1
+        finally:
+            self._done()
+
+    def _done(self):
+        with self._lock:
+            self._in_flight -= 1
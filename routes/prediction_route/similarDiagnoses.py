@@ -0,0 +1,67 @@
+import time
+from flask import request
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from models import DiagnosisResult
+from .config import EMBEDDING_DUPLICATE_THRESHOLD, EMBEDDING_IVF_NPROBE
+from .embeddings import embedding_store
+from .persistence import diagnosis_writer
+from .prediction import is_admin
+
+MAX_NEIGHBOURS = 50
+
+
+class SimilarDiagnosesResource(Resource):
+    @jwt_required()
+    def get(self, diagnosis_id):
+        """Past diagnoses whose images are closest to this one in the model's embedding space.
+
+        ``k`` (default 10, at most 50) neighbours are returned, best first.
+        ``exact=true`` scores every indexed row instead of probing the IVF lists.
+        """
+        if not is_admin():
+            return {"message": "Admins only: You are not authorized to access this resource."}, 403
+
+        result = DiagnosisResult.query.filter_by(diagnosisId=diagnosis_id).first()
+        if not result:
+            if diagnosis_writer.is_pending(diagnosis_id):
+                return {"message": "Diagnosis is still being saved, retry shortly."}, 409, {"Retry-After": "1"}
+            return {"message": "Diagnosis result not found."}, 404
+
+        index = embedding_store.index_for(result.modelVersion) if result.modelVersion else None
+        vector = index.lookup(diagnosis_id) if index is not None else None
+        if vector is None:
+            return {"message": "This diagnosis has no stored embedding yet."}, 404
+
+        try:
+            k = max(1, min(int(request.args.get('k', 10)), MAX_NEIGHBOURS))
+        except ValueError:
+            return {"message": "k must be an integer."}, 400
+        exact = request.args.get('exact', 'false').lower() in ('1', 'true', 'yes')
+
+        started = time.perf_counter()
+        neighbours, search = index.search(vector, k, nprobe=0 if exact else EMBEDDING_IVF_NPROBE, exclude=(diagnosis_id,))
+        search["elapsed_ms"] = (time.perf_counter() - started) * 1000.0
+
+        scores = dict(neighbours)
+        rows = DiagnosisResult.query.filter(DiagnosisResult.diagnosisId.in_(list(scores))).all()
+        rows.sort(key=lambda row: -scores[row.diagnosisId])
+
+        return {
+            "data": [self.serialize_neighbour(row, scores[row.diagnosisId]) for row in rows],
+            "search": {**search, "indexed": index.count, "model_version": result.modelVersion}
+        }, 200
+
+    def serialize_neighbour(self, result, score):
+        return {
+            "diagnosisId": result.diagnosisId,
+            "userId": result.userId,
+            "disease": result.disease.serialize() if result.disease else None,
+            "districtId": result.districtId,
+            "date": result.date.isoformat(),
+            "image_path": result.image_path,
+            "model_version": result.modelVersion,
+            "similarity": score,
+            # Likely the same photo uploaded again
+            "duplicate": score >= EMBEDDING_DUPLICATE_THRESHOLD
+        }
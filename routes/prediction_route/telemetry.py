@@ -0,0 +1,179 @@
+import bisect
+import threading
+import time
+from collections import deque
+
+from .config import TELEMETRY_BUCKETS_MS, TELEMETRY_CAPACITY
+
+STAGE_DECODE = 'decode'
+STAGE_PREPROCESS = 'preprocess'
+STAGE_QUEUE = 'queue'
+STAGE_FORWARD = 'forward'
+STAGE_PERSIST = 'persist'
+STAGE_TOTAL = 'total'
+STAGES = (STAGE_DECODE, STAGE_PREPROCESS, STAGE_QUEUE, STAGE_FORWARD, STAGE_PERSIST, STAGE_TOTAL)
+
+
+class PredictionSample:
+    """One prediction's stage durations in milliseconds; None where a stage did not run.
+
+    ``diagnosisId`` is set when the prediction was stored as a diagnosis, and
+    ``persistMs`` once the background writer has stored it.
+    """
+    __slots__ = ("timestamp", "modelVersion", "backend", "batchSize", "cached",
+                 "decodeMs", "preprocessMs", "queueMs", "forwardMs", "totalMs", "diagnosisId", "persistMs")
+
+    def __init__(self, modelVersion, backend, batchSize, cached, decodeMs, preprocessMs, queueMs, forwardMs, totalMs):
+        self.timestamp = time.time()
+        self.modelVersion = modelVersion
+        self.backend = backend
+        self.batchSize = batchSize
+        self.cached = cached
+        self.decodeMs = decodeMs
+        self.preprocessMs = preprocessMs
+        self.queueMs = queueMs
+        self.forwardMs = forwardMs
+        self.totalMs = totalMs
+        self.diagnosisId = None
+        self.persistMs = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class LatencyHistogram:
+    """Counts of durations falling under fixed millisecond bucket bounds, plus an overflow bucket."""
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value_ms):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples (None in the overflow bucket)."""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.bounds[index] if index < len(self.bounds) else None
+        return None
+
+    def to_dict(self):
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ["overflow"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class InferenceTelemetry:
+    """Per-prediction timings kept in a fixed-size ring buffer, aggregated per model version.
+
+    The ring buffer holds the last ``capacity`` samples for inspection; the
+    per-version histograms keep counting after samples fall out of it, so
+    memory stays bounded while a model's latency profile covers its whole
+    time in service (per process, since the last restart). Cache hits never
+    ran the model, so their totals go to a separate ``cached_total``
+    histogram instead of the stage histograms.
+    """
+
+    def __init__(self, capacity=4096, bounds=TELEMETRY_BUCKETS_MS):
+        self.bounds = tuple(sorted(bounds))
+        self._samples = deque(maxlen=max(1, int(capacity)))
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def record(self, modelVersion, backend=None, batchSize=None, cached=False,
+               decodeMs=None, preprocessMs=None, queueMs=None, forwardMs=None, totalMs=None):
+        sample = PredictionSample(modelVersion, backend, batchSize, cached, decodeMs, preprocessMs, queueMs, forwardMs, totalMs)
+        with self._lock:
+            self._samples.append(sample)
+            entry = self._entry_locked(modelVersion)
+            entry["predictions"] += 1
+            if cached:
+                entry["cached"] += 1
+            if backend:
+                entry["backends"][backend] = entry["backends"].get(backend, 0) + 1
+            if batchSize:
+                entry["batchSizes"][batchSize] = entry["batchSizes"].get(batchSize, 0) + 1
+            if cached:
+                if totalMs is not None:
+                    entry["cachedTotal"].add(totalMs)
+                return sample
+            for stage, value in ((STAGE_DECODE, decodeMs), (STAGE_PREPROCESS, preprocessMs), (STAGE_QUEUE, queueMs),
+                                 (STAGE_FORWARD, forwardMs), (STAGE_TOTAL, totalMs)):
+                if value is not None:
+                    entry["stages"][stage].add(value)
+        return sample
+
+    def record_stage(self, modelVersion, stage, value_ms):
+        """Add a duration measured outside the request, e.g. the background diagnosis write."""
+        with self._lock:
+            self._entry_locked(modelVersion)["stages"][stage].add(value_ms)
+
+    def record_persisted(self, modelVersion, value_ms, sample=None):
+        """Add a diagnosis write's duration, also to the sample of the prediction it stored."""
+        self.record_stage(modelVersion, STAGE_PERSIST, value_ms)
+        if sample is not None:
+            sample.persistMs = value_ms
+
+    def summary(self, modelVersion):
+        """Latency histograms for one version, or None if it has not served predictions here."""
+        with self._lock:
+            entry = self._versions.get(modelVersion)
+            if entry is None:
+                return None
+            return {
+                "predictions": entry["predictions"],
+                "cached": entry["cached"],
+                "backends": dict(entry["backends"]),
+                "batch_size_counts": {str(size): count for size, count in sorted(entry["batchSizes"].items())},
+                "stages": {stage: histogram.to_dict() for stage, histogram in entry["stages"].items() if histogram.count},
+                "cached_total": entry["cachedTotal"].to_dict() if entry["cachedTotal"].count else None,
+            }
+
+    def recent(self, limit=100, modelVersion=None):
+        with self._lock:
+            samples = list(self._samples)
+        if modelVersion is not None:
+            samples = [sample for sample in samples if sample.modelVersion == modelVersion]
+        return [sample.to_dict() for sample in samples[-limit:]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "capacity": self._samples.maxlen,
+                "samples": len(self._samples),
+                "versions": {version: entry["predictions"] for version, entry in self._versions.items()},
+            }
+
+    def _entry_locked(self, modelVersion):
+        entry = self._versions.get(modelVersion)
+        if entry is None:
+            entry = {
+                "predictions": 0,
+                "cached": 0,
+                "backends": {},
+                "batchSizes": {},
+                "stages": {stage: LatencyHistogram(self.bounds) for stage in STAGES},
+                "cachedTotal": LatencyHistogram(self.bounds),
+            }
+            self._versions[modelVersion] = entry
+        return entry
+
+
+inference_telemetry = InferenceTelemetry(capacity=TELEMETRY_CAPACITY)
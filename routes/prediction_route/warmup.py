@@ -0,0 +1,82 @@
+import io
+import logging
+import threading
+import time
+
+from flask import current_app
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+STATE_COLD = 'cold'
+STATE_WARMING = 'warming'
+STATE_READY = 'ready'
+STATE_FAILED = 'failed'
+
+
+def dummy_image(width=640, height=480):
+    """A small JPEG that exercises the same decode/resize path as a real upload."""
+    buffer = io.BytesIO()
+    Image.effect_noise((width, height), 64).convert('RGB').save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class InferenceWarmup:
+    """Brings inference up to speed on a background thread and reports when it is hot.
+
+    ``probe`` is called ``runs`` times with an encoded dummy image and must
+    run a full prediction; the first call imports torch and loads the active
+    model, the rest settle the engine, thread pool and allocator. Until the
+    last run finishes ``ready`` is False, which the readiness endpoint
+    reports as 503 so a load balancer keeps uploads away from cold workers.
+    """
+
+    def __init__(self, probe, runs=3):
+        self.probe = probe
+        self.runs = max(1, int(runs))
+        self.state = STATE_COLD
+        self.error = None
+        self.model_version = None
+        self.started_at = None
+        self.ready_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == STATE_READY
+
+    def start(self, app=None):
+        """Start warming up unless already warming or ready; a failed attempt is retried."""
+        with self._lock:
+            if self.state in (STATE_WARMING, STATE_READY):
+                return
+            self.state = STATE_WARMING
+            self.error = None
+            self.started_at = time.time()
+
+        app = app or current_app._get_current_object()
+        threading.Thread(target=self._run, args=(app,), name="inference-warmup", daemon=True).start()
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "model_version": self.model_version,
+            "error": self.error,
+            "warmup_seconds": (self.ready_at - self.started_at) if self.ready_at and self.started_at else None,
+        }
+
+    def _run(self, app):
+        try:
+            image_bytes = dummy_image()
+            with app.app_context():
+                for _ in range(self.runs):
+                    loaded_model = self.probe(image_bytes)
+            self.model_version = loaded_model.version
+            self.ready_at = time.time()
+            self.state = STATE_READY
+            logger.info(f"Inference warmed up with model {self.model_version} in {self.ready_at - self.started_at:.1f}s")
+        except Exception as e:
+            logger.error(f"Inference warm-up failed: {str(e)}")
+            self.error = str(e)
+            self.state = STATE_FAILED
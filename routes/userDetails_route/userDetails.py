@@ -6,6 +6,7 @@ from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import Null
 from models import UserDetails, db, User, District
+from routes.prediction_route.catalog import user_districts
 import cloudinary.uploader
 import os
 
@@ -188,6 +189,7 @@ class UserDetailsResource(Resource):
 
             # Commit changes
             db.session.commit()
+            user_districts.invalidate(userId)
 
             dob_str = user_details.dob.isoformat() if user_details and user_details.dob else None
 
@@ -264,6 +266,7 @@ class UserDetailsDistrictResource(Resource):
 
             # Commit changes
             db.session.commit()
+            user_districts.invalidate(userId)
 
             dob_str = user_details.dob.isoformat() if user_details and user_details.dob else None
 
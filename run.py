@@ -53,6 +53,8 @@ def create_app(config_class=DevelopmentConfig, allow=True):
             logging.info("Redis connected successfully for distributed locking")
         except Exception as e:
             logging.warning(f"Failed to connect to Redis: {str(e)}. Distributed locking will be disabled.")
+    # Shared with extensions such as the prediction cache
+    app.extensions['redis'] = redis_client
 
     
     swagger = Swagger(app, config=swagger_config, template=swagger_template)
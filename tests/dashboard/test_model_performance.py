@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from base_test import BaseTestCase
+from models import DiagnosisResult, ModelRating, ModelVersion, db
+from routes.dashboard.ReportNew import ReportNew
+
+class ModelPerformanceTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = datetime.utcnow()
+        self.model = ModelVersion(version='2.0.0', fileSize=1, fileHash='f00d', filePath='model.pt')
+        db.session.add(self.model)
+        db.session.commit()
+
+    def diagnosis(self, date, modelId=None, modelVersion='2.0.0', correct=None):
+        result = DiagnosisResult(userId=1, date=date, modelVersion=modelVersion, modelId=modelId, detected=True, rated=correct is not None)
+        db.session.add(result)
+        db.session.commit()
+        if correct is not None:
+            db.session.add(ModelRating(modelId=self.model.modelId, userId=1, resultId=result.resultId, rating=4, diagnosisCorrect=correct))
+            db.session.commit()
+
+    def report(self):
+        rows = ReportNew()._model_performance(self.now - timedelta(days=1), self.now + timedelta(days=1))
+        return {row['version']: row for row in rows}
+
+    def test_counts_only_ratings_of_diagnoses_in_window(self):
+        self.diagnosis(self.now, self.model.modelId, correct=True)
+        self.diagnosis(self.now, self.model.modelId, correct=False)
+        self.diagnosis(self.now, self.model.modelId)
+        # Rated today, but diagnosed before the window
+        self.diagnosis(self.now - timedelta(days=30), self.model.modelId, correct=True)
+
+        row = self.report()['2.0.0']
+        self.assertEqual((row['total_diagnoses'], row['rated_count'], row['correct_count']), (3, 2, 1))
+        self.assertEqual(row['accuracy_pct'], 50)
+
+    def test_rows_without_model_key_are_kept(self):
+        self.diagnosis(self.now, self.model.modelId)
+        # Not backfilled yet, and the bundled default model that has no ModelVersion row
+        self.diagnosis(self.now, modelVersion='2.0.0')
+        self.diagnosis(self.now, modelVersion='1.0.0')
+
+        report = self.report()
+        self.assertEqual(report['2.0.0']['total_diagnoses'], 2)
+        self.assertEqual(report['1.0.0']['total_diagnoses'], 1)
+
+    def test_backfill_links_older_ratings(self):
+        """Ratings made before they recorded their diagnosis count again once backfilled."""
+        older = DiagnosisResult(userId=1, date=self.now - timedelta(hours=2), modelVersion='2.0.0', modelId=self.model.modelId, detected=True, rated=True)
+        newer = DiagnosisResult(userId=1, date=self.now - timedelta(hours=1), modelVersion='2.0.0', detected=True, rated=True)
+        db.session.add_all([older, newer])
+        db.session.commit()
+        olderId, newerId = older.resultId, newer.resultId
+        db.session.add_all([
+            ModelRating(modelId=self.model.modelId, userId=1, rating=5, diagnosisCorrect=True, createdAt=self.now - timedelta(minutes=90)),
+            ModelRating(modelId=self.model.modelId, userId=1, rating=2, diagnosisCorrect=False, createdAt=self.now - timedelta(minutes=30)),
+        ])
+        db.session.commit()
+        self.assertEqual(self.report()['2.0.0']['correct_count'], 0)
+
+        result = self.app.test_cli_runner().invoke(args=['model', 'backfill-diagnosis-models'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        db.session.remove()
+
+        ratings = ModelRating.query.order_by(ModelRating.createdAt).all()
+        self.assertEqual([rating.resultId for rating in ratings], [olderId, newerId])
+        row = self.report()['2.0.0']
+        self.assertEqual((row['rated_count'], row['correct_count'], row['accuracy_pct']), (2, 1, 50))
@@ -0,0 +1,174 @@
+import importlib.util
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from base_test import BaseTestCase
+from models import ModelVersion, db
+
+MODULE = 'routes.model_route.modelResource'
+
+def comparison(passed):
+    regressions = [] if passed else [{"scenario": "224x224/JPEG/b1/t4", "metric": "p95_ms", "baseline": 10.0, "candidate": 20.0, "change": 1.0}]
+    return {"passed": passed, "regressions": regressions, "deltas": regressions, "reports": {"baseline": {}, "candidate": {}}}
+
+class BenchmarkGateTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        active = ModelVersion(version='1.0.0', fileSize=1, fileHash='beef', filePath='active.pt', isActive=True)
+        self.model = ModelVersion(version='2.0.0', fileSize=1, fileHash='cafe', filePath='model.pt', isActive=False)
+        db.session.add_all([active, self.model])
+        db.session.commit()
+        self.activeId, self.modelId = active.modelId, self.model.modelId
+        self.headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 1, 'role': 'admin'})}"}
+
+        self.registry = mock.Mock()
+        self.registry.get_active.return_value.modelId = self.activeId
+        self.registry.snapshot.side_effect = lambda model: {"version": model.version}
+        self.benchmark_against = mock.Mock(return_value=comparison(True))
+        patches = [
+            mock.patch(f'{MODULE}.model_registry', self.registry),
+            mock.patch(f'{MODULE}.BENCHMARK_GATE', 'block'),
+            mock.patch(f'{MODULE}.prediction_catalog', mock.Mock()),
+            # benchmark.py imports torch; the gate only needs its entry point
+            mock.patch.dict(sys.modules, {'routes.prediction_route.benchmark': SimpleNamespace(benchmark_against=self.benchmark_against)}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def activate(self, **data):
+        return self.client.post(f'/api/v1/models/admin/{self.modelId}/activate', headers=self.headers, json=data)
+
+    def is_active(self):
+        return db.session.get(ModelVersion, self.modelId).isActive
+
+    def test_passing_model_is_activated(self):
+        response = self.activate()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json['benchmark']['passed'])
+        self.assertNotIn('reports', response.json['benchmark'])
+        self.assertTrue(self.is_active())
+        self.registry.activate_async.assert_called_once()
+
+        # Both models go to the benchmark processes as snapshots of their versions
+        self.assertEqual(self.benchmark_against.call_args.args, ({"version": "1.0.0"}, {"version": "2.0.0"}))
+        self.assertIn('rss_tolerance', self.benchmark_against.call_args.kwargs)
+
+    def test_regression_blocks_activation(self):
+        self.benchmark_against.return_value = comparison(False)
+        response = self.activate()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json['benchmark']['regressions'][0]['metric'], 'p95_ms')
+        self.assertFalse(self.is_active())
+        self.registry.activate_async.assert_not_called()
+
+    def test_force_skips_the_benchmark(self):
+        self.benchmark_against.return_value = comparison(False)
+        response = self.activate(force=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json['benchmark'])
+        self.benchmark_against.assert_not_called()
+        self.assertTrue(self.is_active())
+
+    def test_warn_mode_activates_regressions(self):
+        self.benchmark_against.return_value = comparison(False)
+        with mock.patch(f'{MODULE}.BENCHMARK_GATE', 'warn'):
+            response = self.activate()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json['benchmark']['passed'])
+        self.assertTrue(self.is_active())
+
+    def test_gate_off_never_benchmarks(self):
+        with mock.patch(f'{MODULE}.BENCHMARK_GATE', 'off'):
+            self.assertEqual(self.activate().status_code, 200)
+        self.benchmark_against.assert_not_called()
+
+    def test_candidate_that_fails_to_load_is_blocked(self):
+        self.benchmark_against.return_value = {"passed": False, "error": "corrupt model file"}
+        with self.assertLogs(self.app.logger, level='ERROR'):
+            response = self.activate()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json['benchmark'], {"passed": False, "error": "corrupt model file"})
+        self.assertFalse(self.is_active())
+
+    def test_no_active_model_or_cascade_stage_is_not_gated(self):
+        self.registry.get_active.return_value = None
+        self.assertTrue(self.activate().json['benchmark']['skipped'])
+        self.benchmark_against.assert_not_called()
+
+        router = ModelVersion(version='1.0.0', fileSize=1, fileHash='beef', filePath='router.pt', role='router', isActive=False)
+        db.session.add(router)
+        db.session.commit()
+        response = self.client.post(f'/api/v1/models/admin/{router.modelId}/activate', headers=self.headers, json={})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('skipped', response.json['benchmark'])
+        self.benchmark_against.assert_not_called()
+
+    def test_admins_only(self):
+        self.headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 7, 'role': 'farmer'})}"}
+        self.assertEqual(self.activate().status_code, 403)
+        self.assertFalse(self.is_active())
+
+def scenario(key, p95, p99, throughput):
+    return {"key": key, "p95_ms": p95, "p99_ms": p99, "throughput_ips": throughput}
+
+@unittest.skipUnless(importlib.util.find_spec('torch'), "torch is not installed")
+class CompareReportsTesting(unittest.TestCase):
+    def compare(self, baseline, candidate, **tolerances):
+        from routes.prediction_route.benchmark import compare_reports
+        return compare_reports(baseline, candidate, **tolerances)
+
+    def test_within_tolerance_passes(self):
+        baseline = {"scenarios": [scenario("a", 10.0, 12.0, 100.0)]}
+        candidate = {"scenarios": [scenario("a", 10.5, 12.5, 95.0)]}
+        result = self.compare(baseline, candidate)
+        self.assertTrue(result["passed"])
+        self.assertEqual(len(result["deltas"]), 3)
+
+    def test_latency_and_throughput_regressions(self):
+        baseline = {"scenarios": [scenario("a", 10.0, 12.0, 100.0)]}
+        candidate = {"scenarios": [scenario("a", 12.0, 12.0, 80.0)]}
+        result = self.compare(baseline, candidate)
+        self.assertFalse(result["passed"])
+        self.assertEqual({regression["metric"] for regression in result["regressions"]}, {"p95_ms", "throughput_ips"})
+
+    def test_faster_candidate_passes(self):
+        baseline = {"scenarios": [scenario("a", 10.0, 12.0, 100.0)]}
+        candidate = {"scenarios": [scenario("a", 5.0, 6.0, 200.0)]}
+        self.assertTrue(self.compare(baseline, candidate)["passed"])
+
+    def test_missing_scenarios_never_fail(self):
+        baseline = {"scenarios": [scenario("a", 10.0, 12.0, 100.0)]}
+        candidate = {"scenarios": [scenario("b", 50.0, 60.0, 10.0)]}
+        result = self.compare(baseline, candidate)
+        self.assertTrue(result["passed"])
+        self.assertEqual(result["missingScenarios"], ["a", "b"])
+
+    def test_peak_rss_only_compared_for_isolated_runs(self):
+        baseline = {"scenarios": [], "peak_rss_mb": 100.0}
+        candidate = {"scenarios": [], "peak_rss_mb": 200.0}
+        self.assertTrue(self.compare(baseline, candidate)["passed"])
+        result = self.compare({**baseline, "isolated": True}, {**candidate, "isolated": True})
+        self.assertEqual(result["regressions"][0]["metric"], "peak_rss_mb")
+
+    def test_percentile(self):
+        from routes.prediction_route.benchmark import percentile
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile(list(range(101)), 99), 99)
+
+@unittest.skipUnless(importlib.util.find_spec('torch'), "torch is not installed")
+class WaitForReportTesting(unittest.TestCase):
+    def test_child_that_dies_before_reporting(self):
+        """A benchmark process killed mid-run (e.g. out of memory) gives an error instead of a hang."""
+        import multiprocessing
+        import os
+        from routes.prediction_route.benchmark import wait_for_report
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(target=os._exit, args=(3,))
+        process.start()
+        report = wait_for_report(process, context.Queue(), timeout=30)
+        process.join()
+        self.assertIn("exited with code 3", report["error"])
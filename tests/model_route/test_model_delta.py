@@ -0,0 +1,69 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+import bsdiff4
+from flask_jwt_extended import create_access_token
+from base_test import BaseTestCase
+from models import ModelDelta, ModelVersion, db
+from routes.model_route.deltas import build_deltas
+
+class ModelDeltaTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = tempfile.mkdtemp()
+        self.app.config['MODEL_STORAGE'] = self.storage
+
+        # A fine-tune: same layout, a small part of the weights changed
+        self.old_bytes = os.urandom(256 * 1024)
+        self.new_bytes = self.old_bytes[:1000] + os.urandom(2000) + self.old_bytes[3000:]
+        self.old = self.add_model('1.0.0', self.old_bytes, datetime.utcnow() - timedelta(days=1))
+        self.new = self.add_model('1.1.0', self.new_bytes, datetime.utcnow())
+        self.auth_headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 1, 'role': 'farmer'})}"}
+
+    def add_model(self, version, content, released):
+        filename = f'model_v{version}.pt'
+        with open(os.path.join(self.storage, filename), 'wb') as f:
+            f.write(content)
+        model = ModelVersion(version=version, fileSize=len(content) // 1024, fileHash=hashlib.sha256(content).hexdigest(), filePath=filename, releaseDate=released)
+        db.session.add(model)
+        db.session.commit()
+        return model
+
+    def tearDown(self):
+        shutil.rmtree(self.storage)
+        super().tearDown()
+
+    def test_patch_rebuilds_new_file(self):
+        created = build_deltas(self.new, self.storage)
+        self.assertEqual(len(created), 1)
+        self.assertEqual(created[0].fromHash, self.old.fileHash)
+        self.assertLess(created[0].patchSize, len(self.new_bytes) // 10)
+
+        # Nothing left to build the second time
+        self.assertEqual(build_deltas(self.new, self.storage), [])
+
+        response = self.client.get(f'/api/v1/models/{self.new.modelId}/download?fromHash={self.old.fileHash}', headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Delta-From'], self.old.fileHash)
+        patched = bsdiff4.patch(self.old_bytes, response.data)
+        self.assertEqual(hashlib.sha256(patched).hexdigest(), response.headers['X-Model-Hash'])
+
+    def test_unknown_hash_gets_full_file(self):
+        build_deltas(self.new, self.storage)
+
+        response = self.client.get(f'/api/v1/models/latest?fromHash={"0" * 64}', headers=self.auth_headers)
+        self.assertIsNone(response.json['delta'])
+
+        response = self.client.get(f'/api/v1/models/{self.new.modelId}/download?fromHash={"0" * 64}', headers=self.auth_headers)
+        self.assertNotIn('X-Delta-From', response.headers)
+        self.assertEqual(response.data, self.new_bytes)
+
+    def test_latest_reports_patch(self):
+        build_deltas(self.new, self.storage)
+
+        response = self.client.get(f'/api/v1/models/latest?fromHash={self.old.fileHash}', headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['delta']['patchSize'], ModelDelta.query.one().patchSize)
+        self.assertEqual(response.json['delta']['format'], 'bsdiff4')
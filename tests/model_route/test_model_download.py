@@ -0,0 +1,46 @@
+import os
+import tempfile
+from flask_jwt_extended import create_access_token
+from base_test import BaseTestCase
+from models import ModelVersion, db
+
+class ModelDownloadTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = tempfile.mkdtemp()
+        self.app.config['MODEL_STORAGE'] = self.storage
+        with open(os.path.join(self.storage, 'model.pt'), 'wb') as f:
+            f.write(os.urandom(4096))
+
+        model = ModelVersion(version='9.9.9', fileSize=4, fileHash='feedface', filePath='model.pt', isActive=False)
+        db.session.add(model)
+        db.session.commit()
+        self.url = f'/api/v1/models/{model.modelId}/download'
+        self.auth_headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 1, 'role': 'farmer'})}"}
+
+    def tearDown(self):
+        os.remove(os.path.join(self.storage, 'model.pt'))
+        os.rmdir(self.storage)
+        super().tearDown()
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], '"feedface"')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        response.close()
+
+        response = self.client.get(self.url, headers={**self.auth_headers, 'If-None-Match': '"feedface"'})
+        self.assertEqual(response.status_code, 304)
+
+    def test_resume_with_range(self):
+        response = self.client.get(self.url, headers={**self.auth_headers, 'Range': 'bytes=1024-', 'If-Range': '"feedface"'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers['Content-Range'], 'bytes 1024-4095/4096')
+        self.assertEqual(len(response.data), 3072)
+
+        # A different file than the client started with: send it whole
+        response = self.client.get(self.url, headers={**self.auth_headers, 'Range': 'bytes=1024-', 'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 4096)
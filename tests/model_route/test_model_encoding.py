@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import zstandard
+from flask_jwt_extended import create_access_token
+from base_test import BaseTestCase
+from models import ModelVersion, db
+from routes.model_route.encodings import compress_model_file
+
+class ModelEncodingTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = tempfile.mkdtemp()
+        self.app.config['MODEL_STORAGE'] = self.storage
+
+        # Compressible like real weights: repeated structure with some noise
+        self.content = (os.urandom(512) + bytes(3584)) * 64
+        file_path = os.path.join(self.storage, 'model.pt')
+        with open(file_path, 'wb') as f:
+            f.write(self.content)
+        self.sizes = compress_model_file(file_path)
+
+        model = ModelVersion(version='2.0.0', fileSize=len(self.content) // 1024, fileHash=hashlib.sha256(self.content).hexdigest(), filePath='model.pt')
+        db.session.add(model)
+        db.session.commit()
+        self.model = model
+        self.url = f'/api/v1/models/{model.modelId}/download'
+        self.auth_headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 1, 'role': 'farmer'})}"}
+
+    def tearDown(self):
+        shutil.rmtree(self.storage)
+        super().tearDown()
+
+    def get(self, accept_encoding=None):
+        headers = dict(self.auth_headers)
+        if accept_encoding is not None:
+            headers['Accept-Encoding'] = accept_encoding
+        response = self.client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        return response
+
+    def test_prefers_zstd(self):
+        response = self.get('gzip, zstd')
+        self.assertEqual(response.headers['Content-Encoding'], 'zstd')
+        self.assertEqual(response.headers['ETag'], f'"{self.model.fileHash}-zstd"')
+        self.assertEqual(int(response.headers['Content-Length']), self.sizes['zstd'])
+        self.assertEqual(zstandard.ZstdDecompressor().decompress(response.data), self.content)
+
+    def test_gzip_only_client(self):
+        response = self.get('gzip, zstd;q=0')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response.headers['Content-Length']), self.sizes['gzip'])
+        self.assertEqual(gzip.decompress(response.data), self.content)
+
+        # The same copy is written again byte for byte, so its ETag stays valid
+        os.remove(os.path.join(self.storage, 'model.pt.gz'))
+        compress_model_file(os.path.join(self.storage, 'model.pt'))
+        self.assertEqual(self.get('gzip').data, response.data)
+
+    def test_identity_without_accept_encoding(self):
+        response = self.get()
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.headers['ETag'], f'"{self.model.fileHash}"')
+        self.assertEqual(response.data, self.content)
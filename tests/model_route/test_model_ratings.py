@@ -0,0 +1,82 @@
+from datetime import datetime
+from flask_jwt_extended import create_access_token
+from base_test import BaseTestCase
+from models import DiagnosisResult, ModelEvaluation, ModelRating, ModelRatingStats, ModelVersion, db
+
+class ModelRatingTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = ModelVersion(version='3.0.0', fileSize=1, fileHash='cafe', filePath='model.pt')
+        db.session.add(self.model)
+        db.session.commit()
+        self.user_headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 7, 'role': 'farmer'})}"}
+        self.admin_headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 1, 'role': 'admin'})}"}
+
+    def rate(self, rating, correct=None):
+        result = DiagnosisResult(userId=7, date=datetime.utcnow(), modelVersion='3.0.0', detected=True)
+        db.session.add(result)
+        db.session.commit()
+        return self.client.post('/api/v1/models/ratings', headers=self.user_headers, json={
+            'diagnosisId': result.diagnosisId, 'rating': rating, 'diagnosisCorrect': correct
+        })
+
+    def test_totals_follow_each_rating(self):
+        for rating, correct in [(5, True), (4, True), (1, False), (4, None)]:
+            self.assertEqual(self.rate(rating, correct).status_code, 201)
+        self.assertEqual(self.rate(6).status_code, 400)
+        db.session.add_all([ModelEvaluation(modelId=self.model.modelId, datasetPath='/data', imageCount=count) for count in (10, 20)])
+        db.session.commit()
+
+        response = self.client.get('/api/v1/models/admin', headers=self.admin_headers)
+        self.assertEqual(len(response.json['data']), 1)
+        self.assertEqual(response.json['data'][0]['evaluation']['imageCount'], 20)
+        stats = response.json['data'][0]['ratingStats']
+        self.assertEqual(stats['count'], 4)
+        self.assertEqual(stats['mean'], 3.5)
+        self.assertEqual(stats['histogram'], {'1': 1, '2': 0, '3': 0, '4': 2, '5': 1})
+        self.assertAlmostEqual(stats['diagnosisCorrect']['ratio'], 2 / 3)
+
+        # Rebuilding from the rows gives the same totals
+        ModelRatingStats.rebuild()
+        self.assertEqual(db.session.get(ModelRatingStats, self.model.modelId).to_dict()['histogram'], stats['histogram'])
+
+    def test_ratings_from_before_the_totals_table(self):
+        """Models without a totals row are aggregated on read, and their first new rating seeds the row from every rating."""
+        db.session.add_all([ModelRating(modelId=self.model.modelId, userId=7, rating=rating) for rating in (2, 4)])
+        db.session.commit()
+
+        stats = self.client.get('/api/v1/models/admin', headers=self.admin_headers).json['data'][0]['ratingStats']
+        self.assertEqual((stats['count'], stats['mean']), (2, 3.0))
+        page = self.client.get(f'/api/v1/models/admin/{self.model.modelId}/ratings', headers=self.admin_headers).json
+        self.assertEqual(page['stats']['histogram'], {'1': 0, '2': 1, '3': 0, '4': 1, '5': 0})
+        self.assertIsNone(db.session.get(ModelRatingStats, self.model.modelId))
+
+        self.assertEqual(self.rate(5, True).status_code, 201)
+        stored = db.session.get(ModelRatingStats, self.model.modelId).to_dict()
+        self.assertEqual((stored['count'], stored['mean']), (3, 11 / 3))
+        self.assertEqual(stored['diagnosisCorrect']['correct'], 1)
+
+    def test_rating_follows_model_key(self):
+        other = ModelVersion(version='3.1.0', fileSize=1, fileHash='beef', filePath='other.pt')
+        db.session.add(other)
+        db.session.commit()
+        # The key decides, whatever the version text says
+        result = DiagnosisResult(userId=7, date=datetime.utcnow(), modelVersion='3.0.0', modelId=other.modelId, detected=True)
+        db.session.add(result)
+        db.session.commit()
+
+        response = self.client.post('/api/v1/models/ratings', headers=self.user_headers, json={'diagnosisId': result.diagnosisId, 'rating': 4})
+        self.assertEqual(response.json['data']['modelId'], other.modelId)
+
+    def test_keyset_pages(self):
+        db.session.add_all([ModelRating(modelId=self.model.modelId, userId=7, rating=3) for _ in range(5)])
+        db.session.commit()
+        url = f'/api/v1/models/admin/{self.model.modelId}/ratings'
+
+        first = self.client.get(f'{url}?limit=2', headers=self.admin_headers).json
+        second = self.client.get(f'{url}?limit=2&before={first["next"]}', headers=self.admin_headers).json
+        last = self.client.get(f'{url}?limit=2&before={second["next"]}', headers=self.admin_headers).json
+
+        ids = [rating['ratingId'] for page in (first, second, last) for rating in page['data']]
+        self.assertEqual(ids, [5, 4, 3, 2, 1])
+        self.assertIsNone(last['next'])
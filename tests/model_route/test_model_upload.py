@@ -0,0 +1,99 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from base_test import BaseTestCase
+from models import ModelVersion, db
+from routes.model_route import uploads
+from routes.model_route.uploads import finalize_upload, load_upload
+
+class ModelUploadTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = tempfile.mkdtemp()
+        self.app.config['MODEL_STORAGE'] = self.storage
+        self.content = os.urandom(300 * 1024)
+        self.auth_headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 1, 'role': 'admin'})}"}
+
+        response = self.client.post('/api/v1/models/admin/uploads', headers=self.auth_headers, json={
+            'filename': 'model.pt', 'size': len(self.content), 'sha256': hashlib.sha256(self.content).hexdigest()
+        })
+        self.assertEqual(response.status_code, 201)
+        self.upload_id = response.json['data']['uploadId']
+        self.url = f'/api/v1/models/admin/uploads/{self.upload_id}'
+
+    def tearDown(self):
+        shutil.rmtree(self.storage)
+        super().tearDown()
+
+    def put_chunk(self, start, end, body=None, **headers):
+        body = self.content[start:end] if body is None else body
+        headers = {**self.auth_headers, 'Content-Range': f'bytes {start}-{end - 1}/{len(self.content)}', **headers}
+        return self.client.put(self.url, headers=headers, data=body)
+
+    def test_resumable_upload(self):
+        self.assertEqual(self.put_chunk(0, 100 * 1024).json['data']['offset'], 100 * 1024)
+
+        # A chunk that arrives damaged is not kept
+        corrupted = self.put_chunk(100 * 1024, 200 * 1024, **{'X-Chunk-Sha256': '0' * 64})
+        self.assertEqual(corrupted.status_code, 400)
+        status = self.client.get(self.url, headers=self.auth_headers).json['data']
+        self.assertEqual(status['offset'], 100 * 1024)
+
+        # Chunks must continue from the offset
+        self.assertEqual(self.put_chunk(200 * 1024, 300 * 1024).status_code, 409)
+
+        chunk = self.content[100 * 1024:]
+        response = self.put_chunk(100 * 1024, len(self.content), **{'X-Chunk-Sha256': hashlib.sha256(chunk).hexdigest()})
+        self.assertTrue(response.json['data']['complete'])
+
+        # As after a restart: the running hash is rebuilt from disk
+        uploads._hashers.clear()
+        target = os.path.join(self.storage, 'model_v1.pt')
+        size, digest = finalize_upload(self.storage, load_upload(self.storage, self.upload_id), target)
+        self.assertEqual(size, len(self.content))
+        self.assertEqual(digest, hashlib.sha256(self.content).hexdigest())
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertIsNone(load_upload(self.storage, self.upload_id))
+
+    def test_incomplete_upload_is_not_finalized(self):
+        self.put_chunk(0, 1024)
+        with self.assertRaises(ValueError):
+            finalize_upload(self.storage, load_upload(self.storage, self.upload_id), os.path.join(self.storage, 'model_v1.pt'))
+
+        response = self.client.delete(self.url, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.url, headers=self.auth_headers).status_code, 404)
+
+    def create_model(self, **data):
+        # Background compression would write next to the model file while the test inspects the directory
+        with mock.patch('routes.model_route.modelResource.MODEL_COMPRESSION_ENABLED', False):
+            return self.client.post('/api/v1/models/admin', headers=self.auth_headers, content_type='multipart/form-data',
+                                    data={'version': '1.0.0', 'isActive': 'false', **data})
+
+    def test_failed_insert_keeps_the_upload(self):
+        """The file only moves into place once its row is committed; a failed insert leaves the upload to retry."""
+        self.put_chunk(0, len(self.content))
+        with mock.patch.object(db.session, 'commit', side_effect=RuntimeError("database is down")):
+            response = self.create_model(uploadId=self.upload_id)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(os.listdir(self.storage), ['uploads'])
+        self.assertEqual(load_upload(self.storage, self.upload_id)['offset'], len(self.content))
+
+        response = self.create_model(uploadId=self.upload_id)
+        self.assertEqual(response.status_code, 201)
+        with open(os.path.join(self.storage, ModelVersion.query.one().filePath), 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(sorted(os.listdir(self.storage)), ['plant_disease_model_v1.0.0.pt', 'uploads'])
+
+    def test_single_request_upload_size_is_limited(self):
+        with mock.patch('routes.model_route.modelResource.MODEL_UPLOAD_MAX_SIZE', 1024):
+            response = self.create_model(model_file=(io.BytesIO(self.content), 'model.pt'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('maximum size', response.json['message'])
+        self.assertEqual(os.listdir(self.storage), ['uploads'])
+        self.assertIsNone(ModelVersion.query.first())
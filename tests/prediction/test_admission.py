@@ -0,0 +1,47 @@
+import unittest
+from routes.prediction_route.admission import (
+    AdmissionController, AdmissionRejected, REJECT_BULK_LIMIT, REJECT_QUEUE_FULL, REJECT_USER_LIMIT
+)
+from routes.prediction_route.engine import PRIORITY_BULK
+
+class AdmissionControllerTesting(unittest.TestCase):
+    def test_per_user_limit(self):
+        """A user cannot hold more than their share of in-flight requests."""
+        controller = AdmissionController(max_in_flight=10, per_user_limit=2)
+        controller.acquire(1)
+        controller.acquire(1)
+
+        with self.assertRaises(AdmissionRejected) as context:
+            controller.acquire(1)
+        self.assertEqual(context.exception.reason, REJECT_USER_LIMIT)
+
+        # Other users are unaffected
+        controller.acquire(2)
+        
+    def test_bulk_rejected_before_interactive(self):
+        """Bulk requests hit their own, lower limit while interactive ones still get in."""
+        controller = AdmissionController(max_in_flight=3, max_bulk_in_flight=1, per_user_limit=5)
+        controller.acquire(1, PRIORITY_BULK)
+
+        with self.assertRaises(AdmissionRejected) as context:
+            controller.acquire(2, PRIORITY_BULK)
+        self.assertEqual(context.exception.reason, REJECT_BULK_LIMIT)
+
+        controller.acquire(3)
+        controller.acquire(4)
+        with self.assertRaises(AdmissionRejected) as context:
+            controller.acquire(5)
+        self.assertEqual(context.exception.reason, REJECT_QUEUE_FULL)
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+
+    def test_release_frees_slot(self):
+        """Leaving the admit block frees the slot and records the rejection counts."""
+        controller = AdmissionController(max_in_flight=1)
+        with controller.admit(1):
+            with self.assertRaises(AdmissionRejected):
+                controller.acquire(2)
+        controller.acquire(2)
+
+        stats = controller.stats()
+        self.assertEqual(stats["in_flight"], 1)
+        self.assertEqual(stats["rejected"][REJECT_QUEUE_FULL], 1)
@@ -0,0 +1,117 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+
+def tiny_model():
+    """A scripted conv net shaped like the served models: a body, global pooling and a linear head."""
+    import torch
+    torch.manual_seed(0)
+    module = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 8, 3),
+        torch.nn.ReLU(),
+        torch.nn.AdaptiveAvgPool2d(1),
+        torch.nn.Flatten(),
+        torch.nn.Linear(8, 6),
+    )
+    return torch.jit.script(module.eval())
+
+@unittest.skipUnless(importlib.util.find_spec('torch'), "torch is not installed")
+class BackendVariantTesting(unittest.TestCase):
+    def setUp(self):
+        import torch
+        self.model = tiny_model()
+        self.inputs = torch.randn(8, 3, 32, 32, generator=torch.Generator().manual_seed(1))
+        with torch.no_grad():
+            self.reference = self.model(self.inputs)
+
+    def test_variants_pass_parity(self):
+        from routes.prediction_route.backends import build_variant, check_parity
+        from routes.prediction_route.config import BACKEND_CHANNELS_LAST, BACKEND_FROZEN, BACKEND_QUANTIZED
+        for backend in (BACKEND_FROZEN, BACKEND_QUANTIZED, BACKEND_CHANNELS_LAST):
+            with self.subTest(backend=backend):
+                _, runner = build_variant(tiny_model(), backend)
+                parity = check_parity(self.reference, runner, self.inputs, 0.95)
+                self.assertTrue(parity["passed"], parity)
+                self.assertEqual(parity["samples"], 8)
+
+    def test_diverging_variant_fails_parity(self):
+        from routes.prediction_route.backends import check_parity
+        parity = check_parity(self.reference, lambda inputs: -self.model(inputs), self.inputs, 0.95)
+        self.assertFalse(parity["passed"])
+        self.assertLess(parity["top1_agreement"], 0.95)
+
+    def test_channels_last_runner_survives_a_reload(self):
+        import torch
+        from routes.prediction_route.backends import ChannelsLastRunner, build_variant, wrap_runner
+        from routes.prediction_route.config import BACKEND_CHANNELS_LAST, BACKEND_FROZEN
+        variant, _ = build_variant(tiny_model(), BACKEND_CHANNELS_LAST)
+        self.assertIsInstance(wrap_runner(variant, BACKEND_CHANNELS_LAST), ChannelsLastRunner)
+        self.assertIs(wrap_runner(variant, BACKEND_FROZEN), variant)
+        with torch.no_grad():
+            self.assertTrue(torch.allclose(wrap_runner(variant, BACKEND_CHANNELS_LAST)(self.inputs), self.reference, atol=1e-4))
+
+    def test_feature_runner_matches_the_model(self):
+        """Splitting before the head gives the same logits plus one pooled vector per image."""
+        import torch
+        from routes.prediction_route.backends import find_feature_runner
+        runner = find_feature_runner(self.model, sample=self.inputs)
+        self.assertIsNotNone(runner)
+        with torch.no_grad():
+            logits, features = runner(self.inputs)
+        self.assertTrue(torch.allclose(logits, self.reference, atol=1e-4))
+        self.assertEqual(tuple(features.shape), (8, 8))
+
+    def test_unsplittable_model_has_no_feature_runner(self):
+        import torch
+        from routes.prediction_route.backends import find_feature_runner
+        module = torch.jit.script(torch.nn.Conv2d(3, 2, 3).eval())
+        self.assertIsNone(find_feature_runner(module, sample=self.inputs))
+
+    def test_serialized_size_shrinks_when_quantized(self):
+        import torch
+        from routes.prediction_route.backends import build_variant, serialized_size
+        from routes.prediction_route.config import BACKEND_QUANTIZED
+        torch.manual_seed(0)
+        large = torch.jit.script(torch.nn.Sequential(torch.nn.Flatten(), torch.nn.Linear(3 * 32 * 32, 256)).eval())
+        quantized, _ = build_variant(large, BACKEND_QUANTIZED)
+        self.assertLess(serialized_size(quantized), serialized_size(large))
+
+@unittest.skipUnless(importlib.util.find_spec('torch'), "torch is not installed")
+class CalibrationInputsTesting(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def to_tensor(self, image):
+        import torch
+        return torch.full((3, 4, 4), float(image.getpixel((0, 0))[0]))
+
+    def test_reads_images_and_skips_other_files(self):
+        """Unreadable images and other files are skipped rather than failing the parity check."""
+        from routes.prediction_route.backends import load_calibration_inputs
+        for n in range(3):
+            Image.new('RGB', (8, 8), (n, 0, 0)).save(os.path.join(self.directory, f"leaf{n}.png"))
+        with open(os.path.join(self.directory, "notes.txt"), 'w') as f:
+            f.write("not an image")
+        with open(os.path.join(self.directory, "broken.jpg"), 'wb') as f:
+            f.write(b"not a jpeg")
+
+        inputs, source = load_calibration_inputs(self.directory, 2, self.to_tensor)
+        self.assertEqual(source, 'images')
+        self.assertEqual(tuple(inputs.shape), (2, 3, 4, 4))
+        self.assertEqual([float(value) for value in inputs[:, 0, 0, 0]], [0.0, 1.0])
+
+    def test_falls_back_to_seeded_random_inputs(self):
+        import torch
+        from routes.prediction_route.backends import load_calibration_inputs
+        from routes.prediction_route.config import IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH
+        first, source = load_calibration_inputs(self.directory, 3, self.to_tensor)
+        second, _ = load_calibration_inputs(None, 3, self.to_tensor)
+        self.assertEqual(source, 'synthetic')
+        self.assertEqual(tuple(first.shape), (3, IMG_CHANNELS, IMG_HEIGHT, IMG_WIDTH))
+        self.assertTrue(torch.equal(first, second))
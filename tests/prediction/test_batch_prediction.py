@@ -0,0 +1,162 @@
+import io
+import json
+import zipfile
+from concurrent.futures import Future
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from PIL import Image
+from base_test import BaseTestCase
+from routes.prediction_route.admission import AdmissionController
+from models import Crop, Disease, db
+from routes.prediction_route.cache import PredictionCache
+from routes.prediction_route.catalog import PredictionCatalog, label_to_result
+
+MODULE = 'routes.prediction_route.batchPrediction'
+
+class FakeModel:
+    version = '2.0.0'
+    modelId = 'm2'
+    fileHash = 'f00d'
+    backend = 'eager'
+
+def encoded(color, size=(32, 32)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def archive(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for name, data in entries.items():
+            zip_file.writestr(name, data)
+    return buffer.getvalue()
+
+def fake_label(tensor):
+    if tensor > 250:
+        return 'black_sigatoka'
+    return 'healthly_banana' if tensor > 100 else 'weeds'
+
+def predicted(tensor, model, priority):
+    """Resolves at once; the fake 'tensor' is the decoded image's red value."""
+    result = label_to_result(fake_label(tensor))
+    result.update({'label': fake_label(tensor), 'confidence': 0.9,
+                   'model_version': model.version, 'model_id': model.modelId, 'backend': model.backend})
+    future = Future()
+    future.set_result(result)
+    return future
+
+def decoded(image_source, timings=None):
+    return Image.open(image_source).getpixel((0, 0))[0]
+
+class BatchPredictionTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        token = create_access_token(identity={'userId': 1, 'role': 'farmer'})
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.writer = mock.Mock()
+        patches = [
+            mock.patch(f'{MODULE}.active_predictor', return_value=FakeModel()),
+            mock.patch(f'{MODULE}.preprocess_image', side_effect=decoded),
+            mock.patch(f'{MODULE}.submit_prediction', side_effect=predicted),
+            mock.patch(f'{MODULE}.prediction_cache', PredictionCache()),
+            mock.patch(f'{MODULE}.admission_controller', AdmissionController()),
+            mock.patch(f'{MODULE}.prediction_catalog', PredictionCatalog()),
+            mock.patch(f'{MODULE}.diagnosis_writer', self.writer),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def post(self, images=(), zip_data=None):
+        data = {'images': [(io.BytesIO(content), name) for name, content in images]}
+        if zip_data is not None:
+            data['archive'] = (io.BytesIO(zip_data), 'photos.zip')
+        return self.client.post('/api/v1/predict/batch', data=data, headers=self.headers, content_type='multipart/form-data')
+
+    def lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        # Closing the response releases the admission slot
+        response.close()
+        return lines
+
+    def test_streams_one_line_per_image_then_summary(self):
+        response = self.post(images=[('leaf.png', encoded((200, 0, 0))), ('weed.png', encoded((10, 0, 0))), ('notes.txt', b'x')])
+        lines = self.lines(response)
+
+        by_index = {line['index']: line for line in lines if 'index' in line}
+        self.assertEqual(set(by_index), {0, 1, 2})
+        self.assertTrue(by_index[0]['detected'])
+        self.assertEqual(by_index[0]['plant_type'], 'banana')
+        self.assertFalse(by_index[1]['detected'])
+        self.assertEqual(by_index[2]['error'], 'File format not supported')
+
+        summary = lines[-1]
+        self.assertTrue(summary['summary'])
+        self.assertEqual((summary['total'], summary['succeeded'], summary['failed']), (3, 2, 1))
+        self.assertEqual(summary['model_version'], '2.0.0')
+
+    def test_diagnoses_go_to_the_diagnosis_writer(self):
+        """Diagnosed images are queued on the shared writer (retries, shutdown draining) instead of a commit per request."""
+        crop = Crop(name='Banana')
+        db.session.add(crop)
+        db.session.commit()
+        db.session.add(Disease(name='Black Sigatoka', label='black_sigatoka', cropId=crop.cropId))
+        db.session.commit()
+
+        image = encoded((255, 0, 0))
+        lines = self.lines(self.post(images=[('sick.png', image), ('healthy.png', encoded((200, 0, 0)))]))
+
+        job = self.writer.submit.call_args.args[0]
+        self.assertEqual(self.writer.submit.call_count, 1)
+        self.assertEqual((job.imageBytes, job.modelVersion, job.userId), (image, '2.0.0', 1))
+        self.assertEqual(lines[0]['diagnosisId'], job.diagnosisId)
+        self.assertEqual(lines[0]['diseaseLabel'], 'black_sigatoka')
+        self.assertEqual(job.sample.diagnosisId, job.diagnosisId)
+        self.assertEqual((lines[-1]['saved'], lines[-1]['diagnosisIds']), (1, {'0': job.diagnosisId}))
+
+    def test_repeated_image_is_served_from_cache(self):
+        image = encoded((200, 0, 0))
+        lines = self.lines(self.post(images=[('a.png', image)]))
+        self.assertFalse(lines[0]['cached'])
+        lines = self.lines(self.post(images=[('b.png', image)]))
+        self.assertTrue(lines[0]['cached'])
+        self.assertEqual(lines[-1]['cached'], 1)
+
+    def test_zip_entries_skip_metadata_and_other_files(self):
+        zip_data = archive({
+            'photos/leaf.png': encoded((200, 0, 0)),
+            '__MACOSX/photos/._leaf.png': b'resource fork',
+            'photos/readme.txt': b'notes',
+        })
+        lines = self.lines(self.post(zip_data=zip_data))
+        self.assertEqual([line['filename'] for line in lines if 'index' in line], ['leaf.png'])
+        self.assertEqual(lines[-1]['total'], 1)
+
+    def test_invalid_zip_is_rejected(self):
+        response = self.post(zip_data=b'not a zip')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['message'], 'The provided archive is not a valid zip file')
+
+    def test_too_many_images_rejected_up_front(self):
+        """Images and zip entries count together, and nothing is predicted when over the limit."""
+        with mock.patch(f'{MODULE}.BATCH_MAX_IMAGES', 2):
+            response = self.post(images=[('a.png', encoded((1, 0, 0)))],
+                                 zip_data=archive({'b.png': encoded((2, 0, 0)), 'c.png': encoded((3, 0, 0))}))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.get_json()['message'], 'At most 2 images can be submitted per batch')
+
+            lines = self.lines(self.post(images=[('a.png', encoded((1, 0, 0))), ('b.png', encoded((2, 0, 0)))]))
+            self.assertEqual(lines[-1]['total'], 2)
+
+    def test_oversized_images_get_an_error_line(self):
+        """The per-image byte limit applies to multipart images as well as zip entries."""
+        large, small = encoded((200, 0, 0), (1024, 1024)), encoded((10, 0, 0))
+        self.assertGreater(len(large), len(small))
+        with mock.patch(f'{MODULE}.BATCH_MAX_IMAGE_BYTES', len(small)):
+            lines = self.lines(self.post(images=[('large.png', large), ('small.png', small)],
+                                         zip_data=archive({'zipped.png': large})))
+
+        errors = {line['filename']: line.get('error') for line in lines if 'index' in line}
+        self.assertEqual(errors, {'large.png': 'Image is too large', 'small.png': None, 'zipped.png': 'Image is too large'})
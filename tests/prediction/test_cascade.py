@@ -0,0 +1,128 @@
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+from routes.prediction_route.cascade import ROLE_CLASSIFIER, ROLE_DISEASE, ROLE_ROUTER, Cascade, CascadeStats
+from routes.prediction_route.registry import LoadedModel
+
+MODULE = 'routes.prediction_route.prediction'
+
+class ImmediateEngine:
+    """Runs each model on its own at submit time and records which ones ran."""
+    def __init__(self):
+        self.ran = []
+
+    def submit(self, tensor, model, priority):
+        self.ran.append(model)
+        future = Future()
+        try:
+            future.set_result(model([tensor])[0])
+        except Exception as e:
+            future.set_exception(e)
+        future.timing = {"queue_ms": 1.0, "forward_ms": 2.0, "batch_size": 1}
+        return future
+
+def top_label(output, loaded_model):
+    """Outputs here are already probabilities, so torch's softmax is not needed."""
+    index = max(range(len(output)), key=output.__getitem__)
+    return loaded_model.classNames[index], output[index]
+
+def model(name, classNames, probabilities, forwardMs):
+    def module(inputs):
+        if isinstance(probabilities, Exception):
+            raise probabilities
+        return [probabilities for _ in inputs]
+    return LoadedModel(name, f"{name}-1.0", f"{name}-hash", module, classNames, backendInfo={"forwardMs": forwardMs})
+
+class CascadeTesting(unittest.TestCase):
+    def setUp(self):
+        self.engine = ImmediateEngine()
+        self.stats = CascadeStats()
+        patches = [
+            mock.patch(f'{MODULE}.inference_engine', self.engine),
+            mock.patch(f'{MODULE}.top_label', side_effect=top_label),
+            mock.patch(f'{MODULE}.cascade_stats', self.stats),
+            mock.patch(f'{MODULE}.CASCADE_MIN_ROUTER_CONFIDENCE', 0.5),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.reference = model('reference', ['Unknown', 'black_sigatoka', 'leaf_rust'], [0.1, 0.2, 0.7], 50.0)
+        self.banana = model('banana', ['healthly_banana', 'black_sigatoka'], [0.1, 0.9], 10.0)
+
+    def predict(self, routed, reference=True, diseaseModels=None):
+        from routes.prediction_route.prediction import submit_prediction
+        router = model('router', ['unknown', 'banana', 'coffee'], routed, 5.0)
+        diseaseModels = {'banana': self.banana} if diseaseModels is None else diseaseModels
+        cascade = Cascade(router, diseaseModels, self.reference if reference else None)
+        return submit_prediction('tensor', cascade).result(timeout=5), router
+
+    def test_confident_unknown_stops_at_the_router(self):
+        result, router = self.predict([0.8, 0.1, 0.1])
+        self.assertEqual(self.engine.ran, [router.module])
+        self.assertEqual((result['label'], result['model_version']), ('Unknown', 'router-1.0'))
+        self.assertEqual(result['cascade']['stage'], ROLE_ROUTER)
+        self.assertEqual((result['cascade']['compute_ms'], result['cascade']['compute_saved_ms']), (5.0, 45.0))
+
+    def test_confident_crop_runs_its_disease_model(self):
+        result, router = self.predict([0.1, 0.8, 0.1])
+        self.assertEqual(self.engine.ran, [router.module, self.banana.runner])
+        self.assertEqual((result['label'], result['model_version']), ('black_sigatoka', 'banana-1.0'))
+        self.assertEqual(result['cascade']['stage'], ROLE_DISEASE)
+        self.assertEqual(result['cascade']['router_label'], 'banana')
+        self.assertEqual(result['cascade']['compute_saved_ms'], 35.0)
+        # Both stages' engine times are reported
+        self.assertEqual(result['timing']['forward_ms'], 4.0)
+
+    def test_uncertain_route_falls_back_to_the_reference(self):
+        result, _ = self.predict([0.3, 0.4, 0.3])
+        self.assertIs(self.engine.ran[-1], self.reference.runner)
+        self.assertEqual((result['label'], result['cascade']['stage']), ('leaf_rust', ROLE_CLASSIFIER))
+        self.assertEqual(result['cascade']['compute_saved_ms'], -5.0)
+
+    def test_crop_without_disease_model_uses_the_reference(self):
+        result, _ = self.predict([0.1, 0.1, 0.8])
+        self.assertIs(self.engine.ran[-1], self.reference.runner)
+        self.assertEqual(result['cascade']['stage'], ROLE_CLASSIFIER)
+
+    def test_without_a_reference(self):
+        """Uncertain routes still use the crop's disease model; crops without one come back unknown."""
+        result, _ = self.predict([0.3, 0.4, 0.3], reference=False)
+        self.assertEqual(result['cascade']['stage'], ROLE_DISEASE)
+        self.assertIsNone(result['cascade']['compute_saved_ms'])
+
+        result, _ = self.predict([0.1, 0.1, 0.8], reference=False)
+        self.assertEqual((result['label'], result['cascade']['stage']), ('Unknown', ROLE_ROUTER))
+
+    def test_stage_errors_reach_the_caller(self):
+        failing = model('banana', ['healthly_banana'], RuntimeError("out of memory"), 10.0)
+        with self.assertRaisesRegex(RuntimeError, "out of memory"):
+            self.predict([0.1, 0.8, 0.1], diseaseModels={'banana': failing})
+
+    def test_stats_count_each_stage(self):
+        for routed in ([0.8, 0.1, 0.1], [0.1, 0.8, 0.1], [0.1, 0.1, 0.8]):
+            self.predict(routed)
+        stats = self.stats.stats()
+        self.assertEqual((stats['requests'], stats['stopped_at_router'], stats['disease_stage'], stats['reference_fallbacks']), (3, 1, 1, 1))
+        self.assertEqual(stats['compute_saved_ms'], 45.0 + 35.0 - 5.0)
+
+class CascadeSnapshotTesting(unittest.TestCase):
+    def test_file_hash_covers_every_stage(self):
+        """Cached predictions are keyed on the whole cascade, so changing any stage misses the cache."""
+        router = model('router', ['banana'], [1.0], 5.0)
+        banana = model('banana', ['black_sigatoka'], [1.0], 10.0)
+        cascade = Cascade(router, {'banana': banana}, None, key='k')
+
+        swapped = cascade.with_reference(model('reference', ['Unknown'], [1.0], 50.0))
+        self.assertNotEqual(swapped.fileHash, cascade.fileHash)
+        self.assertEqual((swapped.key, swapped.version), ('k', 'cascade:router-1.0'))
+        other = Cascade(router, {'banana': model('banana2', ['black_sigatoka'], [1.0], 10.0)}, None)
+        self.assertNotEqual(other.fileHash, cascade.fileHash)
+        self.assertEqual(Cascade(router, {'banana': banana}, None).fileHash, cascade.fileHash)
+
+    def test_describe(self):
+        cascade = Cascade(model('router', ['banana'], [1.0], 5.0), {'banana': model('banana', ['x'], [1.0], 10.0)})
+        description = cascade.describe()
+        self.assertEqual(description['router']['forwardMs'], 5.0)
+        self.assertEqual(description['diseaseModels']['banana']['version'], 'banana-1.0')
+        self.assertIsNone(description['reference'])
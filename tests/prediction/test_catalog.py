@@ -0,0 +1,127 @@
+from unittest import mock
+from base_test import BaseTestCase
+from models import Crop, Disease, db
+import unittest
+from routes.prediction_route.catalog import GENERATION_KEY, PredictionCatalog, label_to_result
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key) or 0) + 1
+        return self.values[key]
+
+class PredictionCatalogTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        banana = Crop(name='Banana')
+        db.session.add(banana)
+        db.session.commit()
+        self.bananaId = banana.cropId
+        db.session.add(Disease(name='Black Sigatoka', label='black_sigatoka', cropId=self.bananaId))
+        db.session.commit()
+
+        self.redis = FakeRedis()
+        patch = mock.patch.dict(self.app.extensions, {'redis': self.redis})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def add_coffee(self):
+        coffee = Crop(name='Coffee')
+        db.session.add(coffee)
+        db.session.commit()
+        db.session.add(Disease(name='Leaf Rust', label='leaf_rust', cropId=coffee.cropId))
+        db.session.commit()
+
+    def test_lookup_maps_labels_to_crop_and_disease(self):
+        catalog = PredictionCatalog(sync_interval=0)
+        entry = catalog.lookup('black_sigatoka')
+        self.assertEqual(entry['crop'], {'cropId': self.bananaId, 'cropName': 'Banana'})
+        self.assertEqual(entry['disease']['diseaseLabel'], 'black_sigatoka')
+
+        healthy = catalog.lookup('healthly_banana')
+        self.assertEqual(healthy['crop']['cropName'], 'Banana')
+        self.assertIsNone(healthy['disease'])
+        self.assertEqual(catalog.lookup('something_new'), {'crop': None, 'disease': None})
+
+    def test_lookups_do_not_query_until_invalidated(self):
+        """The hot path reads the table built in memory, so catalog edits only show after invalidate()."""
+        catalog = PredictionCatalog(sync_interval=0)
+        self.assertIsNone(catalog.lookup('leaf_rust')['crop'])
+        self.add_coffee()
+
+        with mock.patch.object(PredictionCatalog, '_load_tables', side_effect=AssertionError("queried the catalog")):
+            self.assertIsNone(catalog.lookup('leaf_rust')['crop'])
+        catalog.invalidate()
+        self.assertEqual(catalog.lookup('leaf_rust')['disease']['diseaseName'], 'Leaf Rust')
+        self.assertEqual(self.redis.values[GENERATION_KEY], 1)
+
+    def test_invalidation_reaches_other_workers(self):
+        """Another worker's catalog drops its table once the Redis generation moves on."""
+        here, other = PredictionCatalog(sync_interval=0), PredictionCatalog(sync_interval=0)
+        self.assertIsNone(other.lookup('leaf_rust')['crop'])
+        self.add_coffee()
+
+        here.invalidate()
+        self.assertEqual(other.lookup('leaf_rust')['crop']['cropName'], 'Coffee')
+
+    def test_sync_is_rate_limited(self):
+        catalog = PredictionCatalog(sync_interval=3600)
+        self.assertIsNone(catalog.lookup('leaf_rust')['crop'])
+        self.add_coffee()
+        PredictionCatalog(sync_interval=0).invalidate()
+        # Checked Redis on the first lookup; the next check is an hour away
+        self.assertIsNone(catalog.lookup('leaf_rust')['crop'])
+
+    def test_failed_rebuild_falls_back_to_lazy_rebuild(self):
+        catalog = PredictionCatalog(sync_interval=0)
+        catalog.lookup('black_sigatoka')
+        with mock.patch.object(PredictionCatalog, '_load_tables', side_effect=RuntimeError("database is down")):
+            with self.assertLogs('routes.prediction_route.catalog', level='ERROR'):
+                catalog.invalidate()
+        self.assertIsNone(catalog._entries)
+        self.assertEqual(catalog.lookup('black_sigatoka')['disease']['diseaseLabel'], 'black_sigatoka')
+
+    def test_invalidate_with_new_model_labels(self):
+        """Labels of a newly activated model are added to the table up front."""
+        catalog = PredictionCatalog(sync_interval=0)
+        catalog.invalidate(labels=['healthly_banana'])
+        self.assertIn('healthly_banana', catalog._entries)
+        self.assertIn('banana:black_sigatoka', catalog._entries)
+
+    def test_labels_of_a_version_with_its_own_crops(self):
+        """New crops resolve through the version's class names or crop column, not the legacy table."""
+        maize = Crop(name='Maize')
+        db.session.add(maize)
+        db.session.commit()
+        db.session.add(Disease(name='Maize Streak', label='streak', cropId=maize.cropId))
+        db.session.commit()
+
+        catalog = PredictionCatalog(sync_interval=0)
+        catalog.invalidate(labels=['streak', 'healthy'], crop='Maize')
+        self.assertIn('Maize:streak', catalog._entries)
+        self.assertEqual(catalog.lookup('maize:streak')['disease']['diseaseName'], 'Maize Streak')
+        self.assertEqual(catalog.lookup('streak', 'maize')['disease']['diseaseName'], 'Maize Streak')
+        healthy = catalog.lookup('healthy', 'maize')
+        self.assertEqual(healthy['crop']['cropName'], 'Maize')
+        self.assertIsNone(healthy['disease'])
+        self.assertEqual(catalog.lookup('black_sigatoka', 'banana')['disease']['diseaseLabel'], 'black_sigatoka')
+
+class LabelToResultTesting(unittest.TestCase):
+    def test_legacy_labels_use_the_builtin_table(self):
+        self.assertEqual(label_to_result('healthly_coffee'), {'plant_type': 'coffee', 'disease_status': 'Healthy'})
+        self.assertEqual(label_to_result('yellow_sigatoka'), {'plant_type': 'banana', 'disease_status': 'yellow_sigatoka'})
+        self.assertEqual(label_to_result('Unknown'), {'plant_type': 'unknown', 'disease_status': 'unknown'})
+        self.assertEqual(label_to_result('streak'), {'plant_type': 'unknown', 'disease_status': 'unknown'})
+
+    def test_crop_from_the_label_or_the_version(self):
+        self.assertEqual(label_to_result('Maize:streak'), {'plant_type': 'maize', 'disease_status': 'streak'})
+        self.assertEqual(label_to_result('maize:healthy'), {'plant_type': 'maize', 'disease_status': 'Healthy'})
+        self.assertEqual(label_to_result('streak', 'Maize'), {'plant_type': 'maize', 'disease_status': 'streak'})
+        self.assertEqual(label_to_result('healthly_banana', 'banana'), {'plant_type': 'banana', 'disease_status': 'Healthy'})
+        self.assertEqual(label_to_result('unknown:leaf'), {'plant_type': 'unknown', 'disease_status': 'unknown'})
+        self.assertEqual(label_to_result('other', 'maize'), {'plant_type': 'unknown', 'disease_status': 'unknown'})
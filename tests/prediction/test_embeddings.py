@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+import unittest
+import uuid
+import numpy as np
+from routes.prediction_route.embeddings import INITIAL_CAPACITY, EmbeddingCapture, EmbeddingIndex, EmbeddingStore
+from routes.prediction_route.persistence import DiagnosisJob
+
+class EmbeddingIndexTesting(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_exact_search_and_reopen(self):
+        """Nearest neighbours survive growth past the initial capacity and reopening from disk."""
+        index = EmbeddingIndex(self.directory, dim=16)
+        vectors = self.rng.standard_normal((INITIAL_CAPACITY + 10, 16)).astype(np.float32)
+        ids = [str(uuid.uuid4()) for _ in vectors]
+        for diagnosisId, vector in zip(ids, vectors):
+            index.add(diagnosisId, vector, check_existing=False)
+        self.assertFalse(index.add(ids[0], vectors[0]))
+        index.flush()
+
+        reopened = EmbeddingIndex(self.directory)
+        self.assertEqual(reopened.count, len(ids))
+        self.assertFalse(reopened.add(ids[-1], vectors[-1]))
+        self.assertEqual(reopened.indexed_ids(), set(ids))
+        self.assertGreater(float(reopened.lookup(ids[42]) @ vectors[42]), 0)
+        neighbours, search = reopened.search(vectors[42] + 0.01, k=3)
+        self.assertEqual(neighbours[0][0], ids[42])
+        self.assertGreater(neighbours[0][1], 0.99)
+        self.assertEqual(search["mode"], "exact")
+
+        neighbours, _ = reopened.search(vectors[42], k=3, exclude=(ids[42],))
+        self.assertNotIn(ids[42], [diagnosisId for diagnosisId, _ in neighbours])
+
+    def test_ivf_search(self):
+        """Probing the query's own list finds the same nearest neighbour as the exact search."""
+        index = EmbeddingIndex(self.directory, dim=8)
+        vectors = self.rng.standard_normal((500, 8)).astype(np.float32)
+        for position, vector in enumerate(vectors):
+            index.add(f"{position:036d}", vector, check_existing=False)
+        index.train_ivf(lists=10)
+
+        neighbours, search = index.search(vectors[7], k=1, nprobe=2)
+        self.assertEqual(search["mode"], "ivf")
+        self.assertLess(search["scored"], 500)
+        self.assertEqual(neighbours[0][0], f"{7:036d}")
+
+    def test_two_instances_on_one_directory(self):
+        """The server's index and the CLI's see each other's rows, growth and IVF training."""
+        server, cli = EmbeddingIndex(self.directory, dim=8), EmbeddingIndex(self.directory)
+        vectors = self.rng.standard_normal((INITIAL_CAPACITY + 300, 8)).astype(np.float32)
+        ids = [f"{position:036d}" for position in range(len(vectors))]
+        for diagnosisId, vector in zip(ids[:200], vectors[:200]):
+            server.add(diagnosisId, vector)
+        for diagnosisId, vector in zip(ids[200:INITIAL_CAPACITY + 100], vectors[200:INITIAL_CAPACITY + 100]):
+            cli.add(diagnosisId, vector)
+
+        # Neither overwrote the other's rows, and the server sees the rows past the capacity the CLI grew to
+        self.assertFalse(server.add(ids[250], vectors[250]))
+        self.assertEqual(server.stats()["count"], INITIAL_CAPACITY + 100)
+        self.assertGreater(float(server.lookup(ids[INITIAL_CAPACITY + 50]) @ vectors[INITIAL_CAPACITY + 50]), 0)
+
+        cli.train_ivf(lists=10)
+        for diagnosisId, vector in zip(ids[INITIAL_CAPACITY + 100:], vectors[INITIAL_CAPACITY + 100:]):
+            server.add(diagnosisId, vector)
+
+        # Rows the server added after the CLI trained are assigned to lists, so probing finds them
+        last = len(ids) - 1
+        for index in (server, cli):
+            neighbours, search = index.search(vectors[last], k=1, nprobe=2)
+            self.assertEqual(search["mode"], "ivf")
+            self.assertEqual(neighbours[0][0], ids[last])
+        self.assertEqual(EmbeddingIndex(self.directory).indexed_ids(), set(ids))
+
+class EmbeddingCaptureTesting(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.capture = EmbeddingCapture(EmbeddingStore(self.directory))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def job(self, embedding):
+        return DiagnosisJob(str(uuid.uuid4()), 1, 2, None, b"", "path", "url", "v1", "eager", embedding=embedding)
+
+    def test_indexes_embedding_from_the_job(self):
+        """The vector carried by the diagnosis is indexed under its model version without another forward pass."""
+        job = self.job(np.arange(1, 9, dtype=np.float32))
+        self.capture.capture_written(job)
+
+        index = self.capture.store.index_for("v1")
+        self.assertEqual(index.count, 1)
+        self.assertGreater(float(index.lookup(job.diagnosisId) @ job.embedding), 0)
+        self.assertEqual((self.capture.indexed, self.capture.skipped), (1, 0))
+
+    def test_skips_job_without_embedding(self):
+        """Cached results and models without a feature runner carry no embedding."""
+        self.capture.capture_written(self.job(None))
+        self.assertIsNone(self.capture.store.index_for("v1"))
+        self.assertEqual((self.capture.indexed, self.capture.skipped), (0, 1))
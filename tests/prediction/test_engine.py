@@ -0,0 +1,133 @@
+import threading
+import time
+import unittest
+from routes.prediction_route.engine import PRIORITY_BULK, PRIORITY_INTERACTIVE, InferenceEngine
+
+class ListEngine(InferenceEngine):
+    """Batches plain lists instead of torch tensors, so fake models can stand in for TorchScript ones."""
+    def _stack(self, tensors):
+        return list(tensors)
+
+    @staticmethod
+    def _forward(model, inputs):
+        return model(inputs)
+
+class RecordingModel:
+    """Doubles its inputs and remembers every batch it was given."""
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, inputs):
+        self.batches.append(list(inputs))
+        return [value * 2 for value in inputs]
+
+class FailingModel:
+    def __call__(self, inputs):
+        raise RuntimeError("out of memory")
+
+def held(engine):
+    """Keep the worker from starting, so everything submitted waits in the queue; call the result to release it."""
+    engine.start = lambda: None
+    return lambda: InferenceEngine.start(engine)
+
+class InferenceEngineTesting(unittest.TestCase):
+    def test_batches_up_to_max_batch_size(self):
+        engine = ListEngine(max_batch_size=4, max_wait_ms=0)
+        model = RecordingModel()
+        release = held(engine)
+        futures = [engine.submit(value, model) for value in range(5)]
+        release()
+
+        self.assertEqual([future.result(timeout=5) for future in futures], [0, 2, 4, 6, 8])
+        self.assertEqual(model.batches, [[0, 1, 2, 3], [4]])
+        self.assertEqual([future.timing["batch_size"] for future in futures], [4, 4, 4, 4, 1])
+        stats = engine.stats()
+        self.assertEqual((stats["total_requests"], stats["total_batches"], stats["largest_batch_size"]), (5, 2, 4))
+
+    def test_waits_for_more_requests_within_the_window(self):
+        """A request arriving inside max_wait_ms joins the batch of the one already waiting."""
+        engine = ListEngine(max_batch_size=4, max_wait_ms=500)
+        model = RecordingModel()
+        first = engine.submit(1, model)
+        time.sleep(0.05)
+        second = engine.submit(2, model)
+
+        self.assertEqual((first.result(timeout=5), second.result(timeout=5)), (2, 4))
+        self.assertEqual(model.batches, [[1, 2]])
+
+    def test_lone_request_runs_when_the_window_closes(self):
+        engine = ListEngine(max_batch_size=4, max_wait_ms=20)
+        started = time.perf_counter()
+        self.assertEqual(engine.predict(3, RecordingModel(), timeout=5), 6)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_models_never_share_a_batch(self):
+        """Requests pinned to different models (e.g. during a swap) run as separate forward passes."""
+        engine = ListEngine(max_batch_size=8, max_wait_ms=0)
+        old, new = RecordingModel(), RecordingModel()
+        release = held(engine)
+        futures = [engine.submit(1, old), engine.submit(2, new), engine.submit(3, old)]
+        release()
+
+        self.assertEqual([future.result(timeout=5) for future in futures], [2, 4, 6])
+        self.assertEqual(old.batches, [[1, 3]])
+        self.assertEqual(new.batches, [[2]])
+
+    def test_interactive_requests_jump_the_queue(self):
+        """Bulk work already waiting is batched after interactive uploads, FIFO within each level."""
+        engine = ListEngine(max_batch_size=1, max_wait_ms=0)
+        model = RecordingModel()
+        release = held(engine)
+        futures = [engine.submit(1, model, PRIORITY_BULK), engine.submit(2, model, PRIORITY_BULK),
+                   engine.submit(3, model, PRIORITY_INTERACTIVE)]
+        release()
+
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(model.batches, [[3], [1], [2]])
+
+    def test_errors_reach_every_caller_and_the_worker_survives(self):
+        engine = ListEngine(max_batch_size=4, max_wait_ms=0)
+        release = held(engine)
+        futures = [engine.submit(value, FailingModel()) for value in range(2)]
+        release()
+
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "out of memory"):
+                future.result(timeout=5)
+        self.assertEqual(engine.predict(4, RecordingModel(), timeout=5), 8)
+
+    def test_forward_runs_on_the_executor(self):
+        ran_on = []
+        def executor(fn, *args):
+            ran_on.append(threading.current_thread().name)
+            return fn(*args)
+
+        engine = ListEngine(executor=executor)
+        self.assertEqual(engine.predict(1, RecordingModel(), timeout=5), 2)
+        self.assertEqual(ran_on, ["inference-engine"])
+
+    def test_rejects_missing_model(self):
+        with self.assertRaises(ValueError):
+            ListEngine().submit(1, None)
+
+class FeatureModel:
+    """Returns (logits, features) like backends.FeatureRunner."""
+    def __call__(self, inputs):
+        return [value * 2 for value in inputs], [value * 10 for value in inputs]
+
+class InferenceEngineFeaturesTesting(unittest.TestCase):
+    def test_features_from_the_same_forward_pass(self):
+        """Each Future gets its own row of the logits and of the pooled features."""
+        engine = ListEngine(max_batch_size=4, max_wait_ms=50)
+        model = FeatureModel()
+        futures = [engine.submit(value, model) for value in (1, 2, 3)]
+
+        self.assertEqual([future.result(timeout=5) for future in futures], [2, 4, 6])
+        self.assertEqual([future.features for future in futures], [10, 20, 30])
+
+    def test_plain_outputs_have_no_features(self):
+        engine = ListEngine(max_batch_size=4, max_wait_ms=1)
+        future = engine.submit(1, lambda inputs: [value + 1 for value in inputs])
+        self.assertEqual(future.result(timeout=5), 2)
+        self.assertIsNone(future.features)
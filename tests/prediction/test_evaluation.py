@@ -0,0 +1,24 @@
+import unittest
+from routes.prediction_route.evaluation import match_labels, summarize
+
+class EvaluationSummaryTesting(unittest.TestCase):
+    def test_match_labels(self):
+        """Folder names match class names regardless of case and separators."""
+        mapping, unmatched = match_labels(["coffee_rust", "Banana-Healthy", "weeds"], ["Coffee Rust", "banana healthy"])
+        self.assertEqual(mapping, {"coffee_rust": "Coffee Rust", "Banana-Healthy": "banana healthy"})
+        self.assertEqual(unmatched, ["weeds"])
+
+    def test_summarize(self):
+        """Accuracy and the confusion matrix only count images that were scored."""
+        records = [
+            {"label": "a", "predicted": "a", "decode_ms": 2.0, "forward_ms": 1.0},
+            {"label": "a", "predicted": "b", "decode_ms": 2.0, "forward_ms": 1.0},
+            {"label": "b", "predicted": "b", "decode_ms": 4.0, "forward_ms": 1.0},
+            {"label": "b", "error": "cannot identify image file"},
+        ]
+        report = summarize(records, ["a", "b"])
+        self.assertEqual(report["failed"], 1)
+        self.assertAlmostEqual(report["accuracy"], 2 / 3)
+        self.assertEqual(report["confusion"]["matrix"], [[1, 1], [0, 1]])
+        self.assertEqual(report["per_class"]["b"]["precision"], 0.5)
+        self.assertEqual(report["latency"]["total_ms"]["p50"], 3.0)
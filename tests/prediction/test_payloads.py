@@ -0,0 +1,43 @@
+import io
+import unittest
+from PIL import Image
+from werkzeug.datastructures import FileStorage, MultiDict
+from routes.prediction_route.config import IMG_HEIGHT, IMG_WIDTH
+from routes.prediction_route.payloads import (
+    PAYLOAD_COMPACT, PAYLOAD_IMAGE, PAYLOAD_TENSOR, TENSOR_BYTES, encode_raw_image, read_prediction_upload
+)
+
+def allowed_file(filename):
+    return filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'webp'}
+
+def encoded(size, image_format):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (10, 120, 30)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def files(**parts):
+    return MultiDict({name: FileStorage(io.BytesIO(data), filename=filename) for name, (data, filename) in parts.items()})
+
+class PredictionUploadTesting(unittest.TestCase):
+    def test_detects_compact_image(self):
+        """A model-sized JPEG is compact; anything else goes through the resize path."""
+        upload = read_prediction_upload(files(image=(encoded((IMG_WIDTH, IMG_HEIGHT), 'JPEG'), 'leaf.jpg')), MultiDict(), allowed_file)
+        self.assertEqual(upload.kind, PAYLOAD_COMPACT)
+
+        upload = read_prediction_upload(files(image=(encoded((640, 480), 'JPEG'), 'leaf.jpg')), MultiDict(), allowed_file)
+        self.assertEqual(upload.kind, PAYLOAD_IMAGE)
+        self.assertFalse(upload.compact)
+        self.assertEqual(upload.input_format, PAYLOAD_IMAGE)
+
+    def test_tensor_payload(self):
+        """Raw pixels must be exactly one image and are JPEG-encoded for storage."""
+        upload = read_prediction_upload(files(tensor=(bytes(TENSOR_BYTES), 'blob')), MultiDict({'layout': 'chw'}), allowed_file)
+        self.assertEqual(upload.kind, PAYLOAD_TENSOR)
+        self.assertEqual(upload.layout, 'chw')
+        self.assertEqual(upload.input_format, 'tensor-chw')
+
+        with Image.open(io.BytesIO(encode_raw_image(upload.data, upload.layout))) as image:
+            self.assertEqual(image.size, (IMG_WIDTH, IMG_HEIGHT))
+
+        with self.assertRaises(ValueError):
+            read_prediction_upload(files(tensor=(bytes(TENSOR_BYTES - 1), 'blob')), MultiDict(), allowed_file)
@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from base_test import BaseTestCase
+from models import DiagnosisResult, User, db
+from routes.prediction_route.persistence import DiagnosisJob, DiagnosisWriter
+
+class DiagnosisWriterTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.written = []
+        self.writer = DiagnosisWriter(max_retries=2, retry_delay=0, drain_timeout=5, on_written=self.on_written)
+        user = User(username='farmer', email='farmer@example.com', role='farmer')
+        db.session.add(user)
+        db.session.commit()
+        self.userId = user.userId
+
+    def tearDown(self):
+        self.writer._stopping = True
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def on_written(self, job, elapsed_ms):
+        self.written.append(job.diagnosisId)
+
+    def job(self):
+        diagnosisId = str(uuid.uuid4())
+        return DiagnosisJob(
+            diagnosisId, self.userId, None, datetime.utcnow(), b"image",
+            os.path.join(self.directory, f"{diagnosisId}.jpg"), f"/uploads/{diagnosisId}.jpg", "1.0.0", "eager"
+        )
+
+    def pend(self, *jobs):
+        for job in jobs:
+            job.submittedAt = 0
+            self.writer._pending[job.diagnosisId] = job
+
+    def stored_ids(self):
+        return {row.diagnosisId for row in DiagnosisResult.query.all()}
+
+    def test_bad_row_does_not_drop_the_batch(self):
+        """A row that fails on its own is retried alone; the rest of the batch is stored."""
+        good, bad, other = self.job(), self.job(), self.job()
+        bad.userId = None
+        self.pend(good, bad, other)
+        self.writer._write([good, bad, other])
+
+        self.assertEqual(self.stored_ids(), {good.diagnosisId, other.diagnosisId})
+        self.assertEqual(self.written, [good.diagnosisId, other.diagnosisId])
+        self.assertEqual((self.writer.written, self.writer.retried, self.writer.failed), (2, 1, 0))
+        self.assertTrue(self.writer.is_pending(bad.diagnosisId))
+        self.assertFalse(self.writer.is_pending(good.diagnosisId))
+        self.assertIs(self.writer._queue.get(timeout=5), bad)
+        self.assertEqual(bad.attempts, 1)
+
+    def test_gives_up_after_max_retries(self):
+        bad = self.job()
+        bad.userId = None
+        bad.attempts = self.writer.max_retries
+        self.pend(bad)
+        self.writer._write([bad])
+
+        self.assertEqual(self.writer.failed, 1)
+        self.assertFalse(self.writer.is_pending(bad.diagnosisId))
+        self.assertFalse(os.path.exists(bad.filePath))
+        self.assertTrue(self.writer._queue.empty())
+
+    def test_failed_file_write_is_retried(self):
+        """A job whose image could not be written backs off like a failed insert, then is stored."""
+        job = self.job()
+        self.pend(job)
+        with mock.patch('builtins.open', side_effect=OSError("disk full")):
+            self.writer._write([job])
+
+        self.assertEqual((job.attempts, self.writer.retried, self.writer.failed), (1, 1, 0))
+        self.assertTrue(self.writer.is_pending(job.diagnosisId))
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertIs(self.writer._queue.get(timeout=5), job)
+
+        self.writer._write([job])
+        self.assertEqual(self.stored_ids(), {job.diagnosisId})
+        with open(job.filePath, 'rb') as f:
+            self.assertEqual(f.read(), b"image")
+
+    def test_shutdown_drains_the_queue(self):
+        jobs = [self.job() for _ in range(3)]
+        for job in jobs:
+            self.writer.submit(job)
+        self.writer.shutdown()
+
+        db.session.remove()
+        self.assertEqual(self.stored_ids(), {job.diagnosisId for job in jobs})
+        self.assertFalse(self.writer._has_pending())
+        with self.assertRaises(RuntimeError):
+            self.writer.submit(self.job())
+
+    def test_history_merges_pending_diagnoses(self):
+        """Unsaved diagnoses are listed as pending, and never twice once their row has landed."""
+        saved, unsaved = self.job(), self.job()
+        self.pend(saved)
+        self.writer._write([saved])
+        # The row landed but the job has not been cleared yet
+        self.pend(saved, unsaved)
+
+        token = create_access_token(identity={'userId': self.userId, 'role': 'farmer'})
+        with mock.patch('routes.diagnosis_route.diagnosisResult.diagnosis_writer', self.writer):
+            response = self.client.get('/api/v1/diagnosis-result/user', headers={'Authorization': f'Bearer {token}'})
+
+        self.assertEqual(response.status_code, 200)
+        rows = {row['diagnosisId']: row for row in response.get_json()['data']}
+        self.assertEqual(set(rows), {saved.diagnosisId, unsaved.diagnosisId})
+        self.assertTrue(rows[unsaved.diagnosisId]['pending'])
+        self.assertIsNotNone(rows[saved.diagnosisId]['resultId'])
@@ -0,0 +1,62 @@
+import threading
+import unittest
+from unittest import mock
+from routes.prediction_route.pool import POOL_MODE_INLINE, POOL_MODE_TPOOL, InferencePool
+
+MODULE = 'routes.prediction_route.pool'
+
+class FakeTpool:
+    """Stands in for eventlet.tpool: records calls and runs them on a separate native thread."""
+    def __init__(self):
+        self.calls = []
+        self.num_threads = None
+
+    def set_num_threads(self, size):
+        self.num_threads = size
+
+    def execute(self, fn, *args, **kwargs):
+        self.calls.append(fn)
+        result = []
+        worker = threading.Thread(target=lambda: result.append(fn(*args, **kwargs)), name="tpool-worker")
+        worker.start()
+        worker.join()
+        return result[0]
+
+def current_thread_name():
+    return threading.current_thread().name
+
+class InferencePoolTesting(unittest.TestCase):
+    def setUp(self):
+        self.configure = mock.patch(f'{MODULE}.configure_torch_threads').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_runs_inline_without_eventlet(self):
+        pool = InferencePool(mode=POOL_MODE_TPOOL)
+        with mock.patch(f'{MODULE}._eventlet_patched', return_value=False):
+            self.assertEqual(pool.run(current_thread_name), threading.current_thread().name)
+            self.assertEqual(pool.run(lambda a, b=0: a + b, 1, b=2), 3)
+
+    def test_hands_work_to_tpool_under_eventlet(self):
+        tpool = FakeTpool()
+        pool = InferencePool(mode=POOL_MODE_TPOOL, size=3)
+        with mock.patch(f'{MODULE}._eventlet_patched', return_value=True), \
+                mock.patch('eventlet.tpool', tpool, create=True):
+            self.assertEqual(pool.run(current_thread_name), "tpool-worker")
+        self.assertEqual(tpool.num_threads, 3)
+        self.assertEqual(tpool.calls, [current_thread_name])
+
+    def test_inline_mode_ignores_eventlet(self):
+        pool = InferencePool(mode=POOL_MODE_INLINE)
+        with mock.patch(f'{MODULE}._eventlet_patched', return_value=True):
+            self.assertEqual(pool.run(current_thread_name), threading.current_thread().name)
+
+    def test_torch_threads_configured_once_on_first_use(self):
+        """Processes that never run inference never import torch."""
+        pool = InferencePool(mode=POOL_MODE_INLINE, torch_threads=2, torch_interop_threads=1)
+        self.configure.assert_not_called()
+        pool.run(int)
+        pool.run(int)
+        self.configure.assert_called_once_with(2, 1)
+
+    def test_size_is_at_least_one(self):
+        self.assertEqual(InferencePool(size=0).size, 1)
@@ -0,0 +1,56 @@
+import io
+import unittest
+from PIL import Image
+from routes.prediction_route.cache import PredictionCache, CACHE_MODE_PERCEPTUAL
+
+def make_image_bytes(fmt='PNG', quality=95, size=(64, 64)):
+    image = Image.new('RGB', size)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            image.putpixel((x, y), (x * 4 % 256, y * 4 % 256, (x + y) * 2 % 256))
+    buffer = io.BytesIO()
+    if fmt == 'JPEG':
+        image.save(buffer, format=fmt, quality=quality)
+    else:
+        image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+class PredictionCacheTesting(unittest.TestCase):
+    def test_content_key_depends_on_model_hash(self):
+        """The same image under a different model must not share a cache entry."""
+        cache = PredictionCache()
+        image_bytes = make_image_bytes()
+        
+        self.assertEqual(cache.key_for(image_bytes, "model-a"), cache.key_for(image_bytes, "model-a"))
+        self.assertNotEqual(cache.key_for(image_bytes, "model-a"), cache.key_for(image_bytes, "model-b"))
+        
+    def test_key_depends_on_input_format(self):
+        """Raw pixels in hwc and chw order are the same bytes but not the same image."""
+        cache = PredictionCache()
+        raw = bytes(range(256)) * 3
+        self.assertNotEqual(cache.key_for(raw, "model-a", "tensor-hwc"), cache.key_for(raw, "model-a", "tensor-chw"))
+        self.assertEqual(cache.key_for(raw, "model-a", "tensor-chw"), cache.key_for(raw, "model-a", "tensor-chw"))
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted once the cache is full."""
+        cache = PredictionCache(max_entries=2)
+        cache.set("a", {"plant_type": "banana"})
+        cache.set("b", {"plant_type": "coffee"})
+        cache.get("a")
+        cache.set("c", {"plant_type": "unknown"})
+        
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        
+    def test_perceptual_key_survives_reencoding(self):
+        """A re-encoded copy of an image maps to the same perceptual key."""
+        cache = PredictionCache(mode=CACHE_MODE_PERCEPTUAL)
+        original = make_image_bytes('PNG')
+        reencoded = make_image_bytes('JPEG', quality=80)
+        
+        self.assertNotEqual(original, reencoded)
+        self.assertEqual(cache.key_for(original, "model-a"), cache.key_for(reencoded, "model-a"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from base_test import BaseTestCase
+from routes.prediction_route.telemetry import InferenceTelemetry
+
+MODULE = 'routes.prediction_route.prediction'
+
+class PredictionStatsTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.telemetry = InferenceTelemetry()
+        for total_ms in range(30):
+            self.telemetry.record("v1", totalMs=total_ms)
+        pool = mock.Mock()
+        pool.describe.return_value = {"mode": "inline"}
+        patches = [
+            mock.patch(f'{MODULE}.inference_telemetry', self.telemetry),
+            mock.patch(f'{MODULE}.inference_pool', pool),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 1, 'role': 'admin'})}"}
+
+    def recent(self, query=''):
+        response = self.client.get(f'/api/v1/predict/stats{query}', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json['data']['telemetry']['recent']
+
+    def test_recent_is_parsed_and_clamped(self):
+        """A bad or out-of-range ?recent= falls back or is clamped instead of failing the request."""
+        self.assertEqual(len(self.recent()), 20)
+        self.assertEqual(len(self.recent('?recent=5')), 5)
+        self.assertEqual(len(self.recent('?recent=abc')), 20)
+        self.assertEqual(len(self.recent('?recent=-3')), 1)
+        self.assertEqual(len(self.recent('?recent=100000')), 30)
+
+    def test_admins_only(self):
+        self.headers = {'Authorization': f"Bearer {create_access_token(identity={'userId': 7, 'role': 'farmer'})}"}
+        self.assertEqual(self.client.get('/api/v1/predict/stats', headers=self.headers).status_code, 403)
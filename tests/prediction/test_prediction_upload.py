@@ -0,0 +1,101 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from PIL import Image
+from base_test import BaseTestCase
+from models import Crop, Disease, db
+from routes.prediction_route.catalog import PredictionCatalog, label_to_result
+from routes.prediction_route.prediction import save_image_bytes
+from routes.prediction_route.telemetry import InferenceTelemetry
+
+MODULE = 'routes.prediction_route.prediction'
+
+def encoded():
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (30, 160, 40)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+def predicted(label):
+    def predict(image_bytes, priority, to_tensor, input_format):
+        result = label_to_result(label)
+        result.update({'label': label, 'confidence': 0.9, 'model_version': '2.0.0', 'model_id': 'm2', 'backend': 'eager'})
+        return result
+    return predict
+
+class PredictionUploadTesting(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        crop = Crop(name='Banana')
+        db.session.add(crop)
+        db.session.commit()
+        db.session.add(Disease(name='Black Sigatoka', label='black_sigatoka', cropId=crop.cropId))
+        db.session.commit()
+
+        self.writer = mock.Mock()
+        token = create_access_token(identity={'userId': 1, 'role': 'farmer'})
+        self.headers = {'Authorization': f'Bearer {token}'}
+        patches = [
+            mock.patch(f'{MODULE}.UPLOADS_DIR', self.directory),
+            mock.patch(f'{MODULE}.prediction_catalog', PredictionCatalog()),
+            mock.patch(f'{MODULE}.diagnosis_writer', self.writer),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def post(self, label, image_bytes):
+        with mock.patch(f'{MODULE}.predict_image_cached', side_effect=predicted(label)):
+            return self.client.post('/api/v1/predict', headers=self.headers, content_type='multipart/form-data',
+                                    data={'image': (io.BytesIO(image_bytes), 'leaf.jpg')})
+
+    def test_same_filename_gets_separate_files(self):
+        """Concurrent uploads named alike never overwrite each other."""
+        first, _ = save_image_bytes(b'one', 'jpg')
+        second, url = save_image_bytes(b'two', 'jpg')
+        self.assertNotEqual(first, second)
+        with open(first, 'rb') as f:
+            self.assertEqual(f.read(), b'one')
+        self.assertTrue(url.endswith(f"static/uploads/images/{os.path.basename(second)}"))
+
+    def test_undiagnosed_upload_never_touches_disk(self):
+        response = self.post('healthly_coffee', encoded())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(os.listdir(self.directory), [])
+        self.writer.submit.assert_not_called()
+
+    def test_diagnosis_keeps_the_upload_bytes_for_one_write(self):
+        """The uploaded bytes go to the diagnosis writer as they are; nothing is written before the response."""
+        image_bytes = encoded()
+        response = self.post('black_sigatoka', image_bytes)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['diseaseLabel'], 'black_sigatoka')
+
+        job = self.writer.submit.call_args.args[0]
+        self.assertEqual(job.imageBytes, image_bytes)
+        self.assertEqual(os.path.dirname(job.filePath), self.directory)
+        self.assertEqual(job.diagnosisId, response.json['diagnosisId'])
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_diagnosis_job_carries_the_telemetry_sample(self):
+        """The writer fills in the persist time of the prediction's own sample, keyed by its diagnosisId."""
+        sample = InferenceTelemetry().record('2.0.0', totalMs=5)
+        predict = predicted('black_sigatoka')
+        with mock.patch(f'{MODULE}.predict_image_cached', side_effect=lambda *args: dict(predict(*args), sample=sample)):
+            response = self.client.post('/api/v1/predict', headers=self.headers, content_type='multipart/form-data',
+                                        data={'image': (io.BytesIO(encoded()), 'leaf.jpg')})
+
+        job = self.writer.submit.call_args.args[0]
+        self.assertIs(job.sample, sample)
+        self.assertEqual(sample.diagnosisId, response.json['diagnosisId'])
+
+    def test_empty_upload_is_rejected(self):
+        response = self.post('black_sigatoka', b'')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,47 @@
+import importlib.util
+import io
+import unittest
+import numpy as np
+from PIL import Image
+
+def encoded(size, image_format):
+    """A smooth gradient with some texture, like a leaf photo rather than flat colour."""
+    width, height = size
+    x, y = np.meshgrid(np.linspace(0, 1, width), np.linspace(0, 1, height))
+    pixels = np.stack([x * 200 + 20, y * 180 + 40, (np.sin(x * 12) * np.cos(y * 9) + 1) * 100], axis=-1)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, format=image_format, quality=95)
+    return buffer.getvalue()
+
+@unittest.skipUnless(importlib.util.find_spec('torchvision'), "torchvision is not installed")
+class FastPreprocessingParityTesting(unittest.TestCase):
+    """The fast path must stay close to the torchvision ``transform`` the models were trained with."""
+
+    def reference(self, data):
+        from routes.prediction_route.preprocessing import transform
+        return transform(Image.open(io.BytesIO(data)).convert('RGB'))
+
+    def test_lossless_matches_reference(self):
+        from routes.prediction_route.preprocessing import preprocess
+        data = encoded((640, 480), 'PNG')
+        fast, reference = preprocess(io.BytesIO(data)), self.reference(data)
+        self.assertEqual(fast.shape, reference.shape)
+        self.assertLess(float((fast - reference).abs().max()), 1e-3)
+
+    def test_jpeg_draft_within_tolerance(self):
+        """Draft decoding skips full-resolution pixels, so only the mean error is bounded."""
+        from routes.prediction_route.preprocessing import preprocess
+        data = encoded((2000, 1500), 'JPEG')
+        fast, reference = preprocess(io.BytesIO(data)), self.reference(data)
+        self.assertEqual(fast.shape, reference.shape)
+        self.assertLess(float((fast - reference).abs().mean()), 0.05)
+
+    def test_raw_tensor_layouts_agree(self):
+        from routes.prediction_route.config import IMG_HEIGHT, IMG_WIDTH
+        from routes.prediction_route.preprocessing import raw_to_tensor
+        pixels = np.array(Image.open(io.BytesIO(encoded((IMG_WIDTH, IMG_HEIGHT), 'PNG'))), dtype=np.uint8)
+        hwc = raw_to_tensor(pixels.tobytes(), 'hwc')
+        chw = raw_to_tensor(np.ascontiguousarray(pixels.transpose(2, 0, 1)).tobytes(), 'chw')
+        self.assertTrue(bool((hwc == chw).all()))
+        reference = self.reference(encoded((IMG_WIDTH, IMG_HEIGHT), 'PNG'))
+        self.assertLess(float((hwc - reference).abs().max()), 1e-4)
@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from routes.prediction_route.registry import DEFAULT_CLASS_NAMES, ModelRegistry, _CachedModule, parse_class_names
+
+class InlinePool:
+    def run(self, fn, *args):
+        return fn(*args)
+
+class FakeRegistry(ModelRegistry):
+    """Loads fake callables instead of TorchScript files, recording every file it loads."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.loaded = []
+        self.broken = set()
+
+    def _load_module(self, path, fileHash):
+        if fileHash in self.broken:
+            raise RuntimeError("corrupt model file")
+        self.loaded.append(fileHash)
+        return _CachedModule(lambda inputs: inputs, self.backend, {"forwardMs": 1.0})
+
+def version(n, classNames=None):
+    return SimpleNamespace(modelId=f"m{n}", version=f"{n}.0.0", fileHash=f"hash{n}", filePath=f"m{n}.pt",
+                           classNames=classNames, role=None, crop=None)
+
+def eventually(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class ModelRegistryTesting(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch('routes.prediction_route.registry.inference_pool', InlinePool())
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.registry = FakeRegistry(cache_size=2)
+
+    def test_recent_versions_are_reused_and_the_oldest_evicted(self):
+        for n in (1, 2, 1, 3):
+            self.registry.activate(version(n))
+
+        self.assertEqual(self.registry.loaded, ["hash1", "hash2", "hash3"])
+        # hash1 was used after hash2, so hash2 is the one evicted
+        self.assertEqual(self.registry.cached_hashes(), ["hash1:eager", "hash3:eager"])
+        self.registry.activate(version(2))
+        self.assertEqual(self.registry.loaded[-1], "hash2")
+
+    def test_activate_swaps_the_active_model(self):
+        first = self.registry.activate(version(1))
+        self.assertIs(self.registry.active, first)
+        second = self.registry.activate(version(2, '["a", "b"]'))
+
+        self.assertIs(self.registry.active, second)
+        self.assertEqual((second.version, second.classNames), ("2.0.0", ["a", "b"]))
+        self.assertEqual(first.classNames, DEFAULT_CLASS_NAMES)
+        # Reactivating a cached version does not load it again
+        self.registry.activate(version(1))
+        self.assertEqual(self.registry.loaded, ["hash1", "hash2"])
+
+    def test_failed_activation_keeps_the_previous_model(self):
+        previous = self.registry.activate(version(1))
+        self.registry.broken.add("hash2")
+        with self.assertRaisesRegex(RuntimeError, "corrupt"):
+            self.registry.activate(version(2))
+        self.assertIs(self.registry.active, previous)
+        self.assertEqual(self.registry.cached_hashes(), ["hash1:eager"])
+
+    def test_activate_async_swaps_once_loaded(self):
+        """Requests keep getting the old model until the new one is loaded and warmed."""
+        previous = self.registry.activate(version(1))
+        loading, release = threading.Event(), threading.Event()
+        load_module = self.registry._load_module
+
+        def slow(path, fileHash):
+            loading.set()
+            release.wait(5)
+            return load_module(path, fileHash)
+
+        self.registry._load_module = slow
+        self.registry.activate_async(version(2))
+        self.assertTrue(loading.wait(5))
+        self.assertIs(self.registry.active, previous)
+        release.set()
+
+        self.assertTrue(eventually(lambda: self.registry.active.version == "2.0.0"))
+
+    def test_activate_async_failure_is_logged_not_raised(self):
+        previous = self.registry.activate(version(1))
+        self.registry.broken.add("hash2")
+        with self.assertLogs('routes.prediction_route.registry', level='ERROR'):
+            self.registry.activate_async(version(2))
+            self.assertTrue(eventually(lambda: not any(t.name == "model-registry-activate" for t in threading.enumerate())))
+        self.assertIs(self.registry.active, previous)
+
+class ParseClassNamesTesting(unittest.TestCase):
+    def test_json_and_comma_separated(self):
+        self.assertEqual(parse_class_names('["a", " b "]'), ["a", "b"])
+        self.assertEqual(parse_class_names("a, b,c"), ["a", "b", "c"])
+        self.assertEqual(parse_class_names(["a"]), ["a"])
+
+    def test_empty_means_no_mapping(self):
+        self.assertIsNone(parse_class_names(None))
+        self.assertIsNone(parse_class_names("  "))
+
+    def test_invalid_names_rejected(self):
+        for raw in ('{"a": 1}', '["a", ""]', "a,,b", [1, 2]):
+            with self.assertRaises(ValueError):
+                parse_class_names(raw)
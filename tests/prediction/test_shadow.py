@@ -0,0 +1,78 @@
+import unittest
+from concurrent.futures import Future
+from routes.prediction_route.shadow import STATE_RUNNING, ShadowEvaluator, per_image_ms
+
+class FakeModel:
+    def __init__(self, modelId, version):
+        self.modelId = modelId
+        self.version = version
+        self.module = version
+
+class FakeEngine:
+    """Resolves every request immediately with the model's name as its output."""
+    def __init__(self, forward_ms=8.0, batch_size=1):
+        self.submitted = []
+        self.timing = {"forward_ms": forward_ms, "batch_size": batch_size}
+
+    def submit(self, tensor, model, priority):
+        self.submitted.append(priority)
+        future = Future()
+        future.timing = dict(self.timing)
+        future.set_result(tensor)
+        return future
+
+def loaded(model):
+    future = Future()
+    future.set_result(model)
+    return future
+
+class ShadowEvaluatorTesting(unittest.TestCase):
+    def setUp(self):
+        self.engine = FakeEngine()
+        self.candidate = FakeModel("m2", "v2")
+        self.evaluator = ShadowEvaluator(
+            self.engine, lambda output, model: (output, 0.9), lambda row: loaded(self.candidate), sample_rate=1.0
+        )
+        self.evaluator.start(FakeModel("m2", "v2"))
+
+    def test_agreement_per_class(self):
+        """Candidate labels are compared with the live label and latency deltas recorded."""
+        live = {"label": "healthy", "model_id": "m1", "model_version": "v1"}
+        self.evaluator.offer("healthy", live, 10.0)
+        self.evaluator.offer("rust", live, 10.0)
+
+        summary = self.evaluator.summary("m2")
+        self.assertEqual(summary["state"], STATE_RUNNING)
+        self.assertEqual(summary["samples"], 2)
+        self.assertEqual(summary["agreement_rate"], 0.5)
+        self.assertEqual(summary["per_class"]["healthy"]["samples"], 2)
+        self.assertEqual(summary["top_disagreements"], [{"live": "healthy", "candidate": "rust", "count": 1}])
+        self.assertEqual(summary["latency"]["mean_delta_ms"], -2.0)
+
+    def test_skips_live_model_and_unsampled(self):
+        """Nothing is queued for the model already serving, or when the sample misses."""
+        self.evaluator.offer("healthy", {"label": "healthy", "model_id": "m2", "model_version": "v2"}, 10.0)
+        self.evaluator.sample_rate = 0.0
+        self.evaluator.offer("healthy", {"label": "healthy", "model_id": "m1", "model_version": "v1"}, 10.0)
+        self.assertEqual(self.engine.submitted, [])
+
+    def test_skipped_while_live_requests_wait(self):
+        """No shadow work is queued while the live engine has requests waiting."""
+        live_waiting = [True]
+        self.evaluator.busy = lambda: live_waiting[0]
+        live = {"label": "healthy", "model_id": "m1", "model_version": "v1"}
+        self.evaluator.offer("healthy", live, 10.0)
+        self.assertEqual(self.engine.submitted, [])
+        self.assertEqual(self.evaluator.stats()["skipped_busy"], 1)
+
+        live_waiting[0] = False
+        self.evaluator.offer("healthy", live, 10.0)
+        self.assertEqual(len(self.engine.submitted), 1)
+
+    def test_latency_compared_per_image(self):
+        """A candidate batched with three other images is charged a quarter of the batch's forward time."""
+        self.engine.timing = {"forward_ms": 40.0, "batch_size": 4}
+        live = {"label": "healthy", "model_id": "m1", "model_version": "v1"}
+        self.evaluator.offer("healthy", live, per_image_ms({"forward_ms": 24.0, "batch_size": 2}))
+        self.assertEqual(self.evaluator.summary("m2")["latency"]["mean_delta_ms"], -2.0)
+        self.assertIsNone(per_image_ms({}))
@@ -0,0 +1,43 @@
+import unittest
+from routes.prediction_route.telemetry import STAGE_FORWARD, STAGE_PERSIST, STAGE_TOTAL, InferenceTelemetry
+
+class InferenceTelemetryTesting(unittest.TestCase):
+    def test_histograms_outlive_ring_buffer(self):
+        """Per-version histograms keep every sample even after the ring buffer wraps."""
+        telemetry = InferenceTelemetry(capacity=2, bounds=(10, 100))
+        for forward_ms in (5, 50, 500):
+            telemetry.record("v1", backend="eager", batchSize=1, forwardMs=forward_ms, totalMs=forward_ms + 1)
+
+        self.assertEqual(len(telemetry.recent()), 2)
+        summary = telemetry.summary("v1")
+        self.assertEqual(summary["predictions"], 3)
+        self.assertEqual(summary["stages"][STAGE_FORWARD]["buckets"], {"le_10": 1, "le_100": 1, "overflow": 1})
+        self.assertEqual(summary["stages"][STAGE_FORWARD]["p50_ms"], 100)
+        self.assertIsNone(telemetry.summary("v2"))
+
+    def test_record_stage(self):
+        """Durations measured off the request path land in the same version's histograms."""
+        telemetry = InferenceTelemetry(bounds=(10, 100))
+        telemetry.record_stage("v1", STAGE_PERSIST, 42)
+        self.assertEqual(telemetry.summary("v1")["stages"][STAGE_PERSIST]["count"], 1)
+
+    def test_cache_hits_stay_out_of_the_stage_histograms(self):
+        """A cache hit never ran the model, so its total is counted on its own."""
+        telemetry = InferenceTelemetry(bounds=(10, 100))
+        telemetry.record("v1", forwardMs=40, totalMs=50)
+        telemetry.record("v1", cached=True, totalMs=1)
+
+        summary = telemetry.summary("v1")
+        self.assertEqual((summary["predictions"], summary["cached"]), (2, 1))
+        self.assertEqual(summary["stages"][STAGE_TOTAL]["count"], 1)
+        self.assertEqual(summary["stages"][STAGE_TOTAL]["p50_ms"], 100)
+        self.assertEqual(summary["cached_total"]["count"], 1)
+
+    def test_persist_time_reaches_the_prediction_sample(self):
+        telemetry = InferenceTelemetry(bounds=(10, 100))
+        sample = telemetry.record("v1", forwardMs=5, totalMs=8)
+        sample.diagnosisId = "d1"
+        telemetry.record_persisted("v1", 42, sample)
+
+        self.assertEqual(telemetry.summary("v1")["stages"][STAGE_PERSIST]["count"], 1)
+        self.assertEqual({key: telemetry.recent()[-1][key] for key in ("diagnosisId", "persistMs")}, {"diagnosisId": "d1", "persistMs": 42})
@@ -0,0 +1,102 @@
+import io
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from flask import Flask
+from PIL import Image
+from base_test import BaseTestCase
+from routes.prediction_route.warmup import STATE_COLD, STATE_FAILED, STATE_READY, STATE_WARMING, InferenceWarmup
+
+class Probe:
+    """Stands in for a full prediction: records each dummy image and can be held until released."""
+    def __init__(self, error=None):
+        self.images = []
+        self.error = error
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, image_bytes):
+        self.release.wait(5)
+        self.images.append(image_bytes)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(version='2.0.0')
+
+def settled(warmup, timeout=5):
+    deadline = time.monotonic() + timeout
+    while warmup.state == STATE_WARMING and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return warmup.state
+
+class InferenceWarmupTesting(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def test_ready_after_every_run(self):
+        probe = Probe()
+        warmup = InferenceWarmup(probe, runs=3)
+        self.assertEqual(warmup.status()["state"], STATE_COLD)
+        warmup.start(self.app)
+
+        self.assertEqual(settled(warmup), STATE_READY)
+        self.assertEqual(len(probe.images), 3)
+        Image.open(io.BytesIO(probe.images[0])).verify()
+        status = warmup.status()
+        self.assertTrue(status["ready"])
+        self.assertEqual(status["model_version"], '2.0.0')
+        self.assertIsNotNone(status["warmup_seconds"])
+
+    def test_not_ready_while_warming_and_started_once(self):
+        probe = Probe()
+        probe.release.clear()
+        warmup = InferenceWarmup(probe, runs=1)
+        warmup.start(self.app)
+        warmup.start(self.app)
+        self.assertFalse(warmup.ready)
+        self.assertEqual(warmup.state, STATE_WARMING)
+
+        probe.release.set()
+        self.assertEqual(settled(warmup), STATE_READY)
+        self.assertEqual(len(probe.images), 1)
+        warmup.start(self.app)
+        self.assertEqual(len(probe.images), 1)
+
+    def test_failure_is_reported_and_retried(self):
+        probe = Probe(error=ValueError("Model is not loaded"))
+        warmup = InferenceWarmup(probe, runs=2)
+        warmup.start(self.app)
+        self.assertEqual(settled(warmup), STATE_FAILED)
+        self.assertEqual(warmup.status()["error"], "Model is not loaded")
+        self.assertFalse(warmup.ready)
+
+        probe.error = None
+        warmup.start(self.app)
+        self.assertEqual(settled(warmup), STATE_READY)
+        self.assertIsNone(warmup.error)
+
+    def test_probe_runs_in_an_app_context(self):
+        from flask import current_app
+        seen = []
+        warmup = InferenceWarmup(lambda image_bytes: seen.append(current_app.name) or SimpleNamespace(version='1.0.0'), runs=1)
+        with self.app.app_context():
+            warmup.start()
+        self.assertEqual(settled(warmup), STATE_READY)
+        self.assertEqual(seen, [self.app.name])
+
+class ReadinessEndpointTesting(BaseTestCase):
+    def test_503_until_warm(self):
+        probe = Probe()
+        probe.release.clear()
+        warmup = InferenceWarmup(probe, runs=1)
+        with mock.patch('routes.prediction_route.prediction.inference_warmup', warmup):
+            response = self.client.get('/api/v1/predict/ready')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json['state'], STATE_WARMING)
+
+            probe.release.set()
+            settled(warmup)
+            response = self.client.get('/api/v1/predict/ready')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json['ready'])